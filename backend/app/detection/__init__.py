@@ -1,3 +1,4 @@
 from .detection import process_folder, draw_boxes, is_image
+from .render import RenderStyle
 
-__all__ = ["process_folder", "draw_boxes", "is_image"]
+__all__ = ["process_folder", "draw_boxes", "is_image", "RenderStyle"]
@@ -0,0 +1,163 @@
+"""Read images straight out of zip/tar archives, and write outputs into one, without extracting to disk."""
+
+import io
+import os
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Iterator, Union
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+_TAR_WRITE_MODES = {".gz": "w:gz", ".tgz": "w:gz", ".bz2": "w:bz2", ".tbz2": "w:bz2", ".xz": "w:xz", ".txz": "w:xz"}
+# already compressed: deflating them again only costs time
+_STORED_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".npz", ".gz", ".mp4"}
+
+
+def is_archive(path: Union[str, Path]) -> bool:
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def member_name(name: str) -> str:
+    """``name`` as a relative path that cannot leave the output folder (no leading ``/`` or ``..``)."""
+    parts = [p for p in PurePosixPath(name.replace("\\", "/")).parts if p not in ("/", "..", ".")]
+    return "/".join(parts)
+
+
+class ArchiveMember:
+    """A file read from an archive: ``name`` is its (sanitised) path inside it, ``data`` its bytes.
+
+    Stands in for a ``Path`` in ``process_folder``: outputs are named after
+    ``name``, and ``open()`` gives a file object to decode it from.
+    """
+
+    __slots__ = ("name", "data")
+
+    def __init__(self, name: str, data: bytes):
+        self.name = member_name(name)
+        self.data = data
+
+    @property
+    def suffix(self) -> str:
+        return PurePosixPath(self.name).suffix
+
+    def open(self) -> io.BytesIO:
+        return io.BytesIO(self.data)
+
+    def __repr__(self):
+        return f"ArchiveMember({self.name!r}, {len(self.data)} bytes)"
+
+
+def iter_members(path: Path, suffixes) -> Iterator[ArchiveMember]:
+    """Members of archive ``path`` with one of ``suffixes``, in stored order.
+
+    The archive is read front to back, and each member only when the iterator
+    reaches it, so memory holds just the members the consumer has not let go
+    of. Tar archives (also compressed ones) are read as a stream.
+    """
+    suffixes = {s.lower() for s in suffixes}
+    seen = set()
+    if str(path).lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as zf:
+            # file order, so the archive is read sequentially
+            for info in sorted(zf.infolist(), key=lambda i: i.header_offset):
+                if not info.is_dir() and PurePosixPath(info.filename).suffix.lower() in suffixes:
+                    yield _unique(ArchiveMember(info.filename, zf.read(info)), seen, path)
+        return
+    with tarfile.open(path, "r|*") as tf:
+        for info in tf:
+            if info.isfile() and PurePosixPath(info.name).suffix.lower() in suffixes:
+                yield _unique(ArchiveMember(info.name, tf.extractfile(info).read()), seen, path)
+
+
+def _unique(member: ArchiveMember, seen: set, path: Path) -> ArchiveMember:
+    """Rename ``member`` to ``<stem>-<n><suffix>`` if an earlier member already has its name.
+
+    Sanitising can map different names (``x.jpg``, ``../x.jpg``) to the same
+    one, and an archive may simply hold a name twice; each output needs its own.
+    """
+    name = member.name
+    if name in seen:
+        stem = PurePosixPath(name)
+        n = 1
+        while f"{stem.with_suffix('')}-{n}{stem.suffix}" in seen:
+            n += 1
+        member.name = f"{stem.with_suffix('')}-{n}{stem.suffix}"
+        print(f"Warning: {path} has more than one {name}; writing the copy as {member.name}")
+    seen.add(member.name)
+    return member
+
+
+class ArchiveWriter:
+    """Add files to a new zip or tar archive (compression from the suffix) as they are produced.
+
+    ``add`` may be called from several threads. The archive is written under
+    a temporary name and renamed to ``path`` on ``close``, so nobody sees a
+    half-written file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        self._lock = threading.Lock()
+        self._names = set()
+        if self.path.name.lower().endswith(".zip"):
+            self._zip = zipfile.ZipFile(self._tmp, "w", zipfile.ZIP_DEFLATED)
+            self._tar = None
+        else:
+            self._zip = None
+            self._tar = tarfile.open(self._tmp, _TAR_WRITE_MODES.get(self.path.suffix.lower(), "w"))
+
+    def add(self, name: str, data: bytes):
+        """Store ``data`` as member ``name``."""
+        self.add_stream(name, io.BytesIO(data), len(data))
+
+    def add_file(self, name: str, src: Path):
+        """Copy the file ``src`` into the archive as ``name``."""
+        with open(src, "rb") as f:
+            self.add_stream(name, f, os.path.getsize(src))
+
+    def add_stream(self, name: str, fileobj, size: int):
+        name = member_name(name)
+        with self._lock:
+            if name in self._names:
+                raise ValueError(f"{self.path} already has a member {name}")
+            self._names.add(name)
+            if self._zip is not None:
+                info = zipfile.ZipInfo(name, time.localtime()[:6])
+                stored = PurePosixPath(name).suffix.lower() in _STORED_SUFFIXES
+                info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+                with self._zip.open(info, "w", force_zip64=size > 2**31) as dest:
+                    shutil.copyfileobj(fileobj, dest)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = size
+                info.mtime = int(time.time())
+                self._tar.addfile(info, fileobj)
+
+    def __contains__(self, name: str) -> bool:
+        return member_name(name) in self._names
+
+    def close(self):
+        """Finish the archive and move it to ``path``."""
+        if self._finish():
+            os.replace(self._tmp, self.path)
+
+    def abort(self):
+        """Drop the archive written so far; nothing appears at ``path``."""
+        if self._finish():
+            self._tmp.unlink(missing_ok=True)
+
+    def _finish(self) -> bool:
+        """Close the open archive; False if it was already closed."""
+        with self._lock:
+            if self._zip is None and self._tar is None:
+                return False
+            try:
+                (self._zip or self._tar).close()
+            finally:
+                self._zip = self._tar = None
+            return True
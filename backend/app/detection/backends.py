@@ -0,0 +1,230 @@
+"""Inference backends.
+
+Anything with an ultralytics-style ``predict(source, device, imgsz, conf, verbose)``
+returning results with ``boxes.xyxy/conf/cls`` can be used as the model in
+``process_folder`` and the web app. The default backend is the ultralytics
+``YOLO`` object itself (PyTorch); ``OnnxBackend`` runs an exported copy of the
+same weights with ONNX Runtime on the CPU, either in FP32 (``onnx``) or with
+INT8 weights from dynamic quantization (``onnx-int8``).
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from .manifest import file_sha256
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+QUANTIZE_OPS = ("Conv", "MatMul")  # node types whose weights onnx-int8 stores as INT8
+
+
+class ArrayBoxes:
+    """Minimal stand-in for ultralytics ``Boxes`` backed by NumPy arrays."""
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class ArrayResult:
+    def __init__(self, boxes: ArrayBoxes, orig_shape):
+        self.boxes = boxes
+        self.orig_shape = orig_shape
+
+
+def letterbox(img: np.ndarray, imgsz: Union[int, Sequence[int]], stride: int = 32, pad_value: int = 114):
+    """Resize keeping aspect ratio and pad to a multiple of ``stride``, as ultralytics does for rect inference.
+
+    ``imgsz`` is the longer side, or an exact ``(height, width)`` to pad to
+    (as for a rect bucket, see ``buckets.rect_shape``). Returns the padded
+    image plus the scale ``gain`` and ``(pad_x, pad_y)`` offsets needed to map
+    boxes back to the original image.
+    """
+    import cv2
+
+    h, w = img.shape[:2]
+    exact = isinstance(imgsz, (tuple, list))
+    th, tw = imgsz if exact else (imgsz, imgsz)
+    gain = min(th / h, tw / w)
+    new_w, new_h = round(w * gain), round(h * gain)
+    dw, dh = tw - new_w, th - new_h
+    if not exact:
+        dw, dh = dw % stride, dh % stride
+    dw, dh = dw / 2, dh / 2
+    if (new_w, new_h) != (w, h):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(dh - 0.1), round(dh + 0.1)
+    left, right = round(dw - 0.1), round(dw + 0.1)
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(pad_value,) * 3)
+    return img, gain, (left, top)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_thres: float) -> np.ndarray:
+    """Greedy non-maximum suppression; returns kept indices in descending score order."""
+    x0, y0, x1, y1 = boxes.T
+    areas = (x1 - x0).clip(0) * (y1 - y0).clip(0)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = (np.minimum(x1[i], x1[rest]) - np.maximum(x0[i], x0[rest])).clip(0)
+        ih = (np.minimum(y1[i], y1[rest]) - np.maximum(y0[i], y0[rest])).clip(0)
+        inter = iw * ih
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_thres]
+    return np.array(keep, dtype=np.int64)
+
+
+def onnx_path_for(model_path: Path) -> Path:
+    model_path = Path(model_path)
+    return model_path.with_name(f"{model_path.stem}.{file_sha256(model_path)[:12]}.onnx")
+
+
+def int8_path_for(model_path: Path) -> Path:
+    return onnx_path_for(model_path).with_suffix(".int8.onnx")
+
+
+def export_onnx(model_path: Path) -> Path:
+    """Export ``model_path`` to ONNX (dynamic batch and shape) once and cache it next to the weights."""
+    dest = onnx_path_for(model_path)
+    if dest.exists():
+        return dest
+    from ultralytics import YOLO
+
+    print(f"Exporting {model_path} to {dest}")
+    exported = YOLO(str(model_path)).export(format="onnx", dynamic=True, simplify=False, verbose=False)
+    tmp = dest.with_name(f"{dest.name}.{os.getpid()}.tmp")
+    try:
+        # a move across filesystems copies: only a complete file may take the cached name
+        shutil.move(str(exported), str(tmp))
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return dest
+
+
+def export_int8(model_path: Path) -> Path:
+    """Dynamically quantize the ONNX export of ``model_path`` to INT8 weights once and cache it next to them.
+
+    Weights of Conv and MatMul nodes are stored as 8-bit integers (about a
+    third of the FP32 file); activations are quantized on the fly per call, so
+    no calibration images are needed. Whether this is faster than FP32 depends
+    on the CPU's integer kernels: measure with ``scripts/check_quantization.py``.
+    """
+    dest = int8_path_for(model_path)
+    if dest.exists():
+        return dest
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as e:
+        raise ImportError("The onnx-int8 backend needs onnx and onnxruntime: pip install onnx onnxruntime") from e
+
+    src = export_onnx(model_path)
+    print(f"Quantizing {src} to INT8")
+    tmp = dest.with_name(f"{dest.name}.{os.getpid()}.tmp")
+    try:
+        quantize_dynamic(str(src), str(tmp), weight_type=QuantType.QUInt8, op_types_to_quantize=list(QUANTIZE_OPS))
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return dest
+
+
+def export_for_backend(model_path: Path, backend: str) -> Optional[Path]:
+    """Build (or find) the exported model file ``backend`` runs, or None for the PyTorch backend."""
+    if backend == "onnx":
+        return export_onnx(model_path)
+    if backend == "onnx-int8":
+        return export_int8(model_path)
+    return None
+
+
+class OnnxBackend:
+    """YOLO detection with ONNX Runtime: letterbox, inference, NMS and class filtering in NumPy.
+
+    Only ``classes`` (COCO person by default, or those passed to ``predict``)
+    survive NMS, so downstream person filtering sees the same boxes as with
+    the PyTorch backend.
+    """
+
+    def __init__(
+        self,
+        onnx_path: Path,
+        iou: float = 0.7,
+        max_det: int = 300,
+        classes: Optional[Sequence[int]] = (0,),
+        threads: Optional[int] = None,
+    ):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx backend needs onnxruntime: pip install onnx onnxruntime") from e
+        opts = ort.SessionOptions()
+        threads = threads or int(os.environ.get("OMP_NUM_THREADS", 0) or 0)
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(onnx_path), opts, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.iou = iou
+        self.max_det = max_det
+        self.classes = None if classes is None else np.asarray(classes)
+
+    @classmethod
+    def from_weights(cls, model_path: Path, int8: bool = False, **kwargs) -> "OnnxBackend":
+        return cls(export_int8(model_path) if int8 else export_onnx(model_path), **kwargs)
+
+    def predict(
+        self,
+        source,
+        device: str = "cpu",
+        imgsz: Union[int, Sequence[int]] = 640,
+        conf: float = 0.25,
+        verbose: bool = False,
+        classes: Optional[Sequence[int]] = None,
+        **_,
+    ):
+        images = source if isinstance(source, list) else [source]
+        arrays = [np.asarray(im if im.mode == "RGB" else im.convert("RGB")) for im in images]
+        results: List[Optional[ArrayResult]] = [None] * len(arrays)
+        # one session call per distinct input shape; an exact (height, width) imgsz fits them all
+        exact = isinstance(imgsz, (tuple, list))
+        groups = {}
+        for i, a in enumerate(arrays):
+            groups.setdefault(None if exact else a.shape, []).append(i)
+        for idxs in groups.values():
+            boxed = [letterbox(arrays[i], imgsz) for i in idxs]
+            batch = np.stack([b[0] for b in boxed]).transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+            preds = self.session.run(None, {self.input_name: np.ascontiguousarray(batch)})[0]
+            for i, pred, (_, gain, pad) in zip(idxs, preds, boxed):
+                results[i] = self._postprocess(pred, conf, gain, pad, arrays[i].shape[:2], classes)
+        return results
+
+    def _postprocess(self, pred: np.ndarray, conf: float, gain: float, pad, orig_shape, classes=None) -> ArrayResult:
+        pred = pred.T  # (anchors, 4 + nc)
+        scores = pred[:, 4:]
+        cls = scores.argmax(1)
+        best = scores[np.arange(len(cls)), cls]
+        mask = best > conf
+        classes = self.classes if classes is None else np.asarray(classes)
+        if classes is not None:
+            mask &= np.isin(cls, classes)
+        xywh, best, cls = pred[mask, :4], best[mask], cls[mask]
+        xyxy = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+        # offset boxes per class so NMS never suppresses across classes
+        keep = nms(xyxy + cls[:, None] * 7680.0, best, self.iou)[: self.max_det]
+        xyxy, best, cls = xyxy[keep], best[keep], cls[keep]
+        h, w = orig_shape
+        xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - pad[0]) / gain).clip(0, w)
+        xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - pad[1]) / gain).clip(0, h)
+        return ArrayResult(
+            ArrayBoxes(xyxy.astype(np.float32), best.astype(np.float32), cls.astype(np.float32)), orig_shape
+        )
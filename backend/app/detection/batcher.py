@@ -0,0 +1,145 @@
+"""Coalesce concurrent single-image requests into batched model calls."""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, List, Optional, Sequence, Union
+
+from PIL import Image
+
+from .constants import DEFAULT_WEB_MAX_BATCH_SIZE, DEFAULT_WEB_MAX_WAIT_MS, DEFAULT_WEB_MAX_QUEUE
+
+
+class Overloaded(RuntimeError):
+    """The request queue is full; the caller should shed the request (HTTP 503)."""
+
+
+class DynamicBatcher:
+    """Run ``predict_fn`` on batches gathered from concurrent ``submit`` calls.
+
+    A background thread owns the model: it waits for a first request, then
+    keeps collecting until ``max_batch_size`` images are queued or
+    ``max_wait_ms`` has passed, and hands the batch to ``predict_fn`` (which
+    must return one result per image). Because only this thread calls the
+    model, request threads never run inference concurrently.
+
+    ``predict_fn`` may also be a list of callables, e.g. one per model worker
+    process: each gets its own thread, all fed from the same queue. At most
+    ``max_queue`` requests wait in that queue (0 = unbounded); beyond that
+    ``submit`` raises ``Overloaded`` at once instead of letting latency grow
+    without bound. A request whose caller timed out is cancelled and skipped.
+    ``close`` never blocks on a full queue: the threads finish what is queued
+    and then stop, and requests no thread picked up fail with ``RuntimeError``.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Union[Callable[[List[Image.Image]], list], Sequence[Callable[[List[Image.Image]], list]]],
+        max_batch_size: int = DEFAULT_WEB_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_WEB_MAX_WAIT_MS,
+        max_queue: int = DEFAULT_WEB_MAX_QUEUE,
+    ):
+        self.predict_fns = list(predict_fn) if isinstance(predict_fn, (list, tuple)) else [predict_fn]
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue(max(0, int(max_queue or 0)))
+        self._closed = False
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._loop, args=(fn,), name=f"batcher-{i}", daemon=True)
+            for i, fn in enumerate(self.predict_fns)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, img: Image.Image) -> Future:
+        if self._closed:
+            raise RuntimeError("batcher is closed")
+        fut = Future()
+        try:
+            self._queue.put_nowait((img, fut))
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            raise Overloaded(f"{self._queue.maxsize} requests already queued") from None
+        return fut
+
+    def __call__(self, img: Image.Image, timeout: Optional[float] = None):
+        fut = self.submit(img)
+        try:
+            return fut.result(timeout)
+        except TimeoutError:
+            # still queued: drop it so no worker spends time on an abandoned request
+            fut.cancel()
+            raise
+
+    def close(self):
+        self._closed = True
+        self._stop.set()
+        for _ in self._threads:
+            # wake idle threads early; with a full queue they see the stop flag once it drains
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        for t in self._threads:
+            t.join()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("batcher is closed"))
+
+    def _next(self):
+        """The next queued item, or None once the batcher is closed and nothing is queued."""
+        while True:
+            try:
+                return self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return None
+
+    def _loop(self, predict_fn):
+        while True:
+            first = self._next()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._run(predict_fn, batch)
+            if stop:
+                return
+
+    def _run(self, predict_fn, batch):
+        batch = [(img, fut) for img, fut in batch if fut.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = predict_fn([img for img, _ in batch])
+        except BaseException as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+        for (_, fut), r in zip(batch, results):
+            fut.set_result(r)
@@ -0,0 +1,86 @@
+"""Aspect-ratio buckets: the rectangular model input each image needs, shared by images of similar shape.
+
+ultralytics pads a lone image (or a call of same-size images) only up to a
+multiple of the stride, but letterboxes a call of mixed sizes to a square
+``imgsz``, which for 16:9 frames is 44% padding. Images whose rectangular
+shapes are equal can share one call at exactly that shape and get the same
+resize and padding they would get alone, so ``process_folder`` groups images
+into buckets keyed by ``rect_shape`` and batches each bucket separately.
+"""
+
+import math
+from collections import Counter
+from typing import Iterable, Tuple
+
+from .constants import DEFAULT_INFERENCE_RECT_BUCKETS
+from .tiling import tiling_enabled
+
+STRIDE = 32  # YOLO's largest feature-map stride
+
+
+def rect_shape(size: Tuple[int, int], imgsz: int, stride: int = STRIDE) -> Tuple[int, int]:
+    """``(height, width)`` input for an image of ``size`` ``(width, height)``: longer side ``imgsz``, the other padded up to a multiple of ``stride``."""
+    side = math.ceil(imgsz / stride) * stride
+    w, h = size
+    r = side / max(w, h)
+    return math.ceil(round(h * r) / stride) * stride, math.ceil(round(w * r) / stride) * stride
+
+
+def content_pixels(size: Tuple[int, int], imgsz: int, stride: int = STRIDE) -> int:
+    """Pixels of the resized image itself (without padding) in the model input."""
+    side = math.ceil(imgsz / stride) * stride
+    w, h = size
+    r = side / max(w, h)
+    return round(w * r) * round(h * r)
+
+
+def buckets_enabled(cfg: dict) -> bool:
+    """``inference.rect_buckets``, except with tiling, whose tiles are square anyway."""
+    inf = cfg.get("inference", {}) or {}
+    return bool(inf.get("rect_buckets", DEFAULT_INFERENCE_RECT_BUCKETS)) and not tiling_enabled(cfg)
+
+
+class BucketStats:
+    """Model input pixels of a run, to report the padding that rectangular buckets avoid."""
+
+    def __init__(self, imgsz: int, stride: int = STRIDE):
+        self.side = math.ceil(imgsz / stride) * stride
+        self.stride = stride
+        self.images = 0
+        self.calls = 0
+        self.content = 0  # image pixels
+        self.pixels = 0  # image + padding pixels the model ran on
+        self.shapes = Counter()
+
+    def add(self, sizes: Iterable[Tuple[int, int]]):
+        """Record one model call over images of ``sizes``, all run at their common ``rect_shape``."""
+        self.calls += 1
+        for size in sizes:
+            shape = rect_shape(size, self.side, self.stride)
+            self.images += 1
+            self.content += content_pixels(size, self.side, self.stride)
+            self.pixels += shape[0] * shape[1]
+            self.shapes[shape] += 1
+
+    @property
+    def padding(self) -> float:
+        """Share of the model input that was padding."""
+        return 1 - self.content / self.pixels if self.pixels else 0.0
+
+    @property
+    def square_padding(self) -> float:
+        """The same share had every image been letterboxed to a square ``imgsz``."""
+        return 1 - self.content / (self.images * self.side**2) if self.images else 0.0
+
+    @property
+    def pixels_saved(self) -> float:
+        """Fraction of the square letterbox input pixels the buckets did not run."""
+        return 1 - self.pixels / (self.images * self.side**2) if self.images else 0.0
+
+    def report(self) -> str:
+        shapes = ", ".join(f"{w}x{h} x{n}" for (h, w), n in self.shapes.most_common())
+        return (
+            f"Buckets: {len(self.shapes)} input shapes ({shapes}) in {self.calls} model calls; "
+            f"padding {100 * self.padding:.1f}% of input pixels vs {100 * self.square_padding:.1f}% "
+            f"letterboxed to {self.side}x{self.side} ({100 * self.pixels_saved:.0f}% fewer pixels)"
+        )
@@ -0,0 +1,135 @@
+"""Detection and rendered-output cache for the web UI."""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from .constants import DEFAULT_CACHE_MAX_MB
+from .postprocess import Detections
+
+
+class LRUCache:
+    """Thread-safe LRU mapping bounded by the total size of its values in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._data[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.nbytes -= evicted
+
+
+def _digest(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+class ResultCache:
+    """Two-level cache of detections and encoded outputs.
+
+    Detections are keyed by the input file (path, size, mtime), the model and
+    the inference settings; encoded outputs add the drawing settings and output
+    format on top, so a drawing-only change reuses the detections and only
+    redraws. Both live in one in-memory LRU and, if ``disk_dir`` is given, are
+    also written there so they survive restarts.
+    """
+
+    def __init__(self, max_mb: float = DEFAULT_CACHE_MAX_MB, disk_dir: Optional[Path] = None):
+        self.memory = LRUCache(int(max_mb * 1024 * 1024))
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.hits = 0
+        self.misses = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "ResultCache":
+        section = cfg.get("cache", {}) or {}
+        return cls(section.get("max_mb", DEFAULT_CACHE_MAX_MB), section.get("dir"))
+
+    @staticmethod
+    def detection_key(path: Path, model_id: str, conf: float, imgsz: int) -> str:
+        st = path.stat()
+        return _digest(["det", str(path.resolve()), st.st_size, st.st_mtime_ns, model_id, conf, imgsz])
+
+    @staticmethod
+    def render_key(det_key: str, cfg: dict, fmt: str = "PNG") -> str:
+        return _digest(["render", det_key, cfg.get("drawing", {}), fmt])
+
+    def _disk_path(self, key: str, suffix: str) -> Optional[Path]:
+        return self.disk_dir / f"{key}{suffix}" if self.disk_dir is not None else None
+
+    def _read_disk(self, key: str, suffix: str) -> Optional[bytes]:
+        path = self._disk_path(key, suffix)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, suffix: str, data: bytes):
+        path = self._disk_path(key, suffix)
+        if path is None:
+            return
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def _get(self, key: str, suffix: str) -> Optional[bytes]:
+        data = self.memory.get(key)
+        if data is None:
+            data = self._read_disk(key, suffix)
+            if data is not None:
+                self.memory.put(key, data, len(data))
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def _put(self, key: str, suffix: str, data: bytes):
+        self.memory.put(key, data, len(data))
+        self._write_disk(key, suffix, data)
+
+    def get_detections(self, key: str) -> Optional[Detections]:
+        data = self._get(key, ".json")
+        return Detections.from_boxes(json.loads(data)) if data is not None else None
+
+    def put_detections(self, key: str, boxes):
+        self._put(key, ".json", json.dumps(Detections.from_boxes(boxes).to_list()).encode())
+
+    def get_rendered(self, key: str) -> Optional[bytes]:
+        return self._get(key, ".img")
+
+    def put_rendered(self, key: str, data: bytes):
+        self._put(key, ".img", bytes(data))
@@ -0,0 +1,137 @@
+"""Coarse-to-fine cascade: a cheap low-resolution pass decides which images get the full-resolution one."""
+
+from typing import List, Optional
+
+import numpy as np
+from PIL import Image
+
+from .backends import ArrayBoxes, ArrayResult
+from .buckets import rect_shape
+from .constants import DEFAULT_CASCADE_CONF, DEFAULT_CASCADE_ENABLED, DEFAULT_CASCADE_IMGSZ
+from .postprocess import accepts_kwarg, result_arrays
+from .tiling import tiling_enabled
+
+
+def _empty(img: Image.Image) -> ArrayResult:
+    return ArrayResult(
+        ArrayBoxes(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.float32)),
+        (img.height, img.width),
+    )
+
+
+class CascadeStats:
+    """Images and model input pixels of both passes, against running every image once at full resolution."""
+
+    def __init__(self, coarse_imgsz: int):
+        self.coarse_imgsz = coarse_imgsz
+        self.images = 0
+        self.refined = 0
+        self.coarse_pixels = 0
+        self.fine_pixels = 0
+        self.baseline_pixels = 0
+
+    @property
+    def finished_early(self) -> int:
+        return self.images - self.refined
+
+    @property
+    def compute(self) -> float:
+        """Model input pixels of the cascade as a share of the single pass (conv cost scales with them)."""
+        return (self.coarse_pixels + self.fine_pixels) / self.baseline_pixels if self.baseline_pixels else 1.0
+
+    def report(self) -> str:
+        return (
+            f"Cascade: {self.finished_early} of {self.images} images had no candidates at {self.coarse_imgsz} px "
+            f"and skipped the full pass; model input {100 * self.compute:.0f}% of single-pass "
+            f"({100 * (1 - self.compute):.0f}% saved)"
+        )
+
+
+class CascadeModel:
+    """Wrap a model so each image is first run at ``imgsz`` px and kept only if it has a candidate.
+
+    The coarse pass keeps the class filter and uses the low threshold
+    ``conf``; an image with no box above it returns no detections. The other
+    images are run again through the wrapped model exactly as without the
+    cascade (same ``imgsz``, ``conf`` and batching), so their boxes are the
+    single-pass boxes: only people the coarse pass misses entirely are lost.
+    ``stats`` counts images and input pixels of both passes.
+    """
+
+    def __init__(self, model, imgsz: int = DEFAULT_CASCADE_IMGSZ, conf: float = DEFAULT_CASCADE_CONF):
+        self.model = model
+        self.imgsz = int(imgsz)
+        self.conf = float(conf)
+        self.stats = CascadeStats(self.imgsz)
+
+    @classmethod
+    def from_config(cls, model, cfg: dict) -> "CascadeModel":
+        c = cfg.get("cascade", {}) or {}
+        return cls(model, imgsz=c.get("imgsz", DEFAULT_CASCADE_IMGSZ), conf=c.get("conf", DEFAULT_CASCADE_CONF))
+
+    def predict(
+        self,
+        source,
+        device: str = "cpu",
+        imgsz=640,
+        conf: float = 0.25,
+        verbose: bool = False,
+        classes: Optional[List[int]] = None,
+        **_,
+    ):
+        images = source if isinstance(source, list) else [source]
+        # the class filter goes on to the wrapped model if it takes one
+        extra = {"classes": classes} if classes is not None and accepts_kwarg(self.model, "classes") else {}
+        candidates = self._coarse(images, device, classes, extra)
+        results = [None if hit else _empty(img) for img, hit in zip(images, candidates)]
+        refine = [i for i, hit in enumerate(candidates) if hit]
+        if refine:
+            batch = [images[i] for i in refine]
+            source = batch if len(batch) > 1 else batch[0]
+            preds = self.model.predict(source=source, device=device, imgsz=imgsz, conf=conf, verbose=False, **extra)
+            for i, r in zip(refine, preds):
+                results[i] = r
+
+        s = self.stats
+        s.images += len(images)
+        s.refined += len(refine)
+        for i, img in enumerate(images):
+            # with rect buckets imgsz is already the (height, width) this call runs at
+            h, w = imgsz if isinstance(imgsz, (tuple, list)) else rect_shape(img.size, imgsz)
+            s.baseline_pixels += h * w
+            s.fine_pixels += h * w if candidates[i] else 0
+            ch, cw = rect_shape(img.size, self.imgsz)
+            s.coarse_pixels += ch * cw
+        return results
+
+    def _coarse(self, images: List[Image.Image], device: str, classes, extra: dict) -> List[bool]:
+        """Whether each image has a box of a kept class above ``conf`` at the coarse size."""
+        # one call per coarse input shape, each at that (height, width)
+        groups = {}
+        for i, img in enumerate(images):
+            groups.setdefault(rect_shape(img.size, self.imgsz), []).append(i)
+        hits = [False] * len(images)
+        for shape, idxs in groups.items():
+            batch = [images[i] for i in idxs]
+            source = batch if len(batch) > 1 else batch[0]
+            preds = self.model.predict(source=source, device=device, imgsz=shape, conf=self.conf, verbose=False, **extra)
+            for i, r in zip(idxs, preds):
+                _, score, cls = result_arrays(r)
+                keep = score > self.conf
+                if classes is not None:
+                    keep &= np.isin(cls, classes)
+                hits[i] = bool(keep.any())
+        return hits
+
+
+def cascade_enabled(cfg: Optional[dict]) -> bool:
+    """``cascade.enabled``, except with tiling, which needs every image at full detail."""
+    c = (cfg or {}).get("cascade", {}) or {}
+    return bool(c.get("enabled", DEFAULT_CASCADE_ENABLED)) and not tiling_enabled(cfg)
+
+
+def maybe_cascaded(model, cfg: dict):
+    """``model`` wrapped in a ``CascadeModel`` if ``cascade.enabled`` is set in ``cfg`` (and tiling is not)."""
+    if cascade_enabled(cfg) and not isinstance(model, CascadeModel):
+        return CascadeModel.from_config(model, cfg)
+    return model
@@ -3,6 +3,14 @@
 DEFAULT_INFERENCE_DEVICE = "cpu"
 DEFAULT_INFERENCE_IMGSZ = 640
 DEFAULT_INFERENCE_CONF = 0.25
+DEFAULT_INFERENCE_BATCH_SIZE = 1
+DEFAULT_INFERENCE_WARMUP = True
+DEFAULT_INFERENCE_FUSED_SNAPSHOT = True  # cache a Conv+BN fused copy of the weights in models/
+DEFAULT_INFERENCE_BACKEND = "torch"  # or "onnx" / "onnx-int8" (ONNX Runtime, CPU; INT8 weights)
+DEFAULT_INFERENCE_DRAFT_DECODE = False  # decode large JPEGs at reduced scale for inference
+DEFAULT_INFERENCE_MIN_BOX_AREA = 0  # drop person boxes smaller than this (px², original image)
+DEFAULT_INFERENCE_MAX_DET = 300  # keep at most this many boxes per image, most confident first
+DEFAULT_INFERENCE_RECT_BUCKETS = False  # batch folder images by aspect ratio at rectangular input shapes
 
 DEFAULT_BOX_COLOR = [255, 0, 0]
 DEFAULT_BOX_THICKNESS = 4
@@ -10,3 +18,79 @@ DEFAULT_LABEL_BG_COLOR = [255, 0, 0]
 DEFAULT_LABEL_TEXT_COLOR = [255, 255, 255]
 DEFAULT_FONT_SIZE = 18
 DEFAULT_LABEL_PADDING = [4, 2]
+DEFAULT_FONT_PATH = None  # None: locate DejaVu Sans via matplotlib
+
+# Tiled inference for very large images (tile/overlap in pixels)
+DEFAULT_TILING_ENABLED = False
+DEFAULT_TILING_SIZE = 640
+DEFAULT_TILING_OVERLAP = 128
+DEFAULT_TILING_BATCH_SIZE = 8  # tiles per model.predict call
+DEFAULT_TILING_IOU = 0.5  # NMS threshold for merging boxes across tile seams
+DEFAULT_TILING_FULL_IMAGE = True  # also run the whole image once for people larger than a tile
+
+# Coarse-to-fine cascade: a low-resolution pass first; images without candidates skip the full pass
+DEFAULT_CASCADE_ENABLED = False
+DEFAULT_CASCADE_IMGSZ = 320  # coarse pass resolution
+DEFAULT_CASCADE_CONF = 0.05  # a coarse box above this sends the image to the full-resolution pass
+
+# Video mode: run the model on every Nth frame, and optionally only when the
+# frame differs from the last inferred one (mean abs diff, 0-255) by more than this
+DEFAULT_VIDEO_EVERY = 1
+DEFAULT_VIDEO_MOTION_THRESHOLD = None
+
+# Near-duplicate dedup: reuse the detections of a recently inferred image whose
+# 64-bit perceptual hash differs in at most max_distance bits (among the last window)
+DEFAULT_DEDUP_ENABLED = False
+DEFAULT_DEDUP_MAX_DISTANCE = 4
+DEFAULT_DEDUP_WINDOW = 64
+
+# Watch mode: inotify ("auto" falls back to polling), how long a file must stay
+# unchanged before it is read, and how many images may be queued or in processing
+DEFAULT_WATCH_METHOD = "auto"  # auto, inotify or poll
+DEFAULT_WATCH_SETTLE_S = 0.5
+DEFAULT_WATCH_POLL_INTERVAL_S = 1.0
+DEFAULT_WATCH_MAX_IN_FLIGHT = 32
+DEFAULT_WATCH_INITIAL_SCAN = True  # also pick up images already in the folder at start-up
+DEFAULT_WATCH_RETRY_S = 5.0  # wait before reopening a folder that could not be listed or watched
+
+# Staged CLI pipeline (0 workers runs the stage inline on the main thread)
+DEFAULT_PIPELINE_DECODE_WORKERS = 0
+DEFAULT_PIPELINE_ENCODE_WORKERS = 0
+DEFAULT_PIPELINE_QUEUE_DEPTH = 8
+
+# Output options
+DEFAULT_OUTPUT_MANIFEST = True
+DEFAULT_OUTPUT_IMAGES = True
+DEFAULT_OUTPUT_JSONL = None  # e.g. "detections.jsonl", relative to the output folder
+DEFAULT_OUTPUT_NPZ = None  # e.g. "detections.npz"
+
+# Web output encoding: "source" keeps the input's format (JPEG/PNG/WebP), or force jpeg/png/webp
+DEFAULT_ENCODING_FORMAT = "source"
+DEFAULT_ENCODING_JPEG_QUALITY = 90
+DEFAULT_ENCODING_PNG_COMPRESS_LEVEL = 6  # 0-9, PIL's default
+DEFAULT_ENCODING_WEBP_QUALITY = 85
+DEFAULT_ENCODING_WEBP_LOSSLESS = False
+DEFAULT_ENCODING_WEBP_METHOD = 4  # 0 (fast) - 6 (small)
+
+# Hot-path latency histograms/counters (/metrics in web mode, summary in cli mode)
+DEFAULT_METRICS_ENABLED = True
+
+# Web result cache
+DEFAULT_CACHE_MAX_MB = 256
+DEFAULT_CACHE_DIR = None
+
+# Web detection API micro-batching
+DEFAULT_WEB_MAX_BATCH_SIZE = 8
+DEFAULT_WEB_MAX_WAIT_MS = 10
+
+# Web serving: model worker processes (0 = one model in the web process) and admission control
+DEFAULT_WEB_WORKERS = 0
+DEFAULT_WEB_THREADS = None  # torch threads per worker; None = cores / workers
+DEFAULT_WEB_MAX_QUEUE = 64  # requests waiting for a model; more are rejected with 503
+DEFAULT_WEB_TIMEOUT_S = 30.0  # give up (503) if a request has not been served by then
+
+# Web UI input browser: files per page, and JPEG preview thumbnails (longest side, LRU size)
+DEFAULT_WEB_PAGE_SIZE = 100
+DEFAULT_WEB_THUMBNAILS = True
+DEFAULT_WEB_THUMBNAIL_PX = 480
+DEFAULT_WEB_THUMBNAIL_CACHE_MB = 32
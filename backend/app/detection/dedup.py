@@ -0,0 +1,79 @@
+"""Perceptual hashes of recent images, to reuse detections for near-duplicates (burst shots, static cameras)."""
+
+from collections import deque
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .constants import DEFAULT_DEDUP_ENABLED, DEFAULT_DEDUP_MAX_DISTANCE, DEFAULT_DEDUP_WINDOW
+
+HASH_SIZE = 8  # 8x8 gradient bits = 64-bit hash
+ASPECT_TOLERANCE = 0.01
+
+
+def dhash(img: Image.Image, size: int = HASH_SIZE) -> int:
+    """Difference hash of ``img``: one bit per pixel of a ``size + 1`` x ``size`` grey thumbnail, set where it is brighter than its right neighbour."""
+    # reducing_gap box-downsamples by an integer factor first, so this stays
+    # cheap for large images; grey conversion then only touches 72 pixels
+    small = img.resize((size + 1, size), Image.BILINEAR, reducing_gap=2.0).convert("L")
+    px = np.asarray(small, dtype=np.int16)
+    bits = (px[:, 1:] > px[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class DedupEntry:
+    """An inferred image in the index; ``boxes`` (in ``size`` coordinates) is None until its batch has run."""
+
+    __slots__ = ("hash", "size", "name", "boxes")
+
+    def __init__(self, h: int, size: Tuple[int, int], name: str = ""):
+        self.hash = h
+        self.size = size
+        self.name = name
+        self.boxes: Optional[List[dict]] = None
+
+
+class DedupIndex:
+    """Hashes of the last ``window`` inferred images, matched within ``max_distance`` differing bits.
+
+    Only images that actually ran through the model are added, so a slow drift
+    across many frames cannot chain matches arbitrarily far from the image
+    whose detections are reused. Images must also have the same aspect ratio;
+    a different resolution is fine, the boxes are rescaled.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_DEDUP_MAX_DISTANCE, window: int = DEFAULT_DEDUP_WINDOW):
+        self.max_distance = int(max_distance)
+        self._recent = deque(maxlen=max(1, int(window)))
+        self.hits = 0
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> Optional["DedupIndex"]:
+        """An index built from the ``dedup`` config section, or None when dedup is disabled."""
+        d = cfg.get("dedup", {}) or {}
+        if not d.get("enabled", DEFAULT_DEDUP_ENABLED):
+            return None
+        return cls(d.get("max_distance", DEFAULT_DEDUP_MAX_DISTANCE), d.get("window", DEFAULT_DEDUP_WINDOW))
+
+    def match(self, h: int, size: Tuple[int, int]) -> Optional[DedupEntry]:
+        """The closest recent entry within ``max_distance`` of ``h`` with the same aspect ratio, if any."""
+        aspect = size[0] / size[1]
+        best, best_d = None, self.max_distance + 1
+        for e in reversed(self._recent):
+            d = (h ^ e.hash).bit_count()
+            if d < best_d and abs(e.size[0] / e.size[1] - aspect) <= ASPECT_TOLERANCE * aspect:
+                best, best_d = e, d
+                if d == 0:
+                    break
+        if best is not None:
+            self.hits += 1
+        return best
+
+    def add(self, h: int, size: Tuple[int, int], name: str = "") -> DedupEntry:
+        entry = DedupEntry(h, size, name)
+        self._recent.append(entry)
+        return entry
+
+    def __len__(self):
+        return len(self._recent)
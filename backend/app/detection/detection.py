@@ -1,81 +1,51 @@
-from pathlib import Path
-from typing import List
-from PIL import Image, ImageDraw, ImageFont
+import io
+import math
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
+from PIL import Image, ImageDraw
 
-try:
-    import importlib
+from .archive import ArchiveMember, ArchiveWriter, is_archive, iter_members
+from .buckets import BucketStats, buckets_enabled, rect_shape
+from .cascade import CascadeModel, maybe_cascaded
+from .constants import DEFAULT_INFERENCE_DRAFT_DECODE
+from .dedup import DedupIndex, dhash
+from .manifest import Manifest
+from .metrics import Metrics
+from .pipeline import Pipeline
+from .postprocess import Detections, PostProcess, accepts_kwarg
+from .render import RenderStyle, text_width
+from .tiling import maybe_tiled, tiling_enabled
+from .writers import DetectionWriter
 
-    fm = importlib.import_module("matplotlib.font_manager")
-except Exception:
-    fm = None
 
-from .constants import (
-    DEFAULT_BOX_COLOR,
-    DEFAULT_BOX_THICKNESS,
-    DEFAULT_LABEL_BG_COLOR,
-    DEFAULT_LABEL_TEXT_COLOR,
-    DEFAULT_FONT_SIZE,
-    DEFAULT_LABEL_PADDING,
-)
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"}
 
 
 def is_image(p: Path):
-    return p.is_file() and p.suffix.lower() in {".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"}
+    return p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES
 
 
-def draw_boxes(image: Image.Image, boxes: List[dict], cfg: dict):
-    draw = ImageDraw.Draw(image)
-
-    # Font configuration (can be absolute px, fraction <=1, or string '1/50')
-    font_cfg_raw = cfg.get("drawing", {}).get("font_size", DEFAULT_FONT_SIZE)
-
-    def compute_font_px(raw, img_h):
-        if isinstance(raw, str) and "/" in raw:
-            try:
-                n, d = raw.split("/")
-                frac = float(n) / float(d)
-                return max(6, int(img_h * frac))
-            except Exception:
-                return DEFAULT_FONT_SIZE
-        try:
-            val = float(raw)
-            if 0 < val <= 1:
-                return max(6, int(img_h * val))
-            else:
-                return max(6, int(val))
-        except Exception:
-            return DEFAULT_FONT_SIZE
+def draw_boxes(image: Image.Image, boxes: Union[Detections, List[dict]], cfg: Union[dict, RenderStyle]):
+    """Draw person boxes and confidence labels onto ``image`` in place and return it.
 
-    font_size_cfg = compute_font_px(font_cfg_raw, image.height)
-    # make label font larger (user requested ~2x)
-    try:
-        font_size_cfg = int(font_size_cfg)
-    except Exception:
-        pass
+    ``boxes`` is a ``Detections`` or a list of box dicts. ``cfg`` is either the
+    full config dict or a ``RenderStyle`` built from it once; callers drawing
+    many images should pass the latter.
+    """
+    dets = Detections.from_boxes(boxes)
+    style = cfg if isinstance(cfg, RenderStyle) else RenderStyle.from_config(cfg)
+    draw = ImageDraw.Draw(image)
+    font_size_cfg = style.font_px(image.height)
+    font = style.font(image.height)
+    font_h = getattr(font, "size", font_size_cfg) if font is not None else font_size_cfg
+    box_color = style.box_color
+    box_thickness = style.box_thickness
+    pad_x, pad_y = style.pad_x, style.pad_y
 
-    # Load font (try DejaVuSans, fall back to default)
-    font = None
-    try:
-        if fm is not None:
-            font = ImageFont.truetype(fm.findfont("DejaVu Sans"), font_size_cfg)
-        else:
-            # try a generic truetype; fall back to default
-            font = ImageFont.load_default()
-    except Exception:
-        try:
-            font = ImageFont.load_default()
-        except Exception:
-            font = None
-
-    box_color = tuple(cfg.get("drawing", {}).get("box_color", DEFAULT_BOX_COLOR))
-    box_thickness = int(cfg.get("drawing", {}).get("box_thickness", DEFAULT_BOX_THICKNESS))
-    label_bg = tuple(cfg.get("drawing", {}).get("label_bg_color", DEFAULT_LABEL_BG_COLOR))
-    label_text = tuple(cfg.get("drawing", {}).get("label_text_color", DEFAULT_LABEL_TEXT_COLOR))
-
-    for b in boxes:
-        x0, y0, x1, y1 = map(int, b["xyxy"]) if isinstance(b["xyxy"], (list, tuple)) else map(int, b["xyxy"].tolist())
-        conf = b["conf"]
+    # one conversion per column; int() truncation as before
+    for (x0, y0, x1, y1), conf in zip(dets.xyxy.astype(np.int64).tolist(), dets.conf.tolist()):
         # rectangle
         try:
             draw.rectangle([x0, y0, x1, y1], outline=box_color, width=box_thickness)
@@ -85,57 +55,335 @@ def draw_boxes(image: Image.Image, boxes: List[dict], cfg: dict):
 
         label = f"person {conf:.2f}"
         # measure text width/height
-        if font is not None:
-            try:
-                tw = int(draw.textlength(label, font=font))
-            except Exception:
-                tw = int(len(label) * getattr(font, "size", font_size_cfg) * 0.6)
-            rows = label.count("\n") + 1
-            th = int(getattr(font, "size", font_size_cfg) * rows)
-        else:
-            tw = int(len(label) * font_size_cfg * 0.6)
-            rows = label.count("\n") + 1
-            th = int(font_size_cfg * rows)
+        tw = text_width(font, label, draw.fontmode) if font is not None else None
+        if tw is None:
+            tw = int(len(label) * font_h * 0.6)
+        rows = label.count("\n") + 1
+        th = int(font_h * rows)
 
-        padding = cfg.get("drawing", {}).get("label_padding", DEFAULT_LABEL_PADDING)
-        pad_x = int(padding[0]) if isinstance(padding, (list, tuple)) and len(padding) > 0 else 4
-        pad_y = int(padding[1]) if isinstance(padding, (list, tuple)) and len(padding) > 1 else 2
         label_y0 = max(0, y0 - th - pad_y * 2)
         label_x1 = x0 + tw + pad_x * 2
-        draw.rectangle([x0, label_y0, label_x1, y0], fill=label_bg)
-        draw.text((x0 + pad_x, label_y0 + pad_y), label, fill=label_text, font=font)
+        draw.rectangle([x0, label_y0, label_x1, y0], fill=style.label_bg)
+        draw.text((x0 + pad_x, label_y0 + pad_y), label, fill=style.label_text, font=font)
 
     return image
 
 
-def process_folder(model, inp: Path, out: Path, conf: float, device: str, imgsz: int, cfg: dict):
-    out.mkdir(parents=True, exist_ok=True)
-    imgs = sorted([p for p in inp.iterdir() if is_image(p)])
-    if not imgs:
+def load_for_inference(src: Union[Path, BinaryIO], imgsz: Optional[int] = None) -> Tuple[Image.Image, Tuple[int, int]]:
+    """Decode ``src`` to RGB for the model and return it with the original ``(width, height)``.
+
+    With ``imgsz``, JPEGs are decoded in PIL draft mode at the smallest DCT
+    scale (1/2, 1/4 or 1/8) whose longer side still covers ``imgsz``, which is
+    much faster and smaller than a full decode. Other formats decode fully.
+    """
+    im = Image.open(src)
+    full_size = im.size
+    if imgsz and im.format == "JPEG":
+        s = imgsz / max(full_size)
+        if s < 1:
+            im.draft("RGB", (math.ceil(full_size[0] * s), math.ceil(full_size[1] * s)))
+    return im.convert("RGB"), full_size
+
+
+def rescale_boxes(boxes, size: Tuple[int, int], full_size: Tuple[int, int]):
+    """Map boxes (``Detections`` or box dicts) detected on an image of ``size`` back onto ``full_size``."""
+    if size == full_size:
+        return boxes
+    return Detections.from_boxes(boxes).scaled(full_size[0] / size[0], full_size[1] / size[1])
+
+
+def _source(p: Union[Path, ArchiveMember]) -> Union[Path, BinaryIO]:
+    """What ``Image.open`` reads ``p`` from: the path, or the bytes of an archive member."""
+    return p.open() if isinstance(p, ArchiveMember) else p
+
+
+def _load_rgb(p: Union[Path, ArchiveMember], imgsz: Optional[int] = None):
+    """Decode ``p`` via ``load_for_inference``, or report and return None if it cannot be read."""
+    try:
+        return load_for_inference(_source(p), imgsz)
+    except Exception as e:
+        print(f"Skipping {p.name}: {e}")
+        return None
+
+
+def predict_batch(
+    model,
+    images: List[Image.Image],
+    conf: float,
+    device: str,
+    imgsz: int,
+    classes: Optional[Sequence[int]] = None,
+    rect: bool = False,
+):
+    """Run ``model.predict`` over ``images`` and return one result per image.
+
+    ultralytics only applies minimal (rectangular) letterboxing when every image
+    in a call has the same shape, so images are grouped by size to keep boxes
+    identical to the one-image-per-call path. With ``rect`` they are grouped by
+    ``rect_shape`` instead and each group runs at that ``(height, width)``, so
+    images of different sizes but the same bucket share a call with the same
+    resize and padding each would get alone. ``classes`` is passed on to
+    models whose ``predict`` accepts it.
+    """
+    extra = {"classes": list(classes)} if classes is not None and accepts_kwarg(model, "classes") else {}
+    groups = {}
+    for i, img in enumerate(images):
+        groups.setdefault(rect_shape(img.size, imgsz) if rect else img.size, []).append(i)
+    results = [None] * len(images)
+    for key, idxs in groups.items():
+        batch = [images[i] for i in idxs]
+        source = batch if len(batch) > 1 else batch[0]
+        size = key if rect else imgsz
+        preds = model.predict(source=source, device=device, imgsz=size, conf=conf, verbose=False, **extra)
+        for i, r in zip(idxs, preds):
+            results[i] = r
+    return results
+
+
+def _decode(p: Union[Path, ArchiveMember], imgsz: Optional[int] = None):
+    print("Processing", p.name)
+    return _load_rgb(p, imgsz)
+
+
+def _render_and_save(
+    pipeline: Pipeline,
+    img: Image.Image,
+    boxes: Detections,
+    src: Union[Path, ArchiveMember],
+    out_path: Path,
+    style: RenderStyle,
+    manifest: Optional[Manifest],
+    full_size: Optional[Tuple[int, int]] = None,
+    out_archive: Optional[ArchiveWriter] = None,
+):
+    with pipeline.stats["render"].measure():
+        if full_size is not None and img.size != full_size:
+            # inference ran on a draft decode; annotate the full-resolution image
+            img = Image.open(_source(src)).convert("RGB")
+        out_img = draw_boxes(img, boxes, style)
+    with pipeline.stats["encode"].measure():
+        if out_archive is not None:
+            buf = io.BytesIO()
+            out_img.save(buf, format=Image.registered_extensions()[out_path.suffix.lower()])
+            out_archive.add(str(out_path), buf.getvalue())
+        else:
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            out_img.save(out_path)
+    if manifest is not None:
+        manifest.record(src)
+    print(f"Saved {out_archive.path / out_path if out_archive is not None else out_path} ({len(boxes)} persons)")
+
+
+def process_folder(
+    model,
+    inp: Path,
+    out: Path,
+    conf: float,
+    device: str,
+    imgsz: int,
+    cfg: dict,
+    batch_size: int = 1,
+    files: Optional[List[Path]] = None,
+    manifest: Optional[Manifest] = None,
+    save_images: bool = True,
+    writer: Optional[DetectionWriter] = None,
+    metrics: Optional[Metrics] = None,
+    report: bool = True,
+    dedup: Optional[DedupIndex] = None,
+    out_archive: Optional[ArchiveWriter] = None,
+    pipeline: Optional[Pipeline] = None,
+):
+    """Detect people in every image of ``inp`` (or just ``files``) and save annotated copies to ``out``.
+
+    With a ``manifest``, images whose output is already current are skipped and
+    every saved image is recorded; the caller owns (and closes) the manifest.
+    Detections are also streamed to ``writer`` if given (the caller closes it),
+    and ``save_images=False`` skips drawing and encoding altogether. With
+    ``inference.draft_decode`` large JPEGs are decoded at reduced scale for the
+    model; boxes are mapped back to full resolution, which is only decoded when
+    an annotated image is saved. With ``tiling.enabled`` the model is wrapped in
+    a ``TiledModel`` (and draft decoding is skipped, since tiles need full detail).
+    Stage latencies and image/person/error counts are added to ``metrics``;
+    ``report=False`` skips printing the per-stage throughput table. A
+    ``pipeline`` passed in (watch mode keeps one for the whole run) is only
+    drained at the end, not closed.
+
+    With ``dedup.enabled`` (or a ``dedup`` index passed in, which callers such
+    as watch mode keep across calls) each decoded image is perceptually hashed;
+    an image within ``dedup.max_distance`` bits of a recently inferred one
+    reuses its detections, rescaled to its own size, instead of running the model.
+    With ``cascade.enabled`` the model is wrapped in a ``CascadeModel``, so
+    images without a candidate at ``cascade.imgsz`` skip the full-size pass.
+
+    With ``inference.rect_buckets`` images are queued per
+    aspect-ratio bucket (``rect_shape``) and each bucket is run ``batch_size``
+    at a time at its rectangular input shape, so a mixed portrait/landscape
+    folder still fills its batches. Results are put back in input order before
+    they are written or drawn. The report includes the padding this avoided.
+    Without buckets each batch is the next ``batch_size`` input files,
+    undecodable ones included.
+
+    ``inp`` may also be a zip or tar archive (see ``archive.ARCHIVE_SUFFIXES``):
+    its images are read in stored order, each only when the decode stage asks
+    for the next one, and decoded from memory without being extracted, so only
+    in-flight images are held. Outputs keep the members' paths inside the
+    archive, and the manifest is not used. With ``out_archive`` annotated
+    images are encoded in memory and added to that archive instead of ``out``.
+
+    Returns a summary dict with ``images``, ``persons``, ``skipped`` (undecodable),
+    ``unchanged``, ``deduplicated`` (inferences avoided) and ``wall`` (seconds) plus the per-stage ``stages``
+    statistics, the ``buckets`` ``BucketStats`` and the ``cascade`` ``CascadeStats`` (each None when
+    disabled), or None if there was nothing to process.
+    """
+    if out_archive is None:
+        out.mkdir(parents=True, exist_ok=True)
+    archive = files is None and is_archive(inp)
+    if archive:
+        imgs = iter_members(inp, IMAGE_SUFFIXES)
+        # members have no file on disk to check or record
+        manifest = None
+    else:
+        imgs = sorted(files) if files is not None else sorted([p for p in inp.iterdir() if is_image(p)])
+        if not imgs:
+            print("No images in", inp)
+            return
+    summary = {"images": 0, "persons": 0, "skipped": 0, "unchanged": 0, "deduplicated": 0}
+    if manifest is not None:
+        pending = [p for p in imgs if not manifest.is_current(p)]
+        summary["unchanged"] = len(imgs) - len(pending)
+        if summary["unchanged"]:
+            print(f"Skipping {summary['unchanged']} unchanged images")
+        imgs = pending
+    batch_size = max(1, int(batch_size))
+    metrics = metrics if metrics is not None else Metrics(enabled=False)
+    own_pipeline = pipeline is None
+    if own_pipeline:
+        pipeline = Pipeline.from_config(cfg, metrics)
+    style = RenderStyle.from_config(cfg)
+    model = maybe_cascaded(maybe_tiled(model, cfg), cfg)
+    draft = cfg.get("inference", {}).get("draft_decode", DEFAULT_INFERENCE_DRAFT_DECODE) and not tiling_enabled(cfg)
+    draft_imgsz = imgsz if draft else None
+    post = PostProcess.from_config(cfg, conf)
+    dedup = dedup if dedup is not None else DedupIndex.from_config(cfg)
+    rect = buckets_enabled(cfg)
+    bucket_stats = BucketStats(imgsz) if rect else None
+    cascade_stats = model.stats if isinstance(model, CascadeModel) else None
+
+    def decode(p):
+        decoded = _decode(p, draft_imgsz)
+        if decoded is None or dedup is None:
+            return decoded
+        # hash on the decode workers, from the (possibly draft) decoded image
+        return (*decoded, dhash(decoded[0]))
+
+    ready = {}  # input position -> finished (path, image, full_size, boxes)
+    position = {"decoded": 0, "emitted": 0}
+
+    def emit(i, p, img, full_size, boxes):
+        # buckets finish out of order; outputs follow the input order
+        ready[i] = (p, img, full_size, boxes)
+        while position["emitted"] in ready:
+            output(*ready.pop(position["emitted"]))
+            position["emitted"] += 1
+
+    def output(p, img, full_size, boxes):
+        summary["images"] += 1
+        summary["persons"] += len(boxes)
+        metrics.inc("images")
+        metrics.inc("persons", len(boxes))
+        if writer is not None:
+            writer.write(p.name, full_size, boxes)
+        if save_images:
+            dest = PurePosixPath(p.name) if out_archive is not None else out / p.name
+            pipeline.submit_encode(
+                _render_and_save, pipeline, img, boxes, p, dest, style, manifest, full_size, out_archive
+            )
+        else:
+            print(f"Detected {len(boxes)} persons in {p.name}")
+
+    def infer(batch):
+        # items are (input position, path, image, full_size, dedup entry); all share one bucket when rect is on
+        with pipeline.stats["infer"].measure(len(batch)):
+            results = predict_batch(model, [item[2] for item in batch], conf, device, imgsz, post.classes, rect)
+        if bucket_stats is not None:
+            bucket_stats.add(item[2].size for item in batch)
+        for (i, p, img, full_size, entry), r in zip(batch, results):
+            boxes = post(r, img.size, full_size)
+            if entry is not None:
+                entry.boxes = boxes
+            emit(i, p, img, full_size, boxes)
+
+    def emit_reused(i, p, img, full_size, entry):
+        print(f"{p.name} is a near-duplicate of {entry.name}, reusing its detections")
+        emit(i, p, img, full_size, rescale_boxes(entry.boxes, entry.size, full_size))
+
+    buckets = {}  # rect_shape (or None) -> queued items
+    waiting = []  # near-duplicates of images still queued
+
+    def flush(key):
+        infer(buckets.pop(key))
+        still = []
+        for item in waiting:
+            if item[4].boxes is not None:
+                emit_reused(*item)
+            else:
+                still.append(item)
+        waiting[:] = still
+
+    def admit(p, img, full_size, *h):
+        i = position["decoded"]
+        position["decoded"] += 1
+        entry = dedup.match(h[0], full_size) if dedup is not None else None
+        if entry is not None:
+            summary["deduplicated"] += 1
+            metrics.inc("deduplicated")
+            if entry.boxes is not None:
+                emit_reused(i, p, img, full_size, entry)
+            else:
+                waiting.append((i, p, img, full_size, entry))
+            return
+        if dedup is not None:
+            entry = dedup.add(h[0], full_size, p.name)
+        key = rect_shape(img.size, imgsz) if rect else None
+        queue = buckets.setdefault(key, [])
+        queue.append((i, p, img, full_size, entry))
+        if rect and len(queue) == batch_size:
+            flush(key)
+        # queued images, waiting duplicates and results held back for ordering all keep
+        # decoded images: bound them by running the fullest bucket early
+        while buckets and sum(map(len, buckets.values())) + len(waiting) + len(ready) >= 2 * batch_size:
+            flush(max(buckets, key=lambda k: len(buckets[k])))
+
+    try:
+        for n, (p, decoded) in enumerate(pipeline.decode(decode, imgs), 1):
+            if decoded is None:
+                summary["skipped"] += 1
+                metrics.inc("errors")
+            else:
+                admit(p, *decoded)
+            # without buckets a batch covers batch_size input files, also when some of them cannot be decoded
+            if not rect and n % batch_size == 0 and buckets:
+                flush(None)
+        while buckets:
+            flush(next(iter(buckets)))
+    finally:
+        if own_pipeline:
+            pipeline.close()
+        else:
+            pipeline.drain()
+    if archive and not (summary["images"] or summary["skipped"]):
         print("No images in", inp)
         return
-    for p in imgs:
-        print("Processing", p.name)
-        img = Image.open(p).convert("RGB")
-        results = model.predict(source=img, device=device, imgsz=imgsz, conf=conf, verbose=False)
-        r = results[0]
-        boxes = []
-        if hasattr(r, "boxes") and r.boxes is not None:
-            # Support both ultralytics Boxes (with .xyxy/.conf/.cls that implement
-            # .tolist()) and simple containers where those attributes are plain lists.
-            raw_xyxy = r.boxes.xyxy
-            raw_conf = r.boxes.conf
-            raw_cls = r.boxes.cls
-
-            xyxy = raw_xyxy.tolist() if hasattr(raw_xyxy, "tolist") else raw_xyxy
-            confs = raw_conf.tolist() if hasattr(raw_conf, "tolist") else raw_conf
-            clss = raw_cls.tolist() if hasattr(raw_cls, "tolist") else raw_cls
-
-            if xyxy and len(xyxy) > 0:
-                for xy, c, cls in zip(xyxy, confs, clss):
-                    if int(cls) == 0:  # COCO person class
-                        boxes.append({"xyxy": xy, "conf": float(c), "class": int(cls)})
-        out_img = draw_boxes(img, boxes, cfg)
-        out_path = out / p.name
-        out_img.save(out_path)
-        print(f"Saved {out_path} ({len(boxes)} persons)")
+    if report:
+        print(pipeline.report())
+        if summary["deduplicated"]:
+            print(f"Near-duplicates: {summary['deduplicated']} inferences avoided")
+        if bucket_stats is not None and bucket_stats.images:
+            print(bucket_stats.report())
+        if cascade_stats is not None and cascade_stats.images:
+            print(cascade_stats.report())
+    summary["wall"] = pipeline.wall
+    summary["stages"] = pipeline.stats
+    summary["buckets"] = bucket_stats
+    summary["cascade"] = cascade_stats
+    return summary
@@ -0,0 +1,118 @@
+"""Output image encoding: format choice and per-format options for annotated images."""
+
+import io
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from .constants import (
+    DEFAULT_ENCODING_FORMAT,
+    DEFAULT_ENCODING_JPEG_QUALITY,
+    DEFAULT_ENCODING_PNG_COMPRESS_LEVEL,
+    DEFAULT_ENCODING_WEBP_QUALITY,
+    DEFAULT_ENCODING_WEBP_LOSSLESS,
+    DEFAULT_ENCODING_WEBP_METHOD,
+)
+
+# PIL format name -> (file extension, mimetype)
+FORMATS = {
+    "JPEG": ("jpg", "image/jpeg"),
+    "PNG": ("png", "image/png"),
+    "WEBP": ("webp", "image/webp"),
+}
+_ALIASES = {"JPG": "JPEG"}
+
+
+def _normalise(fmt: Optional[str]) -> Optional[str]:
+    if not fmt:
+        return None
+    fmt = str(fmt).upper()
+    return _ALIASES.get(fmt, fmt)
+
+
+class EncodeOptions:
+    """The ``encoding`` config section parsed once, for reuse across images.
+
+    ``format`` is ``source`` (keep the input's format when it is JPEG, PNG or
+    WebP, PNG otherwise) or one of ``jpeg`` / ``png`` / ``webp``.
+    """
+
+    def __init__(
+        self,
+        format: str = DEFAULT_ENCODING_FORMAT,
+        jpeg_quality: int = DEFAULT_ENCODING_JPEG_QUALITY,
+        png_compress_level: int = DEFAULT_ENCODING_PNG_COMPRESS_LEVEL,
+        webp_quality: int = DEFAULT_ENCODING_WEBP_QUALITY,
+        webp_lossless: bool = DEFAULT_ENCODING_WEBP_LOSSLESS,
+        webp_method: int = DEFAULT_ENCODING_WEBP_METHOD,
+    ):
+        fixed = None if str(format).lower() == "source" else _normalise(format)
+        if fixed is not None and fixed not in FORMATS:
+            raise ValueError(f"Unknown output format {format!r}; expected source, jpeg, png or webp")
+        self.format = fixed
+        self.jpeg_quality = int(jpeg_quality)
+        self.png_compress_level = int(png_compress_level)
+        self.webp_quality = int(webp_quality)
+        self.webp_lossless = bool(webp_lossless)
+        self.webp_method = int(webp_method)
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "EncodeOptions":
+        section = cfg.get("encoding", {}) or {}
+        return cls(
+            format=section.get("format", DEFAULT_ENCODING_FORMAT),
+            jpeg_quality=section.get("jpeg_quality", DEFAULT_ENCODING_JPEG_QUALITY),
+            png_compress_level=section.get("png_compress_level", DEFAULT_ENCODING_PNG_COMPRESS_LEVEL),
+            webp_quality=section.get("webp_quality", DEFAULT_ENCODING_WEBP_QUALITY),
+            webp_lossless=section.get("webp_lossless", DEFAULT_ENCODING_WEBP_LOSSLESS),
+            webp_method=section.get("webp_method", DEFAULT_ENCODING_WEBP_METHOD),
+        )
+
+    def resolve(self, source_format: Optional[str] = None) -> str:
+        """PIL format name used for an input of ``source_format``."""
+        if self.format is not None:
+            return self.format
+        fmt = _normalise(source_format)
+        return fmt if fmt in FORMATS else "PNG"
+
+    def save_kwargs(self, fmt: str) -> dict:
+        if fmt == "JPEG":
+            return {"quality": self.jpeg_quality}
+        if fmt == "PNG":
+            return {"compress_level": self.png_compress_level}
+        return {"quality": self.webp_quality, "lossless": self.webp_lossless, "method": self.webp_method}
+
+    def identity(self, fmt: str) -> list:
+        """Everything that changes the encoded bytes for ``fmt``, for cache keys."""
+        return [fmt, self.save_kwargs(fmt)]
+
+    def encode(self, img: Image.Image, fmt: str) -> bytes:
+        bio = io.BytesIO()
+        if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.save(bio, format=fmt, **self.save_kwargs(fmt))
+        return bio.getvalue()
+
+
+def source_format(src) -> Optional[str]:
+    """PIL format of ``src``: from the extension for a path, else from the header of a file object."""
+    if isinstance(src, (str, Path)):
+        return Image.registered_extensions().get(Path(src).suffix.lower())
+    try:
+        pos = src.tell()
+        with Image.open(src) as im:
+            fmt = im.format
+        src.seek(pos)
+        return fmt
+    except Exception:
+        return None
+
+
+def output_name(name: str, fmt: str) -> str:
+    """``name`` with its extension replaced by the one of ``fmt`` unless it already matches."""
+    ext, _ = FORMATS[fmt]
+    stem, dot, suffix = name.rpartition(".")
+    if dot and _normalise(suffix) == fmt:
+        return name
+    return f"{stem if dot else name}.{ext}"
@@ -0,0 +1,71 @@
+"""Cached directory index and thumbnails for the web UI's input browser."""
+
+import io
+import os
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+from .constants import DEFAULT_WEB_PAGE_SIZE, DEFAULT_WEB_THUMBNAIL_PX
+from .detection import IMAGE_SUFFIXES
+
+
+class DirectoryIndex:
+    """Sorted image names of ``folder``, rebuilt only when the folder's mtime changes.
+
+    Adding, removing or renaming a file updates the directory mtime, so each
+    lookup costs one ``stat`` of the folder; the listing itself uses
+    ``os.scandir``, whose entries know their type without a per-file stat.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = Path(folder)
+        self.rebuilds = 0
+        self._names: List[str] = []
+        self._mtime: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def names(self) -> List[str]:
+        try:
+            mtime = os.stat(self.folder).st_mtime_ns
+        except OSError:
+            return []
+        with self._lock:
+            if mtime != self._mtime:
+                with os.scandir(self.folder) as it:
+                    names = [
+                        e.name
+                        for e in it
+                        if os.path.splitext(e.name)[1].lower() in IMAGE_SUFFIXES and e.is_file()
+                    ]
+                names.sort()
+                self._names, self._mtime = names, mtime
+                self.rebuilds += 1
+            return self._names
+
+    def page(self, prefix: str = "", page: int = 1, per_page: int = DEFAULT_WEB_PAGE_SIZE) -> Tuple[List[str], int]:
+        """Names starting with ``prefix`` on 1-based ``page``, and how many names match in total."""
+        names = self.names()
+        lo, hi = 0, len(names)
+        if prefix:
+            # names are sorted, so the matches are one contiguous run
+            lo = bisect_left(names, prefix)
+            hi = bisect_left(names, prefix + "\U0010ffff", lo)
+        per_page = max(1, int(per_page))
+        start = lo + (max(1, int(page)) - 1) * per_page
+        return names[start : min(start + per_page, hi)], hi - lo
+
+
+def make_thumbnail(src, px: int = DEFAULT_WEB_THUMBNAIL_PX, quality: int = 80) -> bytes:
+    """JPEG thumbnail of the image ``src`` (path or file object) fitting in ``px`` x ``px``."""
+    with Image.open(src) as im:
+        # JPEGs decode straight at a reduced DCT scale
+        im.draft("RGB", (px, px))
+        im = im.convert("RGB")
+        im.thumbnail((px, px))
+    bio = io.BytesIO()
+    im.save(bio, format="JPEG", quality=quality)
+    return bio.getvalue()
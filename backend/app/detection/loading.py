@@ -0,0 +1,114 @@
+"""Model loading with a cached pre-fused snapshot, warm-up and startup timing."""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from .manifest import file_sha256
+
+
+class StartupProfile:
+    """Named wall-clock phases of process start-up, printed by ``--startup-profile``."""
+
+    def __init__(self, enabled: bool = False, t0: Optional[float] = None):
+        self.enabled = enabled
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self.phases = []
+
+    def add(self, name: str, seconds: float):
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t)
+
+    def report(self) -> str:
+        total = time.perf_counter() - self.t0
+        lines = [f"Startup profile (total {total:.3f}s):"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<20} {seconds:8.3f}s  {100 * seconds / total if total else 0:5.1f}%")
+        return "\n".join(lines)
+
+
+def snapshot_path(model_path: Path) -> Path:
+    """Where the fused snapshot of ``model_path`` lives; the name pins the source weights."""
+    model_path = Path(model_path)
+    return model_path.with_name(f"{model_path.stem}.fused-{file_sha256(model_path)[:12]}.pt")
+
+
+def _write_snapshot(yolo, dest: Path):
+    import torch
+
+    # keep fp32 (unlike YOLO.save, which halves) so results match fusing at load time
+    ckpt = dict(getattr(yolo, "ckpt", None) or {})
+    ckpt.update({"model": yolo.model.float(), "ema": None, "optimizer": None})
+    tmp = dest.with_name(f"{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        torch.save(ckpt, tmp)
+        os.replace(tmp, dest)
+    except OSError as e:
+        tmp.unlink(missing_ok=True)
+        print(f"Could not write fused model snapshot {dest}: {e}")
+
+
+def load_model(model_path: Path, fused_snapshot: bool = True, backend: str = "torch"):
+    """Load a YOLO model, preferring (and otherwise creating) a pre-fused snapshot.
+
+    ultralytics fuses Conv+BatchNorm layers on first use; doing that once and
+    caching the result next to the weights takes it off every later start-up.
+    The snapshot is keyed by the source file's hash, so new weights rebuild it.
+    ``backend="onnx"`` instead returns an ``OnnxBackend`` over an exported copy,
+    and ``backend="onnx-int8"`` one over an INT8-quantized copy of that export.
+    """
+    if backend in ("onnx", "onnx-int8"):
+        from .backends import OnnxBackend
+
+        return OnnxBackend.from_weights(model_path, int8=backend == "onnx-int8")
+    if backend != "torch":
+        raise ValueError(f"Unknown inference backend: {backend!r}")
+
+    from ultralytics import YOLO
+
+    if not fused_snapshot:
+        return YOLO(str(model_path))
+    try:
+        snap = snapshot_path(model_path)
+    except OSError:
+        return YOLO(str(model_path))
+    if snap.exists():
+        try:
+            return YOLO(str(snap))
+        except Exception as e:
+            print(f"Ignoring unreadable fused model snapshot {snap}: {e}")
+    model = YOLO(str(model_path))
+    try:
+        model.fuse()
+    except Exception:
+        return model
+    _write_snapshot(model, snap)
+    return model
+
+
+def pin_threads(threads: int):
+    """Limit this process's torch (and OpenMP) intra-op threads to ``threads``."""
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def warm_up(model, device: str, imgsz: int):
+    """Run one throwaway inference so the first real request does not pay for lazy set-up."""
+    from PIL import Image
+
+    model.predict(source=Image.new("RGB", (imgsz, imgsz)), device=device, imgsz=imgsz, verbose=False)
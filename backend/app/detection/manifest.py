@@ -0,0 +1,118 @@
+"""Per-output-folder manifest used to skip images that were already processed."""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+MANIFEST_NAME = ".manifest.jsonl"
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def model_identity(model_path: Path, backend: str = "torch") -> str:
+    """Name plus content hash of the model file, so retrained weights invalidate old results.
+
+    Non-default backends are appended: their boxes can differ in the last digits.
+    """
+    suffix = "" if backend == "torch" else f":{backend}"
+    try:
+        return f"{Path(model_path).name}:{file_sha256(model_path)[:16]}{suffix}"
+    except OSError:
+        return Path(model_path).name + suffix
+
+
+def manifest_key(model_id: str, conf: float, imgsz: int, cfg: dict) -> str:
+    """Hash of everything besides the input bytes that changes an annotated output."""
+    payload = {"model": model_id, "conf": conf, "imgsz": imgsz, "drawing": cfg.get("drawing", {})}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class Manifest:
+    """Append-only JSONL record of the inputs whose outputs in ``out`` are current.
+
+    A line is appended (and flushed) only after an output has been saved, so an
+    interrupted run resumes from the last completed image. Lookups compare
+    size/mtime first and fall back to the content hash only when the mtime
+    changed, which keeps re-runs over large, unchanged folders cheap.
+    """
+
+    def __init__(self, out: Path, key: str, entries: Optional[Dict[str, dict]] = None):
+        self.out = out
+        self.path = out / MANIFEST_NAME
+        self.key = key
+        self.entries = entries if entries is not None else {}
+        self._hashes = {}
+        self._lock = threading.Lock()
+        self._fh = None
+
+    @classmethod
+    def open(cls, out: Path, key: str) -> "Manifest":
+        entries = {}
+        try:
+            with open(out / MANIFEST_NAME, "r") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                        entries[e["name"]] = e
+                    except (ValueError, KeyError, TypeError):
+                        # a torn last line from an interrupted run
+                        continue
+        except FileNotFoundError:
+            pass
+        return cls(out, key, entries)
+
+    def is_current(self, p: Path) -> bool:
+        e = self.entries.get(p.name)
+        if e is None or e.get("key") != self.key or not (self.out / p.name).exists():
+            return False
+        st = p.stat()
+        if e["size"] != st.st_size:
+            return False
+        if e["mtime_ns"] == st.st_mtime_ns:
+            return True
+        digest = file_sha256(p)
+        self._hashes[p.name] = (st.st_size, st.st_mtime_ns, digest)
+        if digest != e["sha256"]:
+            return False
+        # touched but unchanged: refresh the stat so the next run takes the fast path
+        self.record(p)
+        return True
+
+    def record(self, p: Path):
+        st = p.stat()
+        cached = self._hashes.pop(p.name, None)
+        if cached is not None and cached[:2] == (st.st_size, st.st_mtime_ns):
+            digest = cached[2]
+        else:
+            digest = file_sha256(p)
+        entry = {"name": p.name, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest, "key": self.key}
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            if self._fh is None:
+                self.out.mkdir(parents=True, exist_ok=True)
+                self._fh = open(self.path, "a")
+            self._fh.write(line)
+            self._fh.flush()
+            self.entries[p.name] = entry
+
+    def close(self, compact: bool = True):
+        """Close the append handle and, if ``compact``, rewrite one line per image."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if compact and self.entries:
+                tmp = self.path.with_suffix(".tmp")
+                with open(tmp, "w") as f:
+                    for name in sorted(self.entries):
+                        f.write(json.dumps(self.entries[name]) + "\n")
+                os.replace(tmp, self.path)
@@ -0,0 +1,158 @@
+"""Latency histograms and counters for the hot path, exported as Prometheus text."""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Callable, Dict, Optional, Sequence
+
+from .constants import DEFAULT_METRICS_ENABLED
+
+# seconds; the same buckets serve millisecond decodes and multi-second predicts
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNTERS = ("images", "persons", "errors")
+_NULL = nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (not thread-safe; ``Metrics`` holds the lock)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lo = self.buckets[i - 1] if i else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lo + (hi - lo) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "t0")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.t0)
+        return False
+
+
+class Metrics:
+    """Per-stage latency histograms plus ``images`` / ``persons`` / ``errors`` counters.
+
+    When ``enabled`` is False every method returns immediately and ``time()``
+    hands back a shared no-op context manager, so instrumented code pays only
+    an attribute lookup and a call.
+    """
+
+    def __init__(self, enabled: bool = DEFAULT_METRICS_ENABLED, prefix: str = "detector"):
+        self.enabled = bool(enabled)
+        self.prefix = prefix
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "Metrics":
+        return cls((cfg.get("metrics", {}) or {}).get("enabled", DEFAULT_METRICS_ENABLED))
+
+    def time(self, stage: str):
+        """Context manager recording the duration of its block under ``stage``."""
+        return _Timer(self, stage) if self.enabled else _NULL
+
+    def observe(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = Histogram()
+            hist.observe(seconds)
+
+    def observer(self, stage: str) -> Optional[Callable[[float], None]]:
+        """``observe`` bound to ``stage``, or None when disabled (for ``StageStats``)."""
+        return (lambda seconds: self.observe(stage, seconds)) if self.enabled else None
+
+    def inc(self, name: str, n: int = 1):
+        if not self.enabled or not n:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        """Plain-data copy that can be pickled (e.g. back from a worker process) and ``merge``d."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {k: (h.buckets, list(h.counts), h.sum, h.count) for k, h in self.histograms.items()},
+            }
+
+    def merge(self, snapshot: dict):
+        if not self.enabled:
+            return
+        with self._lock:
+            for name, n in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            for stage, (buckets, counts, total, count) in snapshot["histograms"].items():
+                hist = self.histograms.get(stage)
+                if hist is None:
+                    hist = self.histograms[stage] = Histogram(buckets)
+                hist.counts = [a + b for a, b in zip(hist.counts, counts)]
+                hist.sum += total
+                hist.count += count
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_stage_seconds Time spent in each processing stage.",
+            f"# TYPE {p}_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage in sorted(self.histograms):
+                h = self.histograms[stage]
+                cumulative = 0
+                for le, n in zip([*map(repr, h.buckets), "+Inf"], h.counts):
+                    cumulative += n
+                    lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {h.sum!r}')
+                lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            for name in sorted(self.counters):
+                lines.append(f"# HELP {p}_{name}_total Number of {name} seen.")
+                lines.append(f"# TYPE {p}_{name}_total counter")
+                lines.append(f"{p}_{name}_total {self.counters[name]}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Human-readable end-of-run table of stage latencies and counters."""
+        lines = ["Latency per stage call (ms):", f"  {'stage':<8} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9}"]
+        with self._lock:
+            for stage in sorted(self.histograms):
+                h = self.histograms[stage]
+                mean = 1000 * h.sum / h.count if h.count else 0.0
+                p50, p95 = (1000 * (h.quantile(q) or 0.0) for q in (0.5, 0.95))
+                lines.append(f"  {stage:<8} {h.count:>7} {mean:9.2f} {p50:9.2f} {p95:9.2f}")
+            lines.append("  " + ", ".join(f"{name}: {n}" for name, n in sorted(self.counters.items())))
+        return "\n".join(lines)
@@ -0,0 +1,183 @@
+"""Staged decode -> infer -> render -> encode execution for process_folder."""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+from .constants import (
+    DEFAULT_PIPELINE_DECODE_WORKERS,
+    DEFAULT_PIPELINE_ENCODE_WORKERS,
+    DEFAULT_PIPELINE_QUEUE_DEPTH,
+)
+from .metrics import Metrics
+
+STAGES = ("decode", "infer", "render", "encode")
+
+
+class StageStats:
+    """Busy time and item count accumulated by one pipeline stage."""
+
+    def __init__(self, name: str, workers: int = 1, observe: Optional[Callable[[float], None]] = None):
+        self.name = name
+        self.workers = max(1, workers)
+        self.observe = observe
+        self.items = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float, items: int = 1):
+        with self._lock:
+            self.busy += seconds
+            self.items += items
+        if self.observe is not None:
+            self.observe(seconds)
+
+    @contextmanager
+    def measure(self, items: int = 1):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(time.perf_counter() - t0, items)
+
+    @property
+    def capacity(self) -> float:
+        """Items/sec this stage could sustain with all of its workers busy."""
+        return self.items * self.workers / self.busy if self.busy > 0 else 0.0
+
+
+class Pipeline:
+    """Thread pools, bounded queues and per-stage statistics for one run.
+
+    Decoding runs up to ``queue_depth`` images ahead of inference and at most
+    ``queue_depth`` rendered images wait for encoding; when a queue is full the
+    inference loop blocks, which keeps memory bounded. A stage with 0 workers
+    runs inline on the calling thread, which is the plain sequential path.
+    Each stage timing is also recorded in ``metrics`` when one is given.
+
+    ``wall`` is measured from the first ``decode`` or ``submit_encode`` of a
+    run to the ``drain`` (or ``close``) that ends it, so a pipeline kept across
+    runs (watch mode) does not count the idle time in between.
+    """
+
+    def __init__(
+        self,
+        decode_workers: int = DEFAULT_PIPELINE_DECODE_WORKERS,
+        encode_workers: int = DEFAULT_PIPELINE_ENCODE_WORKERS,
+        queue_depth: int = DEFAULT_PIPELINE_QUEUE_DEPTH,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.queue_depth = max(1, int(queue_depth))
+        decode_workers = max(0, int(decode_workers))
+        encode_workers = max(0, int(encode_workers))
+        obs = metrics.observer if metrics is not None else (lambda stage: None)
+        self.stats = {
+            "decode": StageStats("decode", decode_workers, obs("decode")),
+            "infer": StageStats("infer", 1, obs("infer")),
+            "render": StageStats("render", encode_workers, obs("render")),
+            "encode": StageStats("encode", encode_workers, obs("encode")),
+        }
+        self._decode_pool = (
+            ThreadPoolExecutor(decode_workers, thread_name_prefix="decode") if decode_workers else None
+        )
+        self._encode_pool = (
+            ThreadPoolExecutor(encode_workers, thread_name_prefix="encode") if encode_workers else None
+        )
+        self._pending = deque()
+        self._t0 = time.perf_counter()
+        self._running = False
+        self.wall = 0.0
+
+    @classmethod
+    def from_config(cls, cfg: dict, metrics: Optional[Metrics] = None) -> "Pipeline":
+        section = cfg.get("pipeline", {}) or {}
+        return cls(
+            decode_workers=section.get("decode_workers", DEFAULT_PIPELINE_DECODE_WORKERS),
+            encode_workers=section.get("encode_workers", DEFAULT_PIPELINE_ENCODE_WORKERS),
+            queue_depth=section.get("queue_depth", DEFAULT_PIPELINE_QUEUE_DEPTH),
+            metrics=metrics,
+        )
+
+    @property
+    def staged(self) -> bool:
+        return self._decode_pool is not None or self._encode_pool is not None
+
+    def _start(self):
+        if not self._running:
+            self._t0 = time.perf_counter()
+            self._running = True
+
+    def _stop(self):
+        self.wall = time.perf_counter() - self._t0
+        self._running = False
+
+    def decode(self, fn: Callable, items: Iterable) -> Iterator[Tuple[object, object]]:
+        """Yield ``(item, fn(item))`` in input order, timing ``fn`` as the decode stage."""
+        self._start()
+
+        def run(item):
+            with self.stats["decode"].measure():
+                return fn(item)
+
+        if self._decode_pool is None:
+            for item in items:
+                yield item, run(item)
+            return
+        ahead = deque()
+        it = iter(items)
+        for item in it:
+            ahead.append((item, self._decode_pool.submit(run, item)))
+            if len(ahead) >= self.queue_depth:
+                break
+        while ahead:
+            item, fut = ahead.popleft()
+            nxt = next(it, None)
+            if nxt is not None:
+                ahead.append((nxt, self._decode_pool.submit(run, nxt)))
+            yield item, fut.result()
+
+    def submit_encode(self, fn: Callable, *args):
+        """Run ``fn(*args)`` on the encode pool, blocking while ``queue_depth`` jobs are queued."""
+        self._start()
+        if self._encode_pool is None:
+            fn(*args)
+            return
+        while len(self._pending) >= self.queue_depth:
+            self._pending.popleft().result()
+        self._pending.append(self._encode_pool.submit(fn, *args))
+
+    def drain(self):
+        """Wait for all queued encodes and record wall time; re-raises the first encode that failed."""
+        error = None
+        while self._pending:
+            try:
+                self._pending.popleft().result()
+            except Exception as e:
+                error = error or e
+        self._stop()
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Wait for queued encodes, shut the pools down and record wall time."""
+        try:
+            self.drain()
+        finally:
+            for pool in (self._decode_pool, self._encode_pool):
+                if pool is not None:
+                    pool.shutdown(wait=True, cancel_futures=True)
+            if self._running:
+                self._stop()
+
+    def report(self) -> str:
+        lines = [f"Stage throughput (wall {self.wall:.2f}s):"]
+        for name in STAGES:
+            s = self.stats[name]
+            lines.append(
+                f"  {name:<7} {s.items:>6} items  busy {s.busy:7.2f}s  "
+                f"x{s.workers} workers  {s.capacity:8.1f} img/s"
+            )
+        return "\n".join(lines)
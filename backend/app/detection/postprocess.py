@@ -0,0 +1,168 @@
+"""Turn raw model results into person detections with NumPy, shared by every mode."""
+
+import inspect
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .constants import DEFAULT_INFERENCE_MAX_DET, DEFAULT_INFERENCE_MIN_BOX_AREA
+
+PERSON_CLASS = 0  # COCO
+
+
+def _floats(x) -> np.ndarray:
+    # torch tensors (possibly on a GPU) and plain lists alike, in one conversion;
+    # float32 model outputs stay float32, Python floats keep their exact value
+    if hasattr(x, "cpu"):
+        x = x.cpu().numpy()
+    a = np.asarray(x)
+    return a if a.dtype.kind == "f" else a.astype(np.float64)
+
+
+def result_arrays(r) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``(xyxy, conf, cls)`` NumPy arrays from an ultralytics-style result (empty if it has no boxes)."""
+    boxes = getattr(r, "boxes", None)
+    if boxes is None or len(boxes.conf) == 0:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int16)
+    data = getattr(boxes, "data", None)
+    if data is not None and getattr(data, "shape", (0, 0))[-1] == 6:
+        # ultralytics Boxes: one (N, 6) x0 y0 x1 y1 conf cls tensor, converted once
+        a = _floats(data)
+        return a[:, :4], a[:, 4], a[:, 5].astype(np.int16)
+    return (
+        _floats(boxes.xyxy).reshape(-1, 4),
+        _floats(boxes.conf).reshape(-1),
+        _floats(boxes.cls).reshape(-1).astype(np.int16),
+    )
+
+
+class Detections:
+    """Boxes of one image as parallel arrays: ``xyxy`` (N, 4) and ``conf`` (N,) floats, ``cls`` (N,) int16.
+
+    Indexing with an int gives the ``{"xyxy", "conf", "class"}`` dict used
+    throughout the app, and iterating yields those dicts, so code written for
+    lists of box dicts keeps working. ``to_list()`` converts all boxes with
+    one ``tolist()`` per column (for JSON); masks and slices give another
+    ``Detections``. Comparing with a list of box dicts compares the boxes.
+    """
+
+    __slots__ = ("xyxy", "conf", "cls")
+
+    def __init__(self, xyxy=None, conf=None, cls=None):
+        self.xyxy = np.zeros((0, 4), np.float32) if xyxy is None else _floats(xyxy).reshape(-1, 4)
+        self.conf = np.zeros(0, np.float32) if conf is None else _floats(conf).reshape(-1)
+        self.cls = np.zeros(len(self.conf), np.int16) if cls is None else np.asarray(cls).astype(np.int16).reshape(-1)
+
+    @classmethod
+    def from_boxes(cls, boxes: Union["Detections", Iterable[dict], None]) -> "Detections":
+        """``boxes`` as ``Detections`` (returned as is if it already is one)."""
+        if isinstance(boxes, Detections):
+            return boxes
+        boxes = list(boxes or [])
+        return cls(
+            [b["xyxy"] for b in boxes] if boxes else None,
+            [b["conf"] for b in boxes] if boxes else None,
+            [b.get("class", PERSON_CLASS) for b in boxes] if boxes else None,
+        )
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return {"xyxy": self.xyxy[i].tolist(), "conf": float(self.conf[i]), "class": int(self.cls[i])}
+        return Detections(self.xyxy[i], self.conf[i], self.cls[i])
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __eq__(self, other):
+        if isinstance(other, Detections):
+            other = other.to_list()
+        return isinstance(other, list) and self.to_list() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Detections({self.to_list()!r})"
+
+    def to_list(self) -> List[dict]:
+        return [
+            {"xyxy": xy, "conf": c, "class": k}
+            for xy, c, k in zip(self.xyxy.tolist(), self.conf.tolist(), self.cls.tolist())
+        ]
+
+    def scaled(self, sx: float, sy: float) -> "Detections":
+        return Detections(self.xyxy * np.array([sx, sy, sx, sy], self.xyxy.dtype), self.conf, self.cls)
+
+    def areas(self) -> np.ndarray:
+        return (self.xyxy[:, 2] - self.xyxy[:, 0]).clip(0) * (self.xyxy[:, 3] - self.xyxy[:, 1]).clip(0)
+
+
+def accepts_kwarg(model, name: str) -> bool:
+    """Whether ``model.predict`` takes keyword ``name`` (or any ``**kwargs``, as ultralytics does)."""
+    try:
+        params = inspect.signature(model.predict).parameters.values()
+    except (AttributeError, TypeError, ValueError):
+        return False
+    return any(p.kind is p.VAR_KEYWORD or p.name == name for p in params)
+
+
+class PostProcess:
+    """Keep the person boxes of a model result, with array masks instead of a per-box loop.
+
+    ``classes`` is also handed to models that accept it (see ``predict_batch``),
+    so ultralytics drops other classes before NMS; the masks here still apply
+    to models that ignore it. Boxes under ``conf``, smaller than ``min_area``
+    px² (measured in the original image) or beyond the ``max_det`` most
+    confident are dropped.
+    """
+
+    def __init__(
+        self,
+        classes: Optional[Sequence[int]] = (PERSON_CLASS,),
+        conf: Optional[float] = None,
+        min_area: float = DEFAULT_INFERENCE_MIN_BOX_AREA,
+        max_det: Optional[int] = DEFAULT_INFERENCE_MAX_DET,
+    ):
+        self.classes = None if classes is None else [int(c) for c in classes]
+        self.conf = conf
+        self.min_area = float(min_area or 0)
+        self.max_det = int(max_det) if max_det else None
+
+    @classmethod
+    def from_config(cls, cfg: dict, conf: Optional[float] = None) -> "PostProcess":
+        inf = cfg.get("inference", {}) or {}
+        return cls(
+            conf=conf,
+            min_area=inf.get("min_box_area", DEFAULT_INFERENCE_MIN_BOX_AREA),
+            max_det=inf.get("max_det", DEFAULT_INFERENCE_MAX_DET),
+        )
+
+    def __call__(self, r, size: Optional[Tuple[int, int]] = None, full_size: Optional[Tuple[int, int]] = None):
+        """Detections of result ``r``, mapped from ``size`` (the image the model saw) to ``full_size``."""
+        return self.finish(self.select(r), size, full_size)
+
+    def select(self, r) -> Detections:
+        """The boxes of result ``r`` with a kept class and confidence, in the coordinates the model saw."""
+        xyxy, conf, cls = result_arrays(r)
+        keep = np.ones(len(conf), bool)
+        if self.classes is not None:
+            keep &= np.isin(cls, self.classes)
+        if self.conf is not None:
+            # only catches backends that ignore ``conf``: a box the model kept at the threshold stays
+            keep &= conf >= self.conf
+        return Detections(xyxy[keep], conf[keep], cls[keep])
+
+    def finish(
+        self, dets: Detections, size: Optional[Tuple[int, int]] = None, full_size: Optional[Tuple[int, int]] = None
+    ) -> Detections:
+        """Map ``select``-ed boxes to ``full_size``, then apply the size and count limits there."""
+        if size is not None and full_size is not None and size != full_size:
+            dets = dets.scaled(full_size[0] / size[0], full_size[1] / size[1])
+        if self.min_area > 0 and len(dets):
+            dets = dets[dets.areas() >= self.min_area]
+        if self.max_det is not None and len(dets) > self.max_det:
+            # most confident first, as the model orders them
+            dets = dets[np.argsort(-dets.conf, kind="stable")[: self.max_det]]
+        return dets
@@ -0,0 +1,118 @@
+"""Precompiled drawing settings and a shared font cache for draw_boxes."""
+
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from PIL import ImageFont
+
+from .constants import (
+    DEFAULT_BOX_COLOR,
+    DEFAULT_BOX_THICKNESS,
+    DEFAULT_LABEL_BG_COLOR,
+    DEFAULT_LABEL_TEXT_COLOR,
+    DEFAULT_FONT_SIZE,
+    DEFAULT_LABEL_PADDING,
+)
+
+
+def _parse_font_size(raw) -> Tuple[str, float]:
+    """Turn the ``font_size`` setting into ("frac", f) of image height or ("px", n)."""
+    if isinstance(raw, str) and "/" in raw:
+        try:
+            n, d = raw.split("/")
+            return "frac", float(n) / float(d)
+        except Exception:
+            return "px", DEFAULT_FONT_SIZE
+    try:
+        val = float(raw)
+    except Exception:
+        return "px", DEFAULT_FONT_SIZE
+    if 0 < val <= 1:
+        return "frac", val
+    return "px", max(6, int(val))
+
+
+@lru_cache(maxsize=1)
+def _default_font_path() -> Optional[str]:
+    # matplotlib is only needed to locate DejaVu Sans when no font_path is configured
+    try:
+        import importlib
+
+        fm = importlib.import_module("matplotlib.font_manager")
+    except Exception:
+        return None
+    try:
+        return fm.findfont("DejaVu Sans")
+    except Exception:
+        return ""
+
+
+@lru_cache(maxsize=64)
+def load_font(px: int, font_path: Optional[str] = None):
+    """Return a font of ``px`` pixels, cached so every image of that size shares it."""
+    path = font_path or _default_font_path()
+    try:
+        if path is not None:
+            return ImageFont.truetype(path, px)
+        # try a generic truetype; fall back to default
+        return ImageFont.load_default()
+    except Exception:
+        try:
+            return ImageFont.load_default()
+        except Exception:
+            return None
+
+
+@lru_cache(maxsize=4096)
+def text_width(font, label: str, mode: str = "L") -> Optional[int]:
+    """Cached equivalent of ``ImageDraw.textlength``; None if the font cannot measure."""
+    try:
+        return int(font.getlength(label, mode))
+    except Exception:
+        return None
+
+
+class RenderStyle:
+    """The ``drawing`` config section parsed once, for reuse across images."""
+
+    def __init__(
+        self,
+        box_color=DEFAULT_BOX_COLOR,
+        box_thickness=DEFAULT_BOX_THICKNESS,
+        label_bg_color=DEFAULT_LABEL_BG_COLOR,
+        label_text_color=DEFAULT_LABEL_TEXT_COLOR,
+        font_size=DEFAULT_FONT_SIZE,
+        label_padding=DEFAULT_LABEL_PADDING,
+        font_path: Optional[str] = None,
+    ):
+        self.box_color = tuple(box_color)
+        self.box_thickness = int(box_thickness)
+        self.label_bg = tuple(label_bg_color)
+        self.label_text = tuple(label_text_color)
+        self.font_size = _parse_font_size(font_size)
+        padding = label_padding
+        self.pad_x = int(padding[0]) if isinstance(padding, (list, tuple)) and len(padding) > 0 else 4
+        self.pad_y = int(padding[1]) if isinstance(padding, (list, tuple)) and len(padding) > 1 else 2
+        self.font_path = font_path
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "RenderStyle":
+        drawing = cfg.get("drawing", {}) or {}
+        return cls(
+            box_color=drawing.get("box_color", DEFAULT_BOX_COLOR),
+            box_thickness=drawing.get("box_thickness", DEFAULT_BOX_THICKNESS),
+            label_bg_color=drawing.get("label_bg_color", DEFAULT_LABEL_BG_COLOR),
+            label_text_color=drawing.get("label_text_color", DEFAULT_LABEL_TEXT_COLOR),
+            font_size=drawing.get("font_size", DEFAULT_FONT_SIZE),
+            label_padding=drawing.get("label_padding", DEFAULT_LABEL_PADDING),
+            font_path=drawing.get("font_path"),
+        )
+
+    def font_px(self, img_h: int) -> int:
+        kind, value = self.font_size
+        if kind == "frac":
+            return max(6, int(img_h * value))
+        return int(value)
+
+    def font(self, img_h: int):
+        return load_font(self.font_px(img_h), self.font_path)
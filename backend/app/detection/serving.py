@@ -0,0 +1,158 @@
+"""Pool of model worker processes for web serving, each with its own model and thread budget."""
+
+import multiprocessing as mp
+import os
+import threading
+import traceback
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from .cascade import maybe_cascaded
+from .detection import predict_batch
+from .loading import load_model, pin_threads, warm_up
+from .postprocess import Detections, PostProcess
+from .tiling import maybe_tiled
+
+
+class WorkerError(RuntimeError):
+    """A model worker process failed on a batch (or died); the traceback is in the message."""
+
+
+def _serve(loader: Callable, model_path: Path, threads: int, predict_kwargs: dict, cfg: dict, conn):
+    """Worker entry point: load the model once, then answer batches until the pipe closes."""
+    try:
+        pin_threads(threads)
+        model = loader(model_path)
+        warm_up(model, predict_kwargs["device"], predict_kwargs["imgsz"])
+        model = maybe_cascaded(maybe_tiled(model, cfg), cfg)
+        post = PostProcess.from_config(cfg, predict_kwargs["conf"])
+        conn.send(("ready", None))
+    except BaseException:
+        conn.send(("error", traceback.format_exc()))
+        return
+    while True:
+        try:
+            arrays = conn.recv()
+        except EOFError:
+            return
+        try:
+            imgs = [Image.fromarray(a) for a in arrays]
+            results = predict_batch(model, imgs, classes=post.classes, **predict_kwargs)
+            conn.send(("ok", [post.select(r) for r in results]))
+        except BaseException:
+            conn.send(("error", traceback.format_exc()))
+
+
+class ModelWorker:
+    """Parent-side handle of one worker process; calling it returns the ``PostProcess.select``-ed ``Detections`` of a batch.
+
+    Calls are made from a single ``DynamicBatcher`` thread, so at most one
+    batch is in flight per worker. A worker that dies is started again on the
+    next call.
+    """
+
+    def __init__(
+        self,
+        model_path: Path,
+        threads: int,
+        predict_kwargs: dict,
+        cfg: dict,
+        loader: Callable = load_model,
+        name: str = "model-worker",
+    ):
+        self.model_path = model_path
+        self.threads = threads
+        self.predict_kwargs = predict_kwargs
+        self.cfg = cfg
+        self.loader = loader
+        self.name = name
+        self.restarts = 0
+        self._proc = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        # spawn rather than fork: torch's thread pools do not survive a fork
+        ctx = mp.get_context("spawn")
+        parent, child = ctx.Pipe()
+        self._proc = ctx.Process(
+            target=_serve,
+            args=(self.loader, self.model_path, self.threads, self.predict_kwargs, self.cfg, child),
+            name=self.name,
+            daemon=True,
+        )
+        self._proc.start()
+        child.close()
+        self._conn = parent
+        return self
+
+    def wait_ready(self):
+        status, payload = self._recv()
+        if status != "ready":
+            raise WorkerError(f"{self.name} failed to start:\n{payload}")
+
+    def _recv(self):
+        try:
+            return self._conn.recv()
+        except (EOFError, OSError):
+            self._proc.join(timeout=5)
+            code = self._proc.exitcode
+            # drop the dead process so the next call starts a fresh one
+            self.close()
+            return "error", f"{self.name} exited (code {code})"
+
+    def __call__(self, imgs: List[Image.Image]) -> List[Detections]:
+        with self._lock:
+            if self._proc is None or not self._proc.is_alive():
+                self.close()
+                self.restarts += 1
+                self.start().wait_ready()
+            try:
+                self._conn.send([np.asarray(img.convert("RGB")) for img in imgs])
+            except (BrokenPipeError, OSError):
+                status, payload = "error", f"{self.name} is not accepting work"
+            else:
+                status, payload = self._recv()
+        if status != "ok":
+            raise WorkerError(payload)
+        return payload
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._proc is not None:
+            self._proc.join(timeout=5)
+            if self._proc.is_alive():
+                self._proc.terminate()
+                self._proc.join()
+            self._proc = None
+
+
+def start_workers(
+    model_path: Path,
+    workers: int,
+    predict_kwargs: dict,
+    cfg: dict,
+    threads: Optional[int] = None,
+    loader: Callable = load_model,
+) -> List[ModelWorker]:
+    """Start ``workers`` model processes (``threads`` each, default cores // workers) and wait until all are loaded."""
+    workers = max(1, int(workers))
+    threads = int(threads or max(1, (os.cpu_count() or 1) // workers))
+    pool = [
+        ModelWorker(model_path, threads, predict_kwargs, cfg, loader, name=f"model-worker-{i}").start()
+        for i in range(workers)
+    ]
+    try:
+        for w in pool:
+            w.wait_ready()
+    except BaseException:
+        for w in pool:
+            w.close()
+        raise
+    print(f"Started {workers} model workers x {threads} threads")
+    return pool
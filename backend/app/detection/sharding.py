@@ -0,0 +1,187 @@
+"""Process one input folder with several worker processes, each owning a model."""
+
+import multiprocessing as mp
+import os
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, Optional
+
+from .dedup import DedupIndex
+from .detection import is_image, process_folder
+from .loading import load_model, pin_threads
+from .manifest import Manifest
+from .metrics import Metrics
+from .writers import DetectionWriter, merge_jsonl, merge_npz
+
+
+def _shard_path(path: Optional[Path], i: int) -> Optional[Path]:
+    return path.with_name(f"{path.stem}.shard{i}{path.suffix}") if path else None
+
+
+def _run_shard(
+    loader: Callable,
+    model_path: Path,
+    files,
+    out: Path,
+    kwargs: dict,
+    threads: int,
+    key: Optional[str],
+    writer_paths: tuple,
+    conn,
+    collect_metrics: bool = False,
+):
+    """Worker entry point: pin torch threads, load the model once and process ``files``."""
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    # the parent already filtered unchanged files; workers only append entries
+    manifest = Manifest(out, key) if key else None
+    writer = DetectionWriter(*writer_paths) if any(writer_paths) else None
+    try:
+        pin_threads(threads)
+        model = loader(model_path)
+        metrics = Metrics(enabled=collect_metrics)
+        summary = process_folder(
+            model, files[0].parent, out, files=files, manifest=manifest, writer=writer, metrics=metrics, **kwargs
+        )
+        payload = {k: summary[k] for k in ("images", "persons", "skipped", "deduplicated")}
+        payload["metrics"] = metrics.snapshot()
+        conn.send(("ok", payload))
+    except BaseException:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        if manifest is not None:
+            manifest.close(compact=False)
+        if writer is not None:
+            writer.close()
+        conn.close()
+
+
+def process_sharded(
+    model_path: Path,
+    inp: Path,
+    out: Path,
+    conf: float,
+    device: str,
+    imgsz: int,
+    cfg: dict,
+    batch_size: int = 1,
+    workers: int = 2,
+    threads: Optional[int] = None,
+    loader: Callable = load_model,
+    manifest_key: Optional[str] = None,
+    save_images: bool = True,
+    jsonl_path: Optional[Path] = None,
+    npz_path: Optional[Path] = None,
+    metrics: Optional[Metrics] = None,
+):
+    """Split the images in ``inp`` across ``workers`` processes writing into ``out``.
+
+    Each worker loads its own model via ``loader(model_path)`` and limits torch
+    to ``threads`` intra-op threads (default: cores // workers). Shards are
+    independent, so a worker that fails only loses its own remaining images.
+    With a ``manifest_key`` unchanged images are skipped before sharding.
+    Each worker streams detections to its own part of ``jsonl_path`` /
+    ``npz_path``; the parts are merged once all workers have finished, and
+    their stage latencies and counters are merged into ``metrics``.
+    With ``dedup.enabled`` each worker gets a contiguous run of files instead
+    of every Nth one, so bursts of near-identical shots stay in one shard.
+    Returns a combined summary dict, or None if there was nothing to process.
+    """
+    out.mkdir(parents=True, exist_ok=True)
+    imgs = sorted([p for p in inp.iterdir() if is_image(p)])
+    if not imgs:
+        print("No images in", inp)
+        return
+    unchanged = 0
+    if manifest_key:
+        manifest = Manifest.open(out, manifest_key)
+        pending = [p for p in imgs if not manifest.is_current(p)]
+        manifest.close()
+        unchanged = len(imgs) - len(pending)
+        if unchanged:
+            print(f"Skipping {unchanged} unchanged images")
+        imgs = pending
+        if not imgs:
+            return {
+                "images": 0,
+                "persons": 0,
+                "skipped": 0,
+                "deduplicated": 0,
+                "unchanged": unchanged,
+                "failed_shards": [],
+                "wall": 0.0,
+            }
+    workers = max(1, min(int(workers), len(imgs)))
+    threads = int(threads or max(1, (os.cpu_count() or 1) // workers))
+    kwargs = {
+        "conf": conf,
+        "device": device,
+        "imgsz": imgsz,
+        "cfg": cfg,
+        "batch_size": batch_size,
+        "save_images": save_images,
+    }
+    print(f"Processing {len(imgs)} images with {workers} workers x {threads} threads")
+
+    # spawn rather than fork: torch's thread pools do not survive a fork
+    ctx = mp.get_context("spawn")
+    t0 = time.perf_counter()
+    shards = []
+    contiguous = DedupIndex.from_config(cfg) is not None
+    for i in range(workers):
+        if contiguous:
+            files = imgs[len(imgs) * i // workers : len(imgs) * (i + 1) // workers]
+        else:
+            files = imgs[i::workers]
+        recv, send = ctx.Pipe(duplex=False)
+        proc = ctx.Process(
+            target=_run_shard,
+            args=(
+                loader,
+                model_path,
+                files,
+                out,
+                kwargs,
+                threads,
+                manifest_key,
+                (_shard_path(jsonl_path, i), _shard_path(npz_path, i)),
+                send,
+                metrics is not None and metrics.enabled,
+            ),
+            name=f"shard-{i}",
+        )
+        proc.start()
+        send.close()
+        shards.append((i, proc, recv, len(files)))
+
+    summary = {"images": 0, "persons": 0, "skipped": 0, "deduplicated": 0, "unchanged": unchanged, "failed_shards": []}
+    for i, proc, recv, n in shards:
+        try:
+            status, payload = recv.recv()
+        except EOFError:
+            status, payload = "error", "worker exited without reporting"
+        proc.join()
+        if status == "ok":
+            for k in ("images", "persons", "skipped", "deduplicated"):
+                summary[k] += payload[k]
+            if metrics is not None:
+                metrics.merge(payload["metrics"])
+        else:
+            print(f"Shard {i} ({n} images) failed (exit code {proc.exitcode}):\n{payload}")
+            summary["failed_shards"].append(i)
+    if jsonl_path:
+        merge_jsonl([_shard_path(jsonl_path, i) for i in range(workers)], jsonl_path)
+    if npz_path:
+        merge_npz([_shard_path(npz_path, i) for i in range(workers)], npz_path)
+    if manifest_key:
+        # fold the workers' appended lines back into one entry per image
+        Manifest.open(out, manifest_key).close()
+    summary["wall"] = time.perf_counter() - t0
+    rate = summary["images"] / summary["wall"] if summary["wall"] > 0 else 0.0
+    print(
+        f"Summary: {summary['images']} images, {summary['persons']} persons in {summary['wall']:.2f}s "
+        f"({rate:.1f} img/s) across {workers} workers"
+        + (f"; {summary['deduplicated']} inferences avoided as near-duplicates" if summary["deduplicated"] else "")
+        + (f"; failed shards: {summary['failed_shards']}" if summary["failed_shards"] else "")
+    )
+    return summary
@@ -0,0 +1,126 @@
+"""Sliced inference for images much larger than the model input size."""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .backends import ArrayBoxes, ArrayResult, nms
+from .constants import (
+    DEFAULT_TILING_BATCH_SIZE,
+    DEFAULT_TILING_ENABLED,
+    DEFAULT_TILING_FULL_IMAGE,
+    DEFAULT_TILING_IOU,
+    DEFAULT_TILING_OVERLAP,
+    DEFAULT_TILING_SIZE,
+)
+from .postprocess import accepts_kwarg, result_arrays
+
+
+def tile_grid(width: int, height: int, tile: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """Boxes of equally sized, overlapping tiles covering a ``width`` x ``height`` image.
+
+    The last row and column are shifted back to end at the image edge, so every
+    tile has the same size (``tile``, or the image side if that is smaller).
+    """
+    tw, th = min(tile, width), min(tile, height)
+    step = max(1, tile - overlap)
+
+    def starts(size, t):
+        xs = list(range(0, max(size - t, 0) + 1, step))
+        if xs[-1] + t < size:
+            xs.append(size - t)
+        return xs
+
+    return [(x, y, x + tw, y + th) for y in starts(height, th) for x in starts(width, tw)]
+
+
+class TiledModel:
+    """Wrap a model so each image is detected tile by tile at native resolution.
+
+    Tiles of ``tile`` px overlapping by ``overlap`` px are sent to
+    ``model.predict`` ``batch_size`` at a time with ``imgsz=tile``, so the
+    model's input (and memory) depends on the tile batch, not the image size.
+    Boxes are shifted back to image coordinates and duplicates along the seams
+    are merged with per-class NMS at ``iou``. With ``full_image`` the whole
+    image is also run once at the normal ``imgsz`` to keep people larger than
+    a tile in one piece.
+    """
+
+    def __init__(
+        self,
+        model,
+        tile: int = DEFAULT_TILING_SIZE,
+        overlap: int = DEFAULT_TILING_OVERLAP,
+        batch_size: int = DEFAULT_TILING_BATCH_SIZE,
+        iou: float = DEFAULT_TILING_IOU,
+        full_image: bool = DEFAULT_TILING_FULL_IMAGE,
+    ):
+        self.model = model
+        self.tile = int(tile)
+        self.overlap = max(0, min(int(overlap), self.tile - 1))
+        self.batch_size = max(1, int(batch_size))
+        self.iou = float(iou)
+        self.full_image = bool(full_image)
+        self.tiles = 0
+
+    @classmethod
+    def from_config(cls, model, cfg: dict) -> "TiledModel":
+        t = cfg.get("tiling", {}) or {}
+        return cls(
+            model,
+            tile=t.get("tile", DEFAULT_TILING_SIZE),
+            overlap=t.get("overlap", DEFAULT_TILING_OVERLAP),
+            batch_size=t.get("batch_size", DEFAULT_TILING_BATCH_SIZE),
+            iou=t.get("iou", DEFAULT_TILING_IOU),
+            full_image=t.get("full_image", DEFAULT_TILING_FULL_IMAGE),
+        )
+
+    def predict(
+        self,
+        source,
+        device: str = "cpu",
+        imgsz: int = 640,
+        conf: float = 0.25,
+        verbose: bool = False,
+        classes: Optional[List[int]] = None,
+        **_,
+    ):
+        images = source if isinstance(source, list) else [source]
+        # the class filter goes on to the wrapped model if it takes one
+        extra = {"classes": classes} if classes is not None and accepts_kwarg(self.model, "classes") else {}
+        return [self._predict_one(img, device, imgsz, conf, extra) for img in images]
+
+    def _predict_one(self, img: Image.Image, device: str, imgsz: int, conf: float, extra: dict) -> ArrayResult:
+        grid = tile_grid(img.width, img.height, self.tile, self.overlap)
+        parts = []
+        if self.full_image and len(grid) > 1:
+            r = self.model.predict(source=img, device=device, imgsz=imgsz, conf=conf, verbose=False, **extra)[0]
+            parts.append((result_arrays(r), (0, 0)))
+        for i in range(0, len(grid), self.batch_size):
+            chunk = grid[i : i + self.batch_size]
+            crops = [img.crop(b) for b in chunk]
+            source = crops if len(crops) > 1 else crops[0]
+            preds = self.model.predict(source=source, device=device, imgsz=self.tile, conf=conf, verbose=False, **extra)
+            self.tiles += len(crops)
+            parts.extend((result_arrays(r), b[:2]) for r, b in zip(preds, chunk))
+
+        xyxy = np.concatenate([a[0] + np.array([x, y, x, y], np.float32) for a, (x, y) in parts])
+        scores = np.concatenate([a[1] for a, _ in parts])
+        cls = np.concatenate([a[2] for a, _ in parts])
+        if len(grid) > 1 and len(scores):
+            # offset boxes per class so NMS never suppresses across classes
+            keep = nms(xyxy + cls[:, None] * float(max(img.size) + 1), scores, self.iou)
+            xyxy, scores, cls = xyxy[keep], scores[keep], cls[keep]
+        return ArrayResult(ArrayBoxes(xyxy, scores, cls), (img.height, img.width))
+
+
+def tiling_enabled(cfg: Optional[dict]) -> bool:
+    return bool(((cfg or {}).get("tiling", {}) or {}).get("enabled", DEFAULT_TILING_ENABLED))
+
+
+def maybe_tiled(model, cfg: dict):
+    """``model`` wrapped in a ``TiledModel`` if ``tiling.enabled`` is set in ``cfg``."""
+    if tiling_enabled(cfg) and not isinstance(model, TiledModel):
+        return TiledModel.from_config(model, cfg)
+    return model
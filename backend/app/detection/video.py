@@ -0,0 +1,163 @@
+"""Video file input: stream frames through the model with frame skipping and motion gating."""
+
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from .cascade import maybe_cascaded
+from .constants import DEFAULT_VIDEO_EVERY, DEFAULT_VIDEO_MOTION_THRESHOLD
+from .detection import draw_boxes, predict_batch
+from .metrics import Metrics
+from .pipeline import Pipeline
+from .postprocess import Detections, PostProcess
+from .render import RenderStyle
+from .tiling import maybe_tiled
+from .writers import DetectionWriter
+
+VIDEO_SUFFIXES = {".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm"}
+
+
+def is_video(p: Path):
+    return p.is_file() and p.suffix.lower() in VIDEO_SUFFIXES
+
+
+class FrameGate:
+    """Decide which frames of a stream are worth running the model on.
+
+    Only every ``every``-th frame is a candidate. With ``motion_threshold`` a
+    candidate is also skipped while its small grayscale thumbnail differs from
+    the one of the last inferred frame by no more than that mean absolute
+    difference (0-255). Comparing against the last *inferred* frame rather than
+    the previous one means slow changes still add up and trigger inference.
+    """
+
+    def __init__(self, every: int = 1, motion_threshold: Optional[float] = None, thumb: int = 64):
+        self.every = max(1, int(every))
+        self.motion_threshold = None if motion_threshold is None else float(motion_threshold)
+        self.thumb = thumb
+        self._last = None
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        import cv2
+
+        h, w = frame.shape[:2]
+        size = (self.thumb, max(1, round(self.thumb * h / w)))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def should_infer(self, index: int, frame: np.ndarray) -> bool:
+        if index % self.every:
+            return False
+        if self.motion_threshold is None:
+            return True
+        thumb = self._thumbnail(frame)
+        if self._last is not None and np.abs(thumb - self._last).mean() <= self.motion_threshold:
+            return False
+        self._last = thumb
+        return True
+
+
+def process_video(
+    model,
+    src: Path,
+    out: Path,
+    conf: float,
+    device: str,
+    imgsz: int,
+    cfg: dict,
+    save_video: bool = True,
+    writer: Optional[DetectionWriter] = None,
+    metrics: Optional[Metrics] = None,
+):
+    """Detect people in the video ``src``, streaming it frame by frame.
+
+    Frames the ``FrameGate`` (``video.every`` / ``video.motion_threshold``)
+    skips reuse the boxes of the last inferred frame. Annotated frames are
+    written to ``out/<stem>.mp4`` unless ``save_video`` is False, and every
+    frame is sent to ``writer`` (with its ``frame`` index and ``inferred`` flag)
+    if given. Returns a summary dict with ``frames``, ``inferred`` and
+    ``wall``, or None if the file cannot be opened. Stage latencies and counts
+    of inferred frames and persons go to ``metrics``.
+    """
+    import cv2
+
+    section = cfg.get("video", {}) or {}
+    gate = FrameGate(
+        section.get("every", DEFAULT_VIDEO_EVERY),
+        section.get("motion_threshold", DEFAULT_VIDEO_MOTION_THRESHOLD),
+    )
+    model = maybe_cascaded(maybe_tiled(model, cfg), cfg)
+    style = RenderStyle.from_config(cfg)
+    post = PostProcess.from_config(cfg, conf)
+    # frames must be written in order, so every stage runs inline
+    metrics = metrics if metrics is not None else Metrics(enabled=False)
+    pipeline = Pipeline(0, 0, metrics=metrics)
+
+    cap = cv2.VideoCapture(str(src))
+    if not cap.isOpened():
+        print(f"Skipping {src.name}: cannot open video")
+        metrics.inc("errors")
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    out.mkdir(parents=True, exist_ok=True)
+    out_path = out / f"{src.stem}.mp4"
+    if out_path.resolve() == src.resolve():
+        out_path = out / f"{src.stem}.annotated.mp4"
+    video_out = None
+    boxes = Detections()
+    summary = {"frames": 0, "inferred": 0}
+    print("Processing", src.name)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            ok, frame = cap.read()
+            if not ok:
+                break
+            pipeline.stats["decode"].add(time.perf_counter() - t0)
+            index = summary["frames"]
+            summary["frames"] += 1
+            inferred = gate.should_infer(index, frame)
+            img = None
+            if inferred:
+                with pipeline.stats["infer"].measure():
+                    img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    boxes = post(predict_batch(model, [img], conf, device, imgsz, post.classes)[0])
+                summary["inferred"] += 1
+                metrics.inc("images")
+                metrics.inc("persons", len(boxes))
+            if writer is not None:
+                writer.write(src.name, (frame.shape[1], frame.shape[0]), boxes, frame=index, inferred=inferred)
+            if save_video:
+                with pipeline.stats["render"].measure():
+                    if img is None:
+                        img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    annotated = cv2.cvtColor(np.asarray(draw_boxes(img, boxes, style)), cv2.COLOR_RGB2BGR)
+                with pipeline.stats["encode"].measure():
+                    if video_out is None:
+                        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+                        video_out = cv2.VideoWriter(str(out_path), fourcc, fps, (frame.shape[1], frame.shape[0]))
+                    video_out.write(annotated)
+    finally:
+        cap.release()
+        if video_out is not None:
+            video_out.release()
+        pipeline.close()
+    print(pipeline.report())
+    share = 100 * summary["inferred"] / summary["frames"] if summary["frames"] else 0.0
+    print(f"{src.name}: {summary['frames']} frames, model run on {summary['inferred']} ({share:.1f}%)")
+    if video_out is not None:
+        print(f"Saved {out_path}")
+    summary["wall"] = pipeline.wall
+    return summary
+
+
+def process_videos(model, inp: Path, out: Path, conf: float, device: str, imgsz: int, cfg: dict, **kwargs):
+    """Run ``process_video`` on ``inp`` (a video file) or on every video in the folder ``inp``."""
+    videos = [inp] if inp.is_file() else sorted(p for p in inp.iterdir() if is_video(p))
+    if not videos:
+        print("No videos in", inp)
+        return []
+    return [process_video(model, v, out, conf, device, imgsz, cfg, **kwargs) for v in videos]
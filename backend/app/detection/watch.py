@@ -0,0 +1,402 @@
+"""Watch-folder mode: keep the model loaded and process images as they land in a folder."""
+
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .constants import (
+    DEFAULT_WATCH_METHOD,
+    DEFAULT_WATCH_SETTLE_S,
+    DEFAULT_WATCH_POLL_INTERVAL_S,
+    DEFAULT_WATCH_MAX_IN_FLIGHT,
+    DEFAULT_WATCH_INITIAL_SCAN,
+    DEFAULT_WATCH_RETRY_S,
+)
+from .cascade import CascadeModel, maybe_cascaded
+from .dedup import DedupIndex
+from .detection import IMAGE_SUFFIXES, is_image, process_folder
+from .metrics import Metrics
+from .pipeline import Pipeline
+from .tiling import maybe_tiled
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; followed by ``len`` bytes of name
+
+
+class InotifySource:
+    """Files created, written, moved or deleted in ``folder``, read from Linux inotify via libc.
+
+    ``wait`` returns ``(name, complete)`` pairs, where ``complete`` means the
+    writer closed the file or renamed it into place, so it need not settle.
+    It returns None after a kernel queue overflow, meaning events were lost
+    and the caller should rescan the folder.
+    """
+
+    def __init__(self, folder: Path):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout: float) -> Optional[List[Tuple[str, bool]]]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names, offset = [], 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if length:
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                names.append((name, bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO))))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    """Fallback for platforms or filesystems without inotify: list the folder every ``interval`` seconds."""
+
+    def __init__(self, folder: Path, interval: float = DEFAULT_WATCH_POLL_INTERVAL_S):
+        self.folder = folder
+        self.interval = max(0.05, float(interval))
+        self._next = 0.0
+
+    def wait(self, timeout: float) -> Optional[List[Tuple[str, bool]]]:
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            time.sleep(min(delay, timeout))
+            if time.monotonic() < self._next:
+                return []
+        self._next = time.monotonic() + self.interval
+        return None  # rescan
+
+    def close(self):
+        pass
+
+
+def open_source(folder: Path, method: str = DEFAULT_WATCH_METHOD, poll_interval: float = DEFAULT_WATCH_POLL_INTERVAL_S):
+    """inotify for ``method`` "auto" or "inotify" where it works, else polling."""
+    if method in ("auto", "inotify"):
+        try:
+            return InotifySource(folder)
+        except (OSError, AttributeError) as e:
+            if method == "inotify":
+                raise
+            print(f"inotify unavailable ({e}); polling every {poll_interval}s")
+    return PollingSource(folder, poll_interval)
+
+
+class StabilityTracker:
+    """Hold back files until their size and mtime have not changed for ``settle`` seconds.
+
+    A file is released once per version: after it is handed out, it only
+    comes back if its size or mtime changes (i.e. it was modified).
+    """
+
+    def __init__(self, settle: float = DEFAULT_WATCH_SETTLE_S):
+        self.settle = max(0.0, float(settle))
+        self._candidates: Dict[Path, Tuple[Tuple[int, int], float]] = {}
+        self._released: Dict[Path, Tuple[int, int]] = {}
+
+    @staticmethod
+    def _signature(p: Path) -> Optional[Tuple[int, int]]:
+        try:
+            st = p.stat()
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def __len__(self):
+        return len(self._candidates)
+
+    def touch(self, p: Path, now: float, complete: bool = False):
+        """Note a change to ``p``; ``complete`` (closed after writing) skips the settle time."""
+        sig = self._signature(p)
+        if sig is None:
+            self._candidates.pop(p, None)
+            self._released.pop(p, None)
+            return
+        if self._released.get(p) == sig:
+            return
+        prev = self._candidates.get(p)
+        if complete:
+            self._candidates[p] = (sig, now - self.settle)
+        elif prev is None or prev[0] != sig:
+            self._candidates[p] = (sig, now)
+
+    def skip_pending(self):
+        """Treat every current candidate as already handed out (only later changes are released)."""
+        for p, (sig, _) in self._candidates.items():
+            self._released[p] = sig
+        self._candidates.clear()
+
+    def retain(self, present: set):
+        """Forget files that are no longer in the folder."""
+        for d in (self._candidates, self._released):
+            for p in [p for p in d if p not in present]:
+                del d[p]
+
+    def ready(self, now: float) -> List[Path]:
+        out = []
+        for p, (sig, since) in list(self._candidates.items()):
+            if now - since < self.settle:
+                continue
+            current = self._signature(p)
+            if current is None:
+                del self._candidates[p]
+            elif current != sig:
+                self._candidates[p] = (current, now)
+            elif sig[0] > 0:
+                del self._candidates[p]
+                self._released[p] = sig
+                out.append(p)
+        return sorted(out)
+
+
+class FolderWatcher:
+    """Background thread turning folder events into a queue of fully written images.
+
+    At most ``max_in_flight`` images are queued or being processed at once:
+    when the consumer falls behind the thread stops admitting files (further
+    events wait in the kernel, or are caught by a rescan after an overflow)
+    until ``done`` frees slots. If listing or watching the folder fails (say
+    it is briefly unmounted), the error is printed and the thread reopens the
+    source and rescans every ``retry_s`` seconds until it works again.
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        method: str = DEFAULT_WATCH_METHOD,
+        settle: float = DEFAULT_WATCH_SETTLE_S,
+        poll_interval: float = DEFAULT_WATCH_POLL_INTERVAL_S,
+        max_in_flight: int = DEFAULT_WATCH_MAX_IN_FLIGHT,
+        initial_scan: bool = DEFAULT_WATCH_INITIAL_SCAN,
+        retry_s: float = DEFAULT_WATCH_RETRY_S,
+    ):
+        self.folder = Path(folder)
+        self.tracker = StabilityTracker(settle)
+        self.method = method
+        self.poll_interval = poll_interval
+        self.retry_s = max(0.05, float(retry_s))
+        self.source = open_source(self.folder, method, poll_interval)
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.initial_scan = initial_scan
+        self._slots = threading.Semaphore(self.max_in_flight)
+        self._queue: "queue.Queue[Path]" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="watcher", daemon=True)
+
+    @classmethod
+    def from_config(cls, folder: Path, cfg: dict) -> "FolderWatcher":
+        section = cfg.get("watch", {}) or {}
+        return cls(
+            folder,
+            method=section.get("method", DEFAULT_WATCH_METHOD),
+            settle=section.get("settle_s", DEFAULT_WATCH_SETTLE_S),
+            poll_interval=section.get("poll_interval_s", DEFAULT_WATCH_POLL_INTERVAL_S),
+            max_in_flight=section.get("max_in_flight", DEFAULT_WATCH_MAX_IN_FLIGHT),
+            initial_scan=section.get("initial_scan", DEFAULT_WATCH_INITIAL_SCAN),
+            retry_s=section.get("retry_s", DEFAULT_WATCH_RETRY_S),
+        )
+
+    def start(self) -> "FolderWatcher":
+        self._thread.start()
+        return self
+
+    def _scan(self, now: float):
+        present = set()
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                p = self.folder / entry.name
+                if is_image(p):
+                    present.add(p)
+                    self.tracker.touch(p, now)
+        self.tracker.retain(present)
+
+    def _loop(self):
+        first, rescan = True, True
+        while not self._stop.is_set():
+            try:
+                if self.source is None:
+                    self.source = open_source(self.folder, self.method, self.poll_interval)
+                if rescan:
+                    self._scan(time.monotonic())
+                    if first and not self.initial_scan:
+                        self.tracker.skip_pending()
+                    first = rescan = False
+                self._step()
+            except Exception as e:
+                print(f"Watching {self.folder} failed ({e}); retrying in {self.retry_s:g}s")
+                # events may be lost meanwhile: start over with a fresh source and a full listing
+                self._close_source()
+                rescan = True
+                self._stop.wait(self.retry_s)
+
+    def _step(self):
+        # with pending candidates wake up often enough to notice when they settle
+        timeout = max(0.05, self.tracker.settle / 2) if len(self.tracker) else 0.5
+        names = self.source.wait(timeout)
+        now = time.monotonic()
+        if names is None:
+            self._scan(now)
+        else:
+            for name, complete in names:
+                p = self.folder / name
+                if p.suffix.lower() in IMAGE_SUFFIXES:
+                    # a deleted or moved-away file is dropped by touch
+                    self.tracker.touch(p, now, complete)
+        for p in self.tracker.ready(now):
+            while not self._slots.acquire(timeout=0.2):
+                if self._stop.is_set():
+                    return
+            self._queue.put(p)
+
+    def _close_source(self):
+        if self.source is not None:
+            try:
+                self.source.close()
+            except OSError:
+                pass
+            self.source = None
+
+    def take(self, max_items: int, timeout: Optional[float] = None) -> List[Path]:
+        """Wait up to ``timeout`` for one image, then add whatever else is ready (up to ``max_items``)."""
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < max_items:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def done(self, n: int = 1):
+        """Release the in-flight slots of ``n`` processed images."""
+        for _ in range(n):
+            self._slots.release()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._close_source()
+
+
+def watch_folder(
+    model,
+    inp: Path,
+    out: Path,
+    conf: float,
+    device: str,
+    imgsz: int,
+    cfg: dict,
+    batch_size: int = 1,
+    metrics: Optional[Metrics] = None,
+    stop: Optional[threading.Event] = None,
+    **kwargs,
+):
+    """Process images arriving in ``inp`` until ``stop`` is set (or Ctrl+C / SIGTERM), with the model loaded once.
+
+    Ready images are taken in batches of up to ``batch_size`` without waiting
+    for a batch to fill, and run through ``process_folder`` (remaining keyword
+    arguments such as ``manifest``, ``writer`` and ``save_images`` are passed
+    on). The decode/encode pipeline, the tiling/cascade model wrappers and
+    one near-duplicate index are kept for the whole run, so a new image can
+    reuse the detections of one from an earlier batch. A batch that fails is
+    reported and counted as ``failed``, and watching goes on; its images are
+    not recorded in the manifest, so the next run retries them. Returns a
+    summary dict with the totals of ``images``, ``persons``, ``skipped``,
+    ``deduplicated`` and ``failed``.
+    """
+    stop = stop or threading.Event()
+    previous = None
+    if threading.current_thread() is threading.main_thread():
+        # docker stop / systemd send SIGTERM: finish the current batch, then exit cleanly
+        previous = signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    watcher = FolderWatcher.from_config(inp, cfg).start()
+    pipeline = Pipeline.from_config(cfg, metrics)
+    model = maybe_cascaded(maybe_tiled(model, cfg), cfg)
+    dedup = DedupIndex.from_config(cfg)
+    totals = {"images": 0, "persons": 0, "skipped": 0, "deduplicated": 0, "failed": 0}
+    print(f"Watching {inp} (Ctrl+C to stop)")
+    try:
+        while not stop.is_set():
+            batch = watcher.take(max(1, int(batch_size)), timeout=0.2)
+            if not batch:
+                continue
+            try:
+                summary = process_folder(
+                    model,
+                    inp,
+                    out,
+                    conf,
+                    device,
+                    imgsz,
+                    cfg,
+                    batch_size=batch_size,
+                    files=batch,
+                    metrics=metrics,
+                    report=False,
+                    dedup=dedup,
+                    pipeline=pipeline,
+                    **kwargs,
+                )
+            except Exception as e:
+                # one bad batch (a writer error, a file that fails past per-file handling) must not end the daemon
+                print(f"Error processing {', '.join(p.name for p in batch)}: {e!r}")
+                summary = {"failed": len(batch)}
+                if metrics is not None:
+                    metrics.inc("errors", len(batch))
+            finally:
+                watcher.done(len(batch))
+            for k in totals:
+                totals[k] += (summary or {}).get(k, 0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        pipeline.close()
+        if previous is not None:
+            signal.signal(signal.SIGTERM, previous)
+    print(
+        f"Stopped watching: {totals['images']} images, {totals['persons']} persons"
+        + (f", {totals['deduplicated']} inferences avoided as near-duplicates" if totals["deduplicated"] else "")
+        + (f", {totals['failed']} failed" if totals["failed"] else "")
+    )
+    if isinstance(model, CascadeModel) and model.stats.images:
+        print(model.stats.report())
+    return totals
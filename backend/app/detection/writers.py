@@ -0,0 +1,171 @@
+"""Streaming detection writers (JSONL and columnar .npz) and a background file writer."""
+
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .postprocess import Detections
+
+
+def _save_npz(path: Path, **arrays):
+    """``np.savez_compressed`` to exactly ``path``, renamed into place once complete."""
+    # given a file name numpy would append ".npz" to a path with another suffix
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class DetectionWriter:
+    """Write detections without rendering or re-encoding any image.
+
+    Each image becomes one JSONL line ``{"file", "width", "height", "boxes"}``
+    written as soon as it is known; keyword ``extra`` fields passed to
+    ``write`` (e.g. a video ``frame`` index) are added to that line. For ``npz_path`` boxes are also kept as
+    flat columns (``xyxy``, ``conf``, ``cls``, ``image``) indexing into
+    ``files``/``image_size`` and dumped with ``np.savez_compressed`` on close.
+    """
+
+    def __init__(self, jsonl_path: Optional[Path] = None, npz_path: Optional[Path] = None):
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.npz_path = Path(npz_path) if npz_path else None
+        self._lock = threading.Lock()
+        self._fh = None
+        if self.jsonl_path is not None:
+            self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.jsonl_path, "w")
+        self._files = []
+        self._sizes = []
+        self._xyxy = []
+        self._conf = []
+        self._cls = []
+        self._image = []
+
+    def write(self, name: str, size: Tuple[int, int], boxes, **extra):
+        """Record the ``boxes`` (``Detections`` or box dicts) of image ``name`` of ``size``."""
+        dets = Detections.from_boxes(boxes)
+        with self._lock:
+            if self._fh is not None:
+                record = {"file": name, **extra, "width": size[0], "height": size[1], "boxes": dets.to_list()}
+                self._fh.write(json.dumps(record) + "\n")
+            if self.npz_path is not None:
+                # whole columns per image; concatenated once on close
+                self._image.append(np.full(len(dets), len(self._files), np.int32))
+                self._files.append(name)
+                self._sizes.append(size)
+                self._xyxy.append(dets.xyxy.astype(np.float32))
+                self._conf.append(dets.conf.astype(np.float32))
+                self._cls.append(dets.cls)
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if self.npz_path is not None:
+                self.npz_path.parent.mkdir(parents=True, exist_ok=True)
+                _save_npz(
+                    self.npz_path,
+                    files=np.array(self._files, dtype=str),
+                    image_size=np.array(self._sizes, dtype=np.int32).reshape(-1, 2),
+                    xyxy=np.concatenate(self._xyxy) if self._xyxy else np.zeros((0, 4), np.float32),
+                    conf=np.concatenate(self._conf) if self._conf else np.zeros(0, np.float32),
+                    cls=np.concatenate(self._cls) if self._cls else np.zeros(0, np.int16),
+                    image=np.concatenate(self._image) if self._image else np.zeros(0, np.int32),
+                )
+
+
+class BackgroundFileWriter:
+    """Write files on one background thread so request threads never wait on disk.
+
+    ``submit`` returns at once; each file is written to a temporary name and
+    renamed into place, so readers never see a partial file. ``wait(path)``
+    blocks until the latest write queued for ``path`` has landed. ``observe``
+    (e.g. ``Metrics.observer("write")``) is called with each write's duration.
+    """
+
+    def __init__(self, observe: Optional[Callable[[float], None]] = None):
+        self.observe = observe
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-writer")
+        self._pending: Dict[Path, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, path: Path, data: bytes) -> Future:
+        path = Path(path)
+        fut = self._executor.submit(self._write, path, data)
+        with self._lock:
+            self._pending[path] = fut
+        fut.add_done_callback(lambda f: self._forget(path, f))
+        return fut
+
+    def _forget(self, path: Path, fut: Future):
+        with self._lock:
+            if self._pending.get(path) is fut:
+                del self._pending[path]
+
+    def _write(self, path: Path, data: bytes):
+        t0 = time.perf_counter()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            raise
+        if self.observe is not None:
+            self.observe(time.perf_counter() - t0)
+
+    def wait(self, path: Path, timeout: Optional[float] = None):
+        with self._lock:
+            fut = self._pending.get(Path(path))
+        if fut is not None:
+            fut.exception(timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def merge_jsonl(parts: List[Path], dest: Path):
+    """Concatenate shard JSONL files into ``dest`` and remove the parts."""
+    with open(dest, "wb") as out:
+        for part in parts:
+            if part.exists():
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out)
+                part.unlink()
+
+
+def merge_npz(parts: List[Path], dest: Path):
+    """Combine shard .npz dumps into ``dest``, re-basing image indices, and remove the parts."""
+    cols = {k: [] for k in ("files", "image_size", "xyxy", "conf", "cls", "image")}
+    offset = 0
+    for part in parts:
+        if not part.exists():
+            continue
+        with np.load(part) as data:
+            for k in ("files", "image_size", "xyxy", "conf", "cls"):
+                cols[k].append(data[k])
+            cols["image"].append(data["image"] + offset)
+            offset += len(data["files"])
+        part.unlink()
+    empty = {
+        "files": np.array([], dtype=str),
+        "image_size": np.zeros((0, 2), np.int32),
+        "xyxy": np.zeros((0, 4), np.float32),
+        "conf": np.zeros(0, np.float32),
+        "cls": np.zeros(0, np.int16),
+        "image": np.zeros(0, np.int32),
+    }
+    _save_npz(dest, **{k: np.concatenate(v) if v else empty[k] for k, v in cols.items()})
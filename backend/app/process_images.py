@@ -1,50 +1,216 @@
 #!/usr/bin/env python3
+import time
+
+_T0 = time.perf_counter()
+
+from functools import partial
 from pathlib import Path
 import subprocess
 import argparse
-from ultralytics import YOLO
+import shutil
+import tempfile
 try:
     # when imported as a package (tests import backend.app.process_images)
-    from .detection import process_folder, draw_boxes, is_image
+    from .detection import process_folder, draw_boxes, is_image, RenderStyle
+    from .detection.backends import export_for_backend
+    from .detection.sharding import process_sharded
+    from .detection.tiling import maybe_tiled, tiling_enabled
+    from .detection.cascade import cascade_enabled, maybe_cascaded
+    from .detection.archive import ArchiveWriter, is_archive
+    from .detection.video import process_videos
+    from .detection.watch import watch_folder
+    from .detection.manifest import MANIFEST_NAME, Manifest, manifest_key, model_identity
+    from .detection.cache import LRUCache, ResultCache
+    from .detection.listing import DirectoryIndex, make_thumbnail
+    from .detection.writers import BackgroundFileWriter, DetectionWriter
+    from .detection.encoding import FORMATS, EncodeOptions, output_name, source_format
+    from .detection.batcher import DynamicBatcher, Overloaded
+    from .detection.serving import WorkerError, start_workers
+    from .detection.detection import load_for_inference, predict_batch
+    from .detection.postprocess import PostProcess
+    from .detection.metrics import Metrics
+    from .detection.loading import StartupProfile, load_model, warm_up
     from .detection.constants import (
         DEFAULT_INFERENCE_DEVICE,
         DEFAULT_INFERENCE_IMGSZ,
         DEFAULT_INFERENCE_CONF,
+        DEFAULT_INFERENCE_BATCH_SIZE,
         DEFAULT_BOX_COLOR,
         DEFAULT_BOX_THICKNESS,
         DEFAULT_LABEL_BG_COLOR,
         DEFAULT_LABEL_TEXT_COLOR,
         DEFAULT_FONT_SIZE,
         DEFAULT_LABEL_PADDING,
+        DEFAULT_FONT_PATH,
+        DEFAULT_PIPELINE_DECODE_WORKERS,
+        DEFAULT_PIPELINE_ENCODE_WORKERS,
+        DEFAULT_PIPELINE_QUEUE_DEPTH,
+        DEFAULT_OUTPUT_MANIFEST,
+        DEFAULT_CACHE_MAX_MB,
+        DEFAULT_CACHE_DIR,
+        DEFAULT_OUTPUT_IMAGES,
+        DEFAULT_OUTPUT_JSONL,
+        DEFAULT_OUTPUT_NPZ,
+        DEFAULT_WEB_MAX_BATCH_SIZE,
+        DEFAULT_WEB_MAX_WAIT_MS,
+        DEFAULT_INFERENCE_WARMUP,
+        DEFAULT_INFERENCE_FUSED_SNAPSHOT,
+        DEFAULT_INFERENCE_BACKEND,
+        DEFAULT_INFERENCE_DRAFT_DECODE,
+        DEFAULT_TILING_ENABLED,
+        DEFAULT_TILING_SIZE,
+        DEFAULT_TILING_OVERLAP,
+        DEFAULT_TILING_BATCH_SIZE,
+        DEFAULT_TILING_IOU,
+        DEFAULT_TILING_FULL_IMAGE,
+        DEFAULT_VIDEO_EVERY,
+        DEFAULT_VIDEO_MOTION_THRESHOLD,
+        DEFAULT_METRICS_ENABLED,
+        DEFAULT_ENCODING_FORMAT,
+        DEFAULT_ENCODING_JPEG_QUALITY,
+        DEFAULT_ENCODING_PNG_COMPRESS_LEVEL,
+        DEFAULT_ENCODING_WEBP_QUALITY,
+        DEFAULT_ENCODING_WEBP_LOSSLESS,
+        DEFAULT_ENCODING_WEBP_METHOD,
+        DEFAULT_WATCH_METHOD,
+        DEFAULT_WATCH_SETTLE_S,
+        DEFAULT_WATCH_POLL_INTERVAL_S,
+        DEFAULT_WATCH_MAX_IN_FLIGHT,
+        DEFAULT_WATCH_INITIAL_SCAN,
+        DEFAULT_WATCH_RETRY_S,
+        DEFAULT_WEB_PAGE_SIZE,
+        DEFAULT_WEB_THUMBNAILS,
+        DEFAULT_WEB_THUMBNAIL_PX,
+        DEFAULT_WEB_THUMBNAIL_CACHE_MB,
+        DEFAULT_WEB_WORKERS,
+        DEFAULT_WEB_THREADS,
+        DEFAULT_WEB_MAX_QUEUE,
+        DEFAULT_WEB_TIMEOUT_S,
+        DEFAULT_DEDUP_ENABLED,
+        DEFAULT_DEDUP_MAX_DISTANCE,
+        DEFAULT_DEDUP_WINDOW,
+        DEFAULT_INFERENCE_MIN_BOX_AREA,
+        DEFAULT_INFERENCE_MAX_DET,
+        DEFAULT_INFERENCE_RECT_BUCKETS,
+        DEFAULT_CASCADE_ENABLED,
+        DEFAULT_CASCADE_IMGSZ,
+        DEFAULT_CASCADE_CONF,
     )
 except Exception:
     # fallback for running the script directly (e.g., python backend/app/process_images.py)
-    from detection import process_folder, draw_boxes, is_image
+    from detection import process_folder, draw_boxes, is_image, RenderStyle
+    from detection.backends import export_for_backend
+    from detection.sharding import process_sharded
+    from detection.tiling import maybe_tiled, tiling_enabled
+    from detection.cascade import cascade_enabled, maybe_cascaded
+    from detection.archive import ArchiveWriter, is_archive
+    from detection.video import process_videos
+    from detection.watch import watch_folder
+    from detection.manifest import MANIFEST_NAME, Manifest, manifest_key, model_identity
+    from detection.cache import LRUCache, ResultCache
+    from detection.listing import DirectoryIndex, make_thumbnail
+    from detection.writers import BackgroundFileWriter, DetectionWriter
+    from detection.encoding import FORMATS, EncodeOptions, output_name, source_format
+    from detection.batcher import DynamicBatcher, Overloaded
+    from detection.serving import WorkerError, start_workers
+    from detection.detection import load_for_inference, predict_batch
+    from detection.postprocess import PostProcess
+    from detection.metrics import Metrics
+    from detection.loading import StartupProfile, load_model, warm_up
     from detection.constants import (
     DEFAULT_INFERENCE_DEVICE,
     DEFAULT_INFERENCE_IMGSZ,
     DEFAULT_INFERENCE_CONF,
+    DEFAULT_INFERENCE_BATCH_SIZE,
     DEFAULT_BOX_COLOR,
     DEFAULT_BOX_THICKNESS,
     DEFAULT_LABEL_BG_COLOR,
     DEFAULT_LABEL_TEXT_COLOR,
     DEFAULT_FONT_SIZE,
     DEFAULT_LABEL_PADDING,
+    DEFAULT_FONT_PATH,
+    DEFAULT_PIPELINE_DECODE_WORKERS,
+    DEFAULT_PIPELINE_ENCODE_WORKERS,
+    DEFAULT_PIPELINE_QUEUE_DEPTH,
+    DEFAULT_OUTPUT_MANIFEST,
+    DEFAULT_CACHE_MAX_MB,
+    DEFAULT_CACHE_DIR,
+    DEFAULT_OUTPUT_IMAGES,
+    DEFAULT_OUTPUT_JSONL,
+    DEFAULT_OUTPUT_NPZ,
+    DEFAULT_WEB_MAX_BATCH_SIZE,
+    DEFAULT_WEB_MAX_WAIT_MS,
+    DEFAULT_INFERENCE_WARMUP,
+    DEFAULT_INFERENCE_FUSED_SNAPSHOT,
+    DEFAULT_INFERENCE_BACKEND,
+    DEFAULT_INFERENCE_DRAFT_DECODE,
+    DEFAULT_TILING_ENABLED,
+    DEFAULT_TILING_SIZE,
+    DEFAULT_TILING_OVERLAP,
+    DEFAULT_TILING_BATCH_SIZE,
+    DEFAULT_TILING_IOU,
+    DEFAULT_TILING_FULL_IMAGE,
+    DEFAULT_VIDEO_EVERY,
+    DEFAULT_VIDEO_MOTION_THRESHOLD,
+    DEFAULT_METRICS_ENABLED,
+    DEFAULT_ENCODING_FORMAT,
+    DEFAULT_ENCODING_JPEG_QUALITY,
+    DEFAULT_ENCODING_PNG_COMPRESS_LEVEL,
+    DEFAULT_ENCODING_WEBP_QUALITY,
+    DEFAULT_ENCODING_WEBP_LOSSLESS,
+    DEFAULT_ENCODING_WEBP_METHOD,
+    DEFAULT_WATCH_METHOD,
+    DEFAULT_WATCH_SETTLE_S,
+    DEFAULT_WATCH_POLL_INTERVAL_S,
+    DEFAULT_WATCH_MAX_IN_FLIGHT,
+    DEFAULT_WATCH_INITIAL_SCAN,
+    DEFAULT_WATCH_RETRY_S,
+    DEFAULT_WEB_PAGE_SIZE,
+    DEFAULT_WEB_THUMBNAILS,
+    DEFAULT_WEB_THUMBNAIL_PX,
+    DEFAULT_WEB_THUMBNAIL_CACHE_MB,
+    DEFAULT_WEB_WORKERS,
+    DEFAULT_WEB_THREADS,
+    DEFAULT_WEB_MAX_QUEUE,
+    DEFAULT_WEB_TIMEOUT_S,
+    DEFAULT_DEDUP_ENABLED,
+    DEFAULT_DEDUP_MAX_DISTANCE,
+    DEFAULT_DEDUP_WINDOW,
+    DEFAULT_INFERENCE_MIN_BOX_AREA,
+    DEFAULT_INFERENCE_MAX_DET,
+    DEFAULT_INFERENCE_RECT_BUCKETS,
+    DEFAULT_CASCADE_ENABLED,
+    DEFAULT_CASCADE_IMGSZ,
+    DEFAULT_CASCADE_CONF,
     )
-import yaml
-
-# Web UI deps
-from flask import Flask, request, send_file, render_template_string, redirect, url_for
 import io
+import base64
+import hashlib
 from PIL import Image
-import webbrowser
+
+# ultralytics/torch, Flask, yaml and webbrowser are imported where they are
+# needed, so each mode only pays for its own dependencies at start-up
+
+_IMPORTS_DONE = time.perf_counter()
 
 CONFIG_PATH = Path(__file__).resolve().parents[1] / "config.yaml"
 
 
 def load_config():
     defaults = {
-        "inference": {"device": DEFAULT_INFERENCE_DEVICE, "imgsz": DEFAULT_INFERENCE_IMGSZ, "conf": DEFAULT_INFERENCE_CONF},
+        "inference": {
+            "device": DEFAULT_INFERENCE_DEVICE,
+            "imgsz": DEFAULT_INFERENCE_IMGSZ,
+            "conf": DEFAULT_INFERENCE_CONF,
+            "batch_size": DEFAULT_INFERENCE_BATCH_SIZE,
+            "warmup": DEFAULT_INFERENCE_WARMUP,
+            "fused_snapshot": DEFAULT_INFERENCE_FUSED_SNAPSHOT,
+            "backend": DEFAULT_INFERENCE_BACKEND,
+            "draft_decode": DEFAULT_INFERENCE_DRAFT_DECODE,
+            "min_box_area": DEFAULT_INFERENCE_MIN_BOX_AREA,
+            "max_det": DEFAULT_INFERENCE_MAX_DET,
+            "rect_buckets": DEFAULT_INFERENCE_RECT_BUCKETS,
+        },
         "drawing": {
             "box_color": DEFAULT_BOX_COLOR,
             "box_thickness": DEFAULT_BOX_THICKNESS,
@@ -52,10 +218,78 @@ def load_config():
             "label_text_color": DEFAULT_LABEL_TEXT_COLOR,
             "font_size": DEFAULT_FONT_SIZE,
             "label_padding": DEFAULT_LABEL_PADDING,
+            "font_path": DEFAULT_FONT_PATH,
+        },
+        "tiling": {
+            "enabled": DEFAULT_TILING_ENABLED,
+            "tile": DEFAULT_TILING_SIZE,
+            "overlap": DEFAULT_TILING_OVERLAP,
+            "batch_size": DEFAULT_TILING_BATCH_SIZE,
+            "iou": DEFAULT_TILING_IOU,
+            "full_image": DEFAULT_TILING_FULL_IMAGE,
+        },
+        "cascade": {
+            "enabled": DEFAULT_CASCADE_ENABLED,
+            "imgsz": DEFAULT_CASCADE_IMGSZ,
+            "conf": DEFAULT_CASCADE_CONF,
+        },
+        "video": {
+            "every": DEFAULT_VIDEO_EVERY,
+            "motion_threshold": DEFAULT_VIDEO_MOTION_THRESHOLD,
+        },
+        "dedup": {
+            "enabled": DEFAULT_DEDUP_ENABLED,
+            "max_distance": DEFAULT_DEDUP_MAX_DISTANCE,
+            "window": DEFAULT_DEDUP_WINDOW,
+        },
+        "watch": {
+            "method": DEFAULT_WATCH_METHOD,
+            "settle_s": DEFAULT_WATCH_SETTLE_S,
+            "poll_interval_s": DEFAULT_WATCH_POLL_INTERVAL_S,
+            "max_in_flight": DEFAULT_WATCH_MAX_IN_FLIGHT,
+            "initial_scan": DEFAULT_WATCH_INITIAL_SCAN,
+            "retry_s": DEFAULT_WATCH_RETRY_S,
+        },
+        "pipeline": {
+            "decode_workers": DEFAULT_PIPELINE_DECODE_WORKERS,
+            "encode_workers": DEFAULT_PIPELINE_ENCODE_WORKERS,
+            "queue_depth": DEFAULT_PIPELINE_QUEUE_DEPTH,
+        },
+        "metrics": {
+            "enabled": DEFAULT_METRICS_ENABLED,
+        },
+        "encoding": {
+            "format": DEFAULT_ENCODING_FORMAT,
+            "jpeg_quality": DEFAULT_ENCODING_JPEG_QUALITY,
+            "png_compress_level": DEFAULT_ENCODING_PNG_COMPRESS_LEVEL,
+            "webp_quality": DEFAULT_ENCODING_WEBP_QUALITY,
+            "webp_lossless": DEFAULT_ENCODING_WEBP_LOSSLESS,
+            "webp_method": DEFAULT_ENCODING_WEBP_METHOD,
+        },
+        "output": {
+            "images": DEFAULT_OUTPUT_IMAGES,
+            "jsonl": DEFAULT_OUTPUT_JSONL,
+            "npz": DEFAULT_OUTPUT_NPZ,
+            "manifest": DEFAULT_OUTPUT_MANIFEST,
+        },
+        "cache": {"max_mb": DEFAULT_CACHE_MAX_MB, "dir": DEFAULT_CACHE_DIR},
+        "web": {
+            "max_batch_size": DEFAULT_WEB_MAX_BATCH_SIZE,
+            "max_wait_ms": DEFAULT_WEB_MAX_WAIT_MS,
+            "workers": DEFAULT_WEB_WORKERS,
+            "threads": DEFAULT_WEB_THREADS,
+            "max_queue": DEFAULT_WEB_MAX_QUEUE,
+            "timeout_s": DEFAULT_WEB_TIMEOUT_S,
+            "page_size": DEFAULT_WEB_PAGE_SIZE,
+            "thumbnails": DEFAULT_WEB_THUMBNAILS,
+            "thumbnail_px": DEFAULT_WEB_THUMBNAIL_PX,
+            "thumbnail_cache_mb": DEFAULT_WEB_THUMBNAIL_CACHE_MB,
         },
     }
     if CONFIG_PATH.exists():
         try:
+            import yaml
+
             with open(CONFIG_PATH, "r") as f:
                 cfg = yaml.safe_load(f) or {}
                 # merge defaults shallowly
@@ -75,52 +309,7 @@ CFG = load_config()
 
 MODEL_PATH = Path(__file__).resolve().parent / "models" / "yolo12n.pt"
 
-def main():
-    p = argparse.ArgumentParser()
-    # default to backend/input and backend/output relative to the backend folder
-    repo_backend = Path(__file__).resolve().parents[1]
-    p.add_argument("-i", "--input", type=Path, default=repo_backend / "input")
-    p.add_argument("-o", "--output", type=Path, default=repo_backend / "output")
-    p.add_argument("-m", "--model", type=Path, default=Path(__file__).resolve().parent / "models" / "yolo12n.pt")
-    p.add_argument("--mode", choices=("cli", "web"), default="web", help="Run mode: cli (process folder) or web (start local UI)")
-    p.add_argument("--port", default=5000, help="Port for web UI (default 5000)")
-    args = p.parse_args()
-
-    args.input.mkdir(parents=True, exist_ok=True)
-    args.output.mkdir(parents=True, exist_ok=True)
-
-    # Check if model exists
-    if not args.model.exists():
-        print(f"Model not found: {args.model}")
-        print("Attempting to download model automatically...")
-        # Run download_model.sh
-        download_script = Path(__file__).resolve().parents[2] / "scripts" / "download_model.sh"
-        if download_script.exists():
-            subprocess.run(["bash", str(download_script)], check=True)
-        else:
-            raise FileNotFoundError(f"Download script not found: {download_script}")
-
-        # After downloading, verify the model exists
-        if not args.model.exists():
-            raise FileNotFoundError(f"Failed to download the model to {args.model}")
-
-    print("Loading model:", args.model)
-    model = YOLO(str(args.model))
-
-    cfg = load_config()
-    inf = cfg.get("inference", {})
-    device = inf.get("device", DEFAULT_INFERENCE_DEVICE)
-    imgsz = int(inf.get("imgsz", DEFAULT_INFERENCE_IMGSZ))
-    conf_val = float(inf.get("conf", DEFAULT_INFERENCE_CONF))
-
-    if args.mode == "cli":
-        # Process all images in input folder
-        process_folder(model, args.input, args.output, device=device, imgsz=imgsz, conf=conf_val, cfg=cfg)
-    else:  # web mode
-        # Start simple Flask web UI
-        app = Flask(__name__)
-
-        INDEX_HTML = """
+INDEX_HTML = """
 <!doctype html>
 <html>
   <head>
@@ -136,11 +325,21 @@ def main():
   <body>
     <h2>Human Detection</h2>
     <p>Choose image from the mounted folder.</p>
+        <form action="/" method="get">
+            <label>Search: <input type="text" name="q" value="{{q}}" placeholder="file name prefix"></label>
+            <button type="submit">Filter</button>
+            <span>{{total}} image{{'' if total == 1 else 's'}}{% if pages > 1 %}, page {{page}} of {{pages}}{% endif %}</span>
+        </form>
         <form action="/process" method="post">
+            <input type="hidden" name="q" value="{{q}}">
+            <input type="hidden" name="page" value="{{page}}">
             <div>
                 <label>Choose file:
                     <select name="choose">
                         <option value="">-- none --</option>
+                        {% if chosen and chosen not in files %}
+                        <option value="{{chosen}}" selected>{{chosen}}</option>
+                        {% endif %}
                         {% for f in files %}
                         <option value="{{f}}" {% if chosen==f %}selected{% endif %}>{{f}}</option>
                         {% endfor %}
@@ -149,12 +348,22 @@ def main():
                 <button type="submit">Process</button>
             </div>
         </form>
+        {% if pages > 1 %}
+        <div>
+            {% if page > 1 %}<a href="{{ url_for('index', q=q, page=page - 1, choose=chosen, processed=processed) }}">&laquo; previous</a>{% endif %}
+            {% if page < pages %}<a href="{{ url_for('index', q=q, page=page + 1, choose=chosen, processed=processed) }}">next &raquo;</a>{% endif %}
+        </div>
+        {% endif %}
 
         <div style="display:flex; gap:1rem; margin-top:1rem">
             <div style="flex:1;">
                 <h4>Input</h4>
                 {% if chosen %}
+                    {% if thumbnails %}
+                    <a href="/input/{{chosen}}"><img src="/thumb/input/{{chosen}}" alt="input"></a>
+                    {% else %}
                     <img src="/input/{{chosen}}" alt="input">
+                    {% endif %}
                 {% else %}
                     <p>No input selected.</p>
                 {% endif %}
@@ -162,7 +371,11 @@ def main():
             <div style="flex:1;">
                 <h4>Output</h4>
                 {% if processed %}
+                    {% if thumbnails %}
+                    <a href="/output/{{processed}}"><img src="/thumb/output/{{processed}}" alt="processed"></a>
+                    {% else %}
                     <img src="/output/{{processed}}" alt="processed">
+                    {% endif %}
                     <div><a href="/download/{{processed}}">Download processed</a></div>
                 {% else %}
                     <p>No processed image.</p>
@@ -176,82 +389,659 @@ def main():
 </html>
 """
 
-        @app.route("/", methods=["GET"])
-        def index():
-            files = [p.name for p in sorted(args.input.glob("*")) if is_image(p)]
-            chosen = request.args.get("choose")
-            processed = request.args.get("processed")
-            return render_template_string(INDEX_HTML, files=files, chosen=chosen, processed=processed)
-
-        def process_pil_image(img: Image.Image):
-            # run model.predict on PIL image and draw boxes
-            results = model.predict(source=img, device=device, imgsz=imgsz, conf=conf_val, verbose=False)
-            r = results[0]
-            boxes = []
-            if hasattr(r, "boxes") and r.boxes is not None and len(r.boxes) > 0:
-                xyxy = r.boxes.xyxy.tolist()
-                confs = r.boxes.conf.tolist()
-                clss = r.boxes.cls.tolist()
-                for xy, c, cls in zip(xyxy, confs, clss):
-                    if int(cls) == 0:
-                        boxes.append({"xyxy": xy, "conf": float(c), "class": int(cls)})
-            out_img = draw_boxes(img.convert("RGB"), boxes, cfg)
-            bio = io.BytesIO()
-            out_img.save(bio, format="PNG")
-            bio.seek(0)
-            return bio
-
-        @app.route("/process", methods=["POST"])
-        def process_route():
-            # Only allow choosing files from the input folder
-            chosen = request.form.get("choose", "")
-            if not chosen:
-                return redirect(url_for("index"))
-            p = args.input / chosen
-            if not (p.exists() and is_image(p)):
-                return redirect(url_for("index"))
 
-            img = Image.open(p).convert("RGB")
-            out_buf = process_pil_image(img)
+def _detection_identity(model_path: Path, cfg: dict) -> str:
+    """``model_identity`` plus the settings that change which boxes are found."""
+    inf = cfg.get("inference", {})
+    model_id = model_identity(model_path, inf.get("backend", DEFAULT_INFERENCE_BACKEND))
+    if tiling_enabled(cfg):
+        t = cfg["tiling"]
+        model_id += ":tiled-{}-{}-{}-{}".format(
+            t.get("tile", DEFAULT_TILING_SIZE),
+            t.get("overlap", DEFAULT_TILING_OVERLAP),
+            t.get("iou", DEFAULT_TILING_IOU),
+            t.get("full_image", DEFAULT_TILING_FULL_IMAGE),
+        )
+    elif inf.get("draft_decode", DEFAULT_INFERENCE_DRAFT_DECODE):
+        model_id += ":draft"
+    if cascade_enabled(cfg):
+        c = cfg["cascade"]
+        model_id += ":cascade-{}-{}".format(
+            c.get("imgsz", DEFAULT_CASCADE_IMGSZ),
+            c.get("conf", DEFAULT_CASCADE_CONF),
+        )
+    d = cfg.get("dedup", {}) or {}
+    if d.get("enabled", DEFAULT_DEDUP_ENABLED):
+        # near-duplicates copy another image's boxes
+        model_id += ":dedup-{}-{}".format(
+            d.get("max_distance", DEFAULT_DEDUP_MAX_DISTANCE),
+            d.get("window", DEFAULT_DEDUP_WINDOW),
+        )
+    min_area = inf.get("min_box_area", DEFAULT_INFERENCE_MIN_BOX_AREA)
+    max_det = inf.get("max_det", DEFAULT_INFERENCE_MAX_DET)
+    if (min_area, max_det) != (DEFAULT_INFERENCE_MIN_BOX_AREA, DEFAULT_INFERENCE_MAX_DET):
+        model_id += f":post-{min_area}-{max_det}"
+    return model_id
+
+
+def create_app(model, args, cfg: dict):
+    """Build the Flask web UI serving images from ``args.input`` / ``args.output``.
+
+    With ``web.workers`` > 0 inference runs in that many model processes
+    (loaded from ``args.model``) and ``model`` may be None.
+    """
+    from concurrent.futures import TimeoutError
+    from flask import Flask, request, send_file, render_template_string, redirect, url_for, jsonify
+    from werkzeug.utils import safe_join
+
+    inf = cfg.get("inference", {})
+    device = inf.get("device", DEFAULT_INFERENCE_DEVICE)
+    imgsz = int(inf.get("imgsz", DEFAULT_INFERENCE_IMGSZ))
+    conf_val = float(inf.get("conf", DEFAULT_INFERENCE_CONF))
+    cache = ResultCache.from_config(cfg)
+    style = RenderStyle.from_config(cfg)
+    web = cfg.get("web", {})
+    model_id = _detection_identity(args.model, cfg)
+    draft = inf.get("draft_decode", DEFAULT_INFERENCE_DRAFT_DECODE) and not tiling_enabled(cfg)
+    draft_imgsz = imgsz if draft else None
+    post = PostProcess.from_config(cfg, conf_val)
+    metrics = Metrics.from_config(cfg)
+    encoder = EncodeOptions.from_config(cfg)
+    # annotated outputs are served from memory and written to disk in the background
+    file_writer = BackgroundFileWriter(metrics.observer("write"))
+    served = {}  # output file name -> (render cache key, PIL format)
+    # the input listing is cached until the folder changes and shown a page at a time
+    listing = DirectoryIndex(args.input)
+    per_page = max(1, int(web.get("page_size", DEFAULT_WEB_PAGE_SIZE)))
+    thumbnails = bool(web.get("thumbnails", DEFAULT_WEB_THUMBNAILS))
+    thumb_px = int(web.get("thumbnail_px", DEFAULT_WEB_THUMBNAIL_PX))
+    thumb_cache = LRUCache(int(float(web.get("thumbnail_cache_mb", DEFAULT_WEB_THUMBNAIL_CACHE_MB)) * 1024 * 1024))
+
+    app = Flask(__name__)
+    app.config["listing"] = listing
+
+    @app.route("/", methods=["GET"])
+    def index():
+        q = request.args.get("q", "")
+        page = max(1, request.args.get("page", 1, type=int))
+        files, total = listing.page(q, page, per_page)
+        return render_template_string(
+            INDEX_HTML,
+            files=files,
+            chosen=request.args.get("choose"),
+            processed=request.args.get("processed"),
+            q=q,
+            page=page,
+            pages=max(1, -(-total // per_page)),
+            total=total,
+            thumbnails=thumbnails,
+        )
+
+    # All inference goes through the batcher, which coalesces concurrent requests
+    # into batched predict calls: on one thread owning ``model``, or one thread per
+    # model worker process. Its bounded queue sheds load (503) instead of piling it up.
+    workers = int(web.get("workers", DEFAULT_WEB_WORKERS) or 0)
+    if workers > 0:
+        loader = partial(
+            load_model,
+            fused_snapshot=bool(inf.get("fused_snapshot", DEFAULT_INFERENCE_FUSED_SNAPSHOT)),
+            backend=inf.get("backend", DEFAULT_INFERENCE_BACKEND),
+        )
+        predict_kwargs = {"conf": conf_val, "device": device, "imgsz": imgsz}
+        pool = start_workers(args.model, workers, predict_kwargs, cfg, web.get("threads", DEFAULT_WEB_THREADS), loader)
+        predict_fn = pool
+    else:
+        pool = []
+        model = maybe_cascaded(maybe_tiled(model, cfg), cfg)
+
+        def predict_fn(imgs):
+            return [post.select(r) for r in predict_batch(model, imgs, conf_val, device, imgsz, post.classes)]
+
+    batcher = DynamicBatcher(
+        predict_fn,
+        max_batch_size=web.get("max_batch_size", DEFAULT_WEB_MAX_BATCH_SIZE),
+        max_wait_ms=web.get("max_wait_ms", DEFAULT_WEB_MAX_WAIT_MS),
+        max_queue=web.get("max_queue", DEFAULT_WEB_MAX_QUEUE),
+    )
+    timeout = web.get("timeout_s", DEFAULT_WEB_TIMEOUT_S)
+    app.config["batcher"] = batcher
+    app.config["workers"] = pool
+    app.config["metrics"] = metrics
+    app.config["file_writer"] = file_writer
+
+    def detect_pil_image(img: Image.Image, full_size=None):
+        # run model.predict on PIL image and keep person boxes, mapped to full_size if it was a draft decode
+        with metrics.time("infer"):
+            try:
+                result = batcher(img, timeout=timeout)
+            except TimeoutError:
+                # waited too long for a result: shed it like a full queue
+                raise Overloaded(f"no result within {timeout}s") from None
+            boxes = post.finish(result, img.size, full_size)
+        metrics.inc("images")
+        metrics.inc("persons", len(boxes))
+        return boxes
+
+    def process_pil_image(img: Image.Image, boxes=None, fmt: str = "PNG") -> bytes:
+        # draw boxes (detecting them first unless already known) and encode once as ``fmt``
+        if boxes is None:
+            boxes = detect_pil_image(img)
+        with metrics.time("render"):
+            out_img = draw_boxes(img.convert("RGB"), boxes, style)
+        with metrics.time("encode"):
+            return encoder.encode(out_img, fmt)
+
+    @app.route("/process", methods=["POST"])
+    def process_route():
+        # Only allow choosing files from the input folder
+        chosen = request.form.get("choose", "")
+        if not chosen:
+            return redirect(url_for("index"))
+        p = args.input / chosen
+        if not (p.exists() and is_image(p)):
+            return redirect(url_for("index"))
 
-            # Ensure output directory exists
-            args.output.mkdir(parents=True, exist_ok=True)
-            out_name = f"processed_{chosen}"
-            out_path = args.output / out_name
-            # Save using PIL from buffer to preserve PNG content
-            with open(out_path, "wb") as f:
-                f.write(out_buf.getbuffer())
+        # Reuse the encoded output, or at least the detections, from earlier requests
+        fmt = encoder.resolve(source_format(p))
+        det_key = cache.detection_key(p, model_id, conf_val, imgsz)
+        render_key = cache.render_key(det_key, cfg, encoder.identity(fmt))
+        out_bytes = cache.get_rendered(render_key)
+        if out_bytes is None:
+            img = None
+            boxes = cache.get_detections(det_key)
+            if boxes is None:
+                with metrics.time("decode"):
+                    img, full_size = load_for_inference(p, draft_imgsz)
+                boxes = detect_pil_image(img, full_size)
+                cache.put_detections(det_key, boxes)
+            if img is None or img.size != full_size:
+                with metrics.time("decode"):
+                    img = Image.open(p).convert("RGB")
+            out_bytes = process_pil_image(img, boxes, fmt)
+            cache.put_rendered(render_key, out_bytes)
 
-            # Redirect back to index so both images can be shown
-            response = redirect(url_for("index", choose=chosen, processed=out_name))
-            # Prevent automatic download by setting Content-Disposition to inline
+        # The browser fetches the result from memory; the copy on disk is written off this thread
+        out_name = output_name(f"processed_{chosen}", fmt)
+        served[out_name] = (render_key, fmt)
+        file_writer.submit(args.output / out_name, out_bytes)
+
+        # Redirect back to index (same search and page) so both images can be shown
+        response = redirect(
+            url_for(
+                "index",
+                q=request.form.get("q") or None,
+                page=request.form.get("page") or None,
+                choose=chosen,
+                processed=out_name,
+            )
+        )
+        # Prevent automatic download by setting Content-Disposition to inline
+        response.headers["Content-Disposition"] = "inline"
+        return response
+
+    @app.route("/api/detect", methods=["POST"])
+    def api_detect():
+        # Accept either a multipart "image" field or the raw image bytes as the body
+        upload = request.files.get("image")
+        data = upload.read() if upload is not None else request.get_data()
+        if not data:
+            metrics.inc("errors")
+            return jsonify(error="no image data"), 400
+        try:
+            with metrics.time("decode"):
+                img, full_size = load_for_inference(io.BytesIO(data), draft_imgsz)
+        except Exception:
+            metrics.inc("errors")
+            return jsonify(error="could not decode image"), 400
+
+        boxes = detect_pil_image(img, full_size)
+        payload = {"width": full_size[0], "height": full_size[1], "boxes": boxes.to_list()}
+        if request.args.get("annotate", "").lower() in ("1", "true", "yes"):
+            if img.size != full_size:
+                with metrics.time("decode"):
+                    img = Image.open(io.BytesIO(data)).convert("RGB")
+            fmt = encoder.resolve(source_format(io.BytesIO(data)))
+            payload["image"] = base64.b64encode(process_pil_image(img, boxes, fmt)).decode("ascii")
+            payload["image_format"] = FORMATS[fmt][0]
+        return jsonify(payload)
+
+    @app.errorhandler(Overloaded)
+    def overloaded(e):
+        # shed load quickly so admitted requests keep a steady latency
+        metrics.inc("rejected")
+        message = "server busy, retry shortly"
+        if request.path.startswith("/api/"):
+            response = jsonify(error=message)
+        else:
+            response = app.response_class(message + "\n", mimetype="text/plain")
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        return response
+
+    @app.errorhandler(WorkerError)
+    def worker_failed(e):
+        # a crashed model worker is restarted on the next batch: the server is unhealthy, not the request
+        print(f"Model worker failed: {e}")
+        metrics.inc("errors")
+        message = "model worker unavailable, retry shortly"
+        if request.path.startswith("/api/"):
+            response = jsonify(error=message)
+        else:
+            response = app.response_class(message + "\n", mimetype="text/plain")
+        response.status_code = 503
+        # restarting a worker means loading the model again
+        response.headers["Retry-After"] = "5"
+        return response
+
+    @app.route("/metrics")
+    def metrics_route():
+        # Prometheus text exposition of the stage latencies and counters
+        if not metrics.enabled:
+            return "metrics disabled\n", 404
+        return app.response_class(metrics.prometheus(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/download/<path:fname>")
+    def download_file(fname: str):
+        # Serve files only from the output directory
+        candidate = args.output / fname
+        file_writer.wait(candidate)
+        if not candidate.exists() or not candidate.is_file():
+            return redirect(url_for("index"))
+        return send_file(str(candidate), as_attachment=True, download_name=fname)
+
+    @app.route("/input/<path:fname>")
+    def serve_input(fname: str):
+        candidate = args.input / fname
+        if not candidate.exists() or not candidate.is_file() or not is_image(candidate):
+            return redirect(url_for("index"))
+        return send_file(str(candidate))
+
+    def served_output(fname: str):
+        # (render key, bytes, PIL format) of a freshly processed image still in memory
+        key, fmt = served.get(fname, (None, None))
+        data = cache.get_rendered(key) if key is not None else None
+        return (key, data, fmt) if data is not None else (None, None, None)
+
+    @app.route("/output/<path:fname>")
+    def serve_output(fname: str):
+        # Freshly processed images come straight from the in-memory cache; the
+        # render key is a content hash, so it doubles as the ETag
+        key, data, fmt = served_output(fname)
+        if data is not None:
+            response = send_file(io.BytesIO(data), mimetype=FORMATS[fmt][1], etag=key)
+            # the name is reused when settings change, so clients revalidate (304) every time
+            response.cache_control.no_cache = True
             response.headers["Content-Disposition"] = "inline"
             return response
+        candidate = args.output / fname
+        file_writer.wait(candidate)
+        if not candidate.exists() or not candidate.is_file():
+            return redirect(url_for("index"))
+        response = send_file(str(candidate))
+        response.headers["Content-Disposition"] = "inline"
+        return response
 
-        @app.route("/download/<path:fname>")
-        def download_file(fname: str):
-            # Serve files only from the output directory
-            candidate = args.output / fname
-            if not candidate.exists() or not candidate.is_file():
+    @app.route("/thumb/<kind>/<path:fname>")
+    def thumbnail(kind: str, fname: str):
+        # Small JPEG previews, cached by the source file's identity
+        folder = {"input": args.input, "output": args.output}.get(kind)
+        path = safe_join(str(folder), fname) if folder is not None else None
+        if path is None:
+            return redirect(url_for("index"))
+        key, data, _ = served_output(fname) if kind == "output" else (None, None, None)
+        if data is not None:
+            key, src = f"out:{key}", io.BytesIO(data)
+        else:
+            candidate = Path(path)
+            file_writer.wait(candidate)
+            if not is_image(candidate):
                 return redirect(url_for("index"))
-            return send_file(str(candidate), as_attachment=True, download_name=fname)
+            st = candidate.stat()
+            key, src = f"{kind}:{fname}:{st.st_size}:{st.st_mtime_ns}", candidate
+        etag = hashlib.sha1(f"{key}:{thumb_px}".encode()).hexdigest()[:20]
+        thumb = thumb_cache.get(etag)
+        if thumb is None:
+            with metrics.time("thumbnail"):
+                thumb = make_thumbnail(src, thumb_px)
+            thumb_cache.put(etag, thumb, len(thumb))
+        response = send_file(io.BytesIO(thumb), mimetype="image/jpeg", etag=etag)
+        response.cache_control.no_cache = True
+        return response
 
-        @app.route("/input/<path:fname>")
-        def serve_input(fname: str):
-            candidate = args.input / fname
-            if not candidate.exists() or not candidate.is_file() or not is_image(candidate):
-                return redirect(url_for("index"))
-            return send_file(str(candidate))
+    return app
 
-        @app.route("/output/<path:fname>")
-        def serve_output(fname: str):
-            candidate = args.output / fname
-            if not candidate.exists() or not candidate.is_file():
-                return redirect(url_for("index"))
-            response = send_file(str(candidate))
-            response.headers["Content-Disposition"] = "inline"
-            return response
 
+def main():
+    p = argparse.ArgumentParser()
+    # default to backend/input and backend/output relative to the backend folder
+    repo_backend = Path(__file__).resolve().parents[1]
+    p.add_argument(
+        "-i", "--input", type=Path, default=repo_backend / "input", help="Folder, or (cli mode) a zip/tar archive"
+    )
+    p.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=repo_backend / "output",
+        help="Folder, or (cli mode) a .zip/.tar[.gz] archive to write all outputs into",
+    )
+    p.add_argument("-m", "--model", type=Path, default=Path(__file__).resolve().parent / "models" / "yolo12n.pt")
+    p.add_argument(
+        "--mode",
+        choices=("cli", "web", "video", "watch"),
+        default="web",
+        help=(
+            "Run mode: cli (process folder), web (start local UI), video (process a video file or folder of videos) "
+            "or watch (keep running and process images as they arrive in the input folder)"
+        ),
+    )
+    p.add_argument("--port", default=5000, help="Port for web UI (default 5000)")
+    p.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Images per model.predict call in cli mode (overrides inference.batch_size)",
+    )
+    p.add_argument("--decode-workers", type=int, default=None, help="Decode threads in cli mode (0 = inline)")
+    p.add_argument("--encode-workers", type=int, default=None, help="Render/encode threads in cli mode (0 = inline)")
+    p.add_argument("--queue-depth", type=int, default=None, help="Max images buffered between pipeline stages")
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes, each with its own model: shards in cli mode, inference workers in web mode",
+    )
+    p.add_argument("--threads", type=int, default=None, help="Torch threads per worker (default: cores / workers)")
+    p.add_argument(
+        "--max-queue",
+        type=int,
+        default=None,
+        help="Web mode: requests allowed to wait for a model before new ones get 503 (overrides web.max_queue)",
+    )
+    p.add_argument("--force", action="store_true", help="Reprocess images even if the output manifest says they are current")
+    p.add_argument("--no-images", action="store_true", help="Do not draw or save annotated images in cli mode")
+    p.add_argument(
+        "--jsonl",
+        nargs="?",
+        const="detections.jsonl",
+        default=None,
+        help="Stream detections to this JSONL file (relative to --output)",
+    )
+    p.add_argument("--startup-profile", action="store_true", help="Print where start-up time goes")
+    p.add_argument("--no-metrics", action="store_true", help="Disable stage latency metrics (/metrics, run summary)")
+    p.add_argument("--every", type=int, default=None, help="Video mode: run the model on every Nth frame")
+    p.add_argument(
+        "--motion-threshold",
+        type=float,
+        default=None,
+        help="Video mode: skip frames whose mean pixel difference from the last inferred frame is at most this (0-255)",
+    )
+    p.add_argument(
+        "--dedup",
+        nargs="?",
+        type=int,
+        const=DEFAULT_DEDUP_MAX_DISTANCE,
+        default=None,
+        help="Reuse detections for near-duplicate images within this many hash bits (enables dedup.enabled)",
+    )
+    p.add_argument(
+        "--cascade",
+        nargs="?",
+        type=int,
+        const=DEFAULT_CASCADE_IMGSZ,
+        default=None,
+        help="Run a coarse pass at this size first; only images with candidates get the full pass (enables cascade.enabled)",
+    )
+    p.add_argument("--poll", action="store_true", help="Watch mode: poll the input folder instead of using inotify")
+    p.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="Watch mode: max images queued or being processed (overrides watch.max_in_flight)",
+    )
+    p.add_argument("--tile", type=int, default=None, help="Enable tiled inference with this tile size in px")
+    p.add_argument("--tile-overlap", type=int, default=None, help="Overlap between tiles in px (overrides tiling.overlap)")
+    p.add_argument(
+        "--draft-decode",
+        action="store_true",
+        help="Decode large JPEGs at reduced scale for inference (overrides inference.draft_decode)",
+    )
+    p.add_argument(
+        "--rect-buckets",
+        action="store_true",
+        help="Batch folder images by aspect-ratio bucket at rectangular input shapes (sets inference.rect_buckets: true)",
+    )
+    p.add_argument(
+        "--backend",
+        choices=("torch", "onnx", "onnx-int8"),
+        default=None,
+        help=(
+            "Inference backend (overrides inference.backend); onnx runs ONNX Runtime on the CPU, "
+            "onnx-int8 a dynamically quantized INT8 copy of the model"
+        ),
+    )
+    p.add_argument(
+        "--npz",
+        nargs="?",
+        const="detections.npz",
+        default=None,
+        help="Also dump detections as columnar NumPy arrays (relative to --output)",
+    )
+    args = p.parse_args()
+    profile = StartupProfile(args.startup_profile, t0=_T0)
+    profile.add("module imports", _IMPORTS_DONE - _T0)
+
+    archive_in, archive_out = is_archive(args.input), is_archive(args.output)
+    if (archive_in or archive_out) and args.mode != "cli":
+        p.error("zip/tar archives as --input or --output are only supported in cli mode")
+    if archive_in and not args.input.is_file():
+        p.error(f"archive not found: {args.input}")
+    if not args.input.is_file():
+        args.input.mkdir(parents=True, exist_ok=True)
+    if not archive_out:
+        args.output.mkdir(parents=True, exist_ok=True)
+
+    # Check if model exists
+    if not args.model.exists():
+        print(f"Model not found: {args.model}")
+        print("Attempting to download model automatically...")
+        # Run download_model.sh
+        download_script = Path(__file__).resolve().parents[2] / "scripts" / "download_model.sh"
+        if download_script.exists():
+            subprocess.run(["bash", str(download_script)], check=True)
+        else:
+            raise FileNotFoundError(f"Download script not found: {download_script}")
+
+        # After downloading, verify the model exists
+        if not args.model.exists():
+            raise FileNotFoundError(f"Failed to download the model to {args.model}")
+
+    with profile.phase("config"):
+        cfg = load_config()
+    inf = cfg.get("inference", {})
+    device = inf.get("device", DEFAULT_INFERENCE_DEVICE)
+    imgsz = int(inf.get("imgsz", DEFAULT_INFERENCE_IMGSZ))
+    conf_val = float(inf.get("conf", DEFAULT_INFERENCE_CONF))
+    batch_size = int(args.batch_size or inf.get("batch_size", DEFAULT_INFERENCE_BATCH_SIZE))
+    if args.backend:
+        inf["backend"] = args.backend
+    if args.draft_decode:
+        inf["draft_decode"] = True
+    if args.rect_buckets:
+        inf["rect_buckets"] = True
+    video = cfg.setdefault("video", {})
+    if args.every is not None:
+        video["every"] = args.every
+    if args.motion_threshold is not None:
+        video["motion_threshold"] = args.motion_threshold
+    if args.dedup is not None:
+        cfg.setdefault("dedup", {}).update(enabled=True, max_distance=args.dedup)
+    if args.cascade is not None:
+        cfg.setdefault("cascade", {}).update(enabled=True, imgsz=args.cascade)
+    watch = cfg.setdefault("watch", {})
+    if args.poll:
+        watch["method"] = "poll"
+    if args.max_in_flight is not None:
+        watch["max_in_flight"] = args.max_in_flight
+    tiling = cfg.setdefault("tiling", {})
+    if args.tile:
+        tiling.update(enabled=True, tile=args.tile)
+    if args.tile_overlap is not None:
+        tiling["overlap"] = args.tile_overlap
+    web = cfg.setdefault("web", {})
+    if args.mode == "web" and args.workers is not None:
+        web["workers"] = args.workers
+    if args.threads is not None:
+        web["threads"] = args.threads
+    if args.max_queue is not None:
+        web["max_queue"] = args.max_queue
+    if args.no_metrics:
+        cfg.setdefault("metrics", {})["enabled"] = False
+    # web mode builds its own in create_app and serves it on /metrics
+    metrics = Metrics.from_config(cfg)
+    backend = inf.get("backend", DEFAULT_INFERENCE_BACKEND)
+    fused = bool(inf.get("fused_snapshot", DEFAULT_INFERENCE_FUSED_SNAPSHOT))
+    pipe = cfg.setdefault("pipeline", {})
+    for key in ("decode_workers", "encode_workers", "queue_depth"):
+        if getattr(args, key) is not None:
+            pipe[key] = getattr(args, key)
+
+    out_cfg = cfg.setdefault("output", {})
+    save_images = bool(out_cfg.get("images", DEFAULT_OUTPUT_IMAGES)) and not args.no_images
+    jsonl = args.jsonl or out_cfg.get("jsonl", DEFAULT_OUTPUT_JSONL)
+    npz = args.npz or out_cfg.get("npz", DEFAULT_OUTPUT_NPZ)
+    # into an output archive, detection files are staged in a temporary folder and added on close
+    detections_dir = Path(tempfile.mkdtemp(prefix="detections-")) if archive_out and (jsonl or npz) else args.output
+    jsonl_path = detections_dir / jsonl if jsonl else None
+    npz_path = detections_dir / npz if npz else None
+
+    key = None
+    # the manifest tracks annotated images; detection files are rewritten on every run
+    use_manifest = save_images and not (jsonl or npz) and out_cfg.get("manifest", DEFAULT_OUTPUT_MANIFEST)
+    use_manifest = use_manifest and not (archive_in or archive_out)
+    if args.mode in ("cli", "watch") and use_manifest:
+        key = manifest_key(_detection_identity(args.model, cfg), conf_val, imgsz, cfg)
+        if args.force:
+            # drop previous entries so everything is redone (and re-recorded)
+            (args.output / MANIFEST_NAME).unlink(missing_ok=True)
+
+    if (args.workers or 1) > 1 and (archive_in or archive_out):
+        print("Archives are read and written by a single process; ignoring --workers")
+        args.workers = 1
+    if args.mode == "cli" and (args.workers or 1) > 1:
+        # export (and quantize) once here rather than racing to do it in every worker
+        export_for_backend(args.model, backend)
+        # Each worker process loads its own copy of the model
+        process_sharded(
+            args.model,
+            args.input,
+            args.output,
+            device=device,
+            imgsz=imgsz,
+            conf=conf_val,
+            cfg=cfg,
+            batch_size=batch_size,
+            workers=args.workers,
+            threads=args.threads,
+            loader=partial(load_model, fused_snapshot=fused, backend=backend),
+            manifest_key=key,
+            save_images=save_images,
+            jsonl_path=jsonl_path,
+            npz_path=npz_path,
+            metrics=metrics,
+        )
+        if metrics.enabled:
+            print(metrics.summary())
+        return
+
+    if args.mode == "web" and int(web.get("workers", DEFAULT_WEB_WORKERS) or 0) > 0:
+        # the model worker processes started by create_app load their own copies
+        model = None
+        export_for_backend(args.model, backend)
+    else:
+        print("Loading model:", args.model)
+        with profile.phase("model load"):
+            model = load_model(args.model, fused_snapshot=fused, backend=backend)
+        if inf.get("warmup", DEFAULT_INFERENCE_WARMUP):
+            with profile.phase("warm-up"):
+                warm_up(model, device, imgsz)
+
+    if args.mode == "video":
+        if profile.enabled:
+            print(profile.report())
+        writer = DetectionWriter(jsonl_path, npz_path) if (jsonl_path or npz_path) else None
+        try:
+            process_videos(
+                model,
+                args.input,
+                args.output,
+                device=device,
+                imgsz=imgsz,
+                conf=conf_val,
+                cfg=cfg,
+                save_video=save_images,
+                writer=writer,
+                metrics=metrics,
+            )
+        finally:
+            if writer is not None:
+                writer.close()
+        if metrics.enabled:
+            print(metrics.summary())
+    elif args.mode in ("cli", "watch"):
+        if profile.enabled:
+            print(profile.report())
+        # Process all images in input folder, skipping those the manifest marks as current;
+        # watch mode keeps doing so for every image that arrives later
+        manifest = Manifest.open(args.output, key) if key else None
+        writer = DetectionWriter(jsonl_path, npz_path) if (jsonl_path or npz_path) else None
+        run = watch_folder if args.mode == "watch" else process_folder
+        out_archive = ArchiveWriter(args.output) if archive_out else None
+        finished = False
+        try:
+            run(
+                model,
+                args.input,
+                args.output,
+                device=device,
+                imgsz=imgsz,
+                conf=conf_val,
+                cfg=cfg,
+                batch_size=batch_size,
+                manifest=manifest,
+                save_images=save_images,
+                writer=writer,
+                metrics=metrics,
+                **({"out_archive": out_archive} if out_archive is not None else {}),
+            )
+            finished = True
+        finally:
+            if manifest is not None:
+                manifest.close()
+            if writer is not None:
+                writer.close()
+            if out_archive is not None:
+                try:
+                    if finished:
+                        for name, path in ((jsonl, jsonl_path), (npz, npz_path)):
+                            if path is not None and path.exists():
+                                out_archive.add_file(str(name), path)
+                        out_archive.close()
+                        print(f"Wrote {args.output}")
+                finally:
+                    # a failed run leaves no archive behind rather than a truncated one
+                    out_archive.abort()
+                    if detections_dir != args.output:
+                        shutil.rmtree(detections_dir, ignore_errors=True)
+        if metrics.enabled:
+            print(metrics.summary())
+    else:  # web mode
+        import webbrowser
+
+        with profile.phase("web app"):
+            app = create_app(model, args, cfg)
+        if profile.enabled:
+            print(profile.report())
         host = "0.0.0.0"
         port = int(args.port)
         url = f"http://{host}:{port}/"
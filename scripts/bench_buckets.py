@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Compare folder processing with and without aspect-ratio buckets on a mixed portrait/landscape folder.
+
+Runs ``process_folder`` three times over the same images: with
+``inference.rect_buckets`` off (one model call per distinct image size), with
+it on, and with the bucketed batches letterboxed to a square ``imgsz``
+instead, which is what a batch of mixed sizes gets from ultralytics. Reports
+images/sec, model calls, the padding share of the model input and whether
+the first two runs gave every image the same boxes. Without ``--images`` a
+synthetic folder is generated with phone and camera resolutions in both
+orientations.
+
+    python scripts/bench_buckets.py -m backend/app/models/yolo12n.pt --batch-size 8
+    python scripts/bench_buckets.py --images photos/ --batch-size 8 --json buckets.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.app.detection.detection import process_folder  # noqa: E402
+from backend.app.detection.loading import load_model, warm_up  # noqa: E402
+from backend.app.detection.writers import DetectionWriter  # noqa: E402
+
+# landscape sizes; each is also generated rotated to portrait
+MIXED_SIZES = [(1920, 1080), (1280, 720), (4032, 3024), (1600, 1200), (2560, 1440), (1000, 562)]
+
+
+def make_mixed_folder(folder: Path, count: int, seed: int = 0):
+    """``count`` smooth synthetic JPEGs cycling through ``MIXED_SIZES``, alternating landscape and portrait."""
+    rng = np.random.default_rng(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    for k in range(count):
+        w, h = MIXED_SIZES[(k // 2) % len(MIXED_SIZES)]
+        if k % 2:
+            w, h = h, w
+        small = rng.integers(0, 255, (max(1, h // 32), max(1, w // 32), 3), dtype=np.uint8)
+        Image.fromarray(small).resize((w, h), Image.BILINEAR).save(folder / f"img{k:03d}.jpg", quality=90)
+
+
+class Collect(DetectionWriter):
+    """Keeps each image's boxes in memory instead of writing a file."""
+
+    def __init__(self):
+        self.boxes = {}
+
+    def write(self, name, size, boxes, **extra):
+        self.boxes[name] = boxes
+
+    def close(self):
+        pass
+
+
+class CountCalls:
+    """Forwards ``predict`` to ``model`` and counts the calls; with ``square`` every call runs at ``square`` x ``square``."""
+
+    def __init__(self, model, square: int = 0):
+        self.model = model
+        self.square = square
+        self.calls = 0
+
+    def predict(self, source, **kwargs):
+        self.calls += 1
+        if self.square:
+            kwargs["imgsz"] = (self.square, self.square)
+        return self.model.predict(source=source, **kwargs)
+
+
+def run(model, images: Path, rect: bool, args, square: bool = False):
+    cfg = {"inference": {"rect_buckets": rect}, "pipeline": {"decode_workers": args.decode_workers}}
+    counted, writer = CountCalls(model, args.imgsz if square else 0), Collect()
+    with tempfile.TemporaryDirectory() as out, contextlib.redirect_stdout(io.StringIO()):
+        summary = process_folder(
+            counted,
+            images,
+            Path(out),
+            args.conf,
+            args.device,
+            args.imgsz,
+            cfg,
+            batch_size=args.batch_size,
+            save_images=False,
+            writer=writer,
+            report=False,
+        )
+    stats = summary["buckets"]
+    return {
+        "run": "square" if square else "buckets" if rect else "per-size",
+        "images": summary["images"],
+        "wall_s": summary["wall"],
+        "images_per_s": summary["images"] / summary["wall"] if summary["wall"] else 0.0,
+        "infer_s": summary["stages"]["infer"].busy,
+        "model_calls": counted.calls,
+        "input_shapes": len(stats.shapes) if stats else None,
+        "padding": stats.padding if stats else None,
+        "square_padding": stats.square_padding if stats else None,
+    }, writer.boxes
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--images", type=Path, default=None, help="Folder of images (default: generate a mixed one)")
+    p.add_argument("--count", type=int, default=24, help="Images to generate without --images")
+    p.add_argument("-m", "--model", type=Path, default=Path("backend/app/models/yolo12n.pt"))
+    p.add_argument("--backend", choices=("torch", "onnx", "onnx-int8"), default="torch")
+    p.add_argument("--device", default="cpu")
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--conf", type=float, default=0.25)
+    p.add_argument("--batch-size", type=int, default=8)
+    p.add_argument("--decode-workers", type=int, default=2)
+    p.add_argument("--json", type=Path, default=None, help="Also write the results to this file")
+    args = p.parse_args()
+
+    model = load_model(args.model, backend=args.backend)
+    warm_up(model, args.device, args.imgsz)
+    with tempfile.TemporaryDirectory() as tmp:
+        images = args.images
+        if images is None:
+            images = Path(tmp) / "mixed"
+            make_mixed_folder(images, args.count)
+        # bucketed run last, so any remaining warm-up cost falls on the others
+        square, _ = run(model, images, True, args, square=True)
+        base, base_boxes = run(model, images, False, args)
+        rect, rect_boxes = run(model, images, True, args)
+
+    same = sum(base_boxes[n] == rect_boxes.get(n) for n in base_boxes)
+    print(f"{base['images']} images, batch size {args.batch_size}, imgsz {args.imgsz}")
+    for r in (square, base, rect):
+        print(
+            f"  {r['run']:<8}  {r['images_per_s']:6.2f} img/s  "
+            f"infer {r['infer_s']:6.2f}s  {r['model_calls']:3d} model calls"
+        )
+    print(
+        f"{rect['input_shapes']} input shapes; padding {100 * rect['padding']:.1f}% of input pixels "
+        f"vs {100 * rect['square_padding']:.1f}% letterboxed to {args.imgsz}x{args.imgsz}"
+    )
+    print(
+        f"buckets vs square: {100 * (rect['images_per_s'] / square['images_per_s'] - 1):+.1f}% img/s; "
+        f"vs per-size: {100 * (rect['images_per_s'] / base['images_per_s'] - 1):+.1f}% img/s; "
+        f"identical boxes for {same}/{len(base_boxes)} images"
+    )
+    if args.json:
+        args.json.write_text(
+            json.dumps({"square": square, "per_size": base, "buckets": rect, "identical": same}, indent=2)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Compare single-pass and coarse-to-fine cascade inference on a folder of images.
+
+Runs every image once at ``--imgsz`` (the baseline), then through a
+``CascadeModel`` for each ``--coarse-conf``. Reports, per run, how many
+images skipped the full pass, the model input pixels against the baseline,
+images/sec, and recall against the baseline: the share of its person boxes
+the cascade also found (matched one-to-one at IoU 0.5) and the share of
+images with people in which the cascade still found someone. Use a folder
+that looks like production, empty frames included: the savings depend on
+how many images have nobody in them.
+
+    python scripts/bench_cascade.py --images backend/input --coarse-imgsz 320 --coarse-conf 0.02 0.05 0.1
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.app.detection.cascade import CascadeModel  # noqa: E402
+from backend.app.detection.detection import is_image, predict_batch  # noqa: E402
+from backend.app.detection.loading import load_model, warm_up  # noqa: E402
+from backend.app.detection.postprocess import PostProcess  # noqa: E402
+
+
+def matched(ref: np.ndarray, pred: np.ndarray, thr: float = 0.5) -> int:
+    """Number of reference boxes matched one-to-one by a prediction with IoU >= ``thr``."""
+    if not len(ref) or not len(pred):
+        return 0
+    ix = np.clip(np.minimum(ref[:, None, 2], pred[None, :, 2]) - np.maximum(ref[:, None, 0], pred[None, :, 0]), 0, None)
+    iy = np.clip(np.minimum(ref[:, None, 3], pred[None, :, 3]) - np.maximum(ref[:, None, 1], pred[None, :, 1]), 0, None)
+    inter = ix * iy
+    area = lambda b: (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])  # noqa: E731
+    iou = inter / (area(ref)[:, None] + area(pred)[None, :] - inter + 1e-9)
+    hits, used = 0, set()
+    for g in range(len(ref)):
+        for p in np.argsort(-iou[g]):
+            if iou[g, p] < thr:
+                break
+            if p not in used:
+                used.add(p)
+                hits += 1
+                break
+    return hits
+
+
+def detect(model, images, args):
+    """Person boxes per image and the total inference seconds."""
+    post = PostProcess(conf=args.conf)
+    boxes, seconds = [], 0.0
+    for img in images:
+        t0 = time.perf_counter()
+        r = predict_batch(model, [img], args.conf, args.device, args.imgsz, post.classes)[0]
+        seconds += time.perf_counter() - t0
+        boxes.append(post(r).xyxy)
+    return boxes, seconds
+
+
+def compare(name: str, ref_boxes, boxes, seconds: float, stats=None) -> dict:
+    """Recall of ``boxes`` against the single-pass ``ref_boxes``, plus speed and compute of the run."""
+    ref_total = sum(len(b) for b in ref_boxes)
+    with_people = [i for i, b in enumerate(ref_boxes) if len(b)]
+    return {
+        "mode": name,
+        "images": len(boxes),
+        "persons": sum(len(b) for b in boxes),
+        "box_recall": sum(matched(r, b) for r, b in zip(ref_boxes, boxes)) / ref_total if ref_total else None,
+        "image_recall": sum(bool(len(boxes[i])) for i in with_people) / len(with_people) if with_people else None,
+        "img_per_s": len(boxes) / seconds if seconds else 0.0,
+        "skipped_full_pass": stats.finished_early if stats else 0,
+        "compute": stats.compute if stats else 1.0,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--images", type=Path, required=True)
+    p.add_argument("-m", "--model", type=Path, default=Path("backend/app/models/yolo12n.pt"))
+    p.add_argument("--backend", choices=("torch", "onnx", "onnx-int8"), default="torch")
+    p.add_argument("--device", default="cpu")
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--conf", type=float, default=0.25)
+    p.add_argument("--coarse-imgsz", type=int, default=320)
+    p.add_argument("--coarse-conf", type=float, nargs="+", default=[0.05], help="Coarse thresholds to try")
+    p.add_argument("--json", type=Path, default=None, help="Also write the results to this file")
+    args = p.parse_args()
+
+    images = [Image.open(q).convert("RGB") for q in sorted(q for q in args.images.iterdir() if is_image(q))]
+    if not images:
+        sys.exit(f"No images in {args.images}")
+    model = load_model(args.model, backend=args.backend)
+    warm_up(model, args.device, args.imgsz)
+    warm_up(model, args.device, args.coarse_imgsz)
+    ref_boxes, ref_seconds = detect(model, images, args)
+    results = [compare("single", ref_boxes, ref_boxes, ref_seconds)]
+    for c in args.coarse_conf:
+        cascade = CascadeModel(model, imgsz=args.coarse_imgsz, conf=c)
+        boxes, seconds = detect(cascade, images, args)
+        results.append(compare(f"{args.coarse_imgsz}@{c:g}", ref_boxes, boxes, seconds, cascade.stats))
+
+    print(f"{'mode':<10} {'images':>6} {'persons':>8} {'skipped':>8} {'compute':>8} {'box rec':>8} {'img rec':>8} {'img/s':>7}")
+    for r in results:
+        rec = lambda v: f"{v:.3f}" if v is not None else "-"  # noqa: E731
+        print(
+            f"{r['mode']:<10} {r['images']:>6} {r['persons']:>8} {r['skipped_full_pass']:>8} "
+            f"{100 * r['compute']:>7.0f}% {rec(r['box_recall']):>8} {rec(r['image_recall']):>8} {r['img_per_s']:>7.2f}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
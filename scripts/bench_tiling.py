@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Compare single-pass and tiled inference on a folder of large images.
+
+Reports persons found, throughput and, when YOLO-format labels are given
+(``<labels>/<stem>.txt`` with ``class cx cy w h`` normalised rows), person
+recall at IoU 0.5 for both modes.
+
+    python scripts/bench_tiling.py --images aerial/ --labels aerial_labels/ --tile 640 --overlap 128
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.app.detection.detection import is_image, predict_batch  # noqa: E402
+from backend.app.detection.loading import load_model  # noqa: E402
+from backend.app.detection.postprocess import PostProcess  # noqa: E402
+from backend.app.detection.tiling import TiledModel  # noqa: E402
+
+
+def load_labels(path: Path, size):
+    """Person boxes (xyxy, pixels) from a YOLO label file, or None if it does not exist."""
+    if not path.exists():
+        return None
+    w, h = size
+    boxes = []
+    for line in path.read_text().splitlines():
+        parts = line.split()
+        if len(parts) >= 5 and int(float(parts[0])) == 0:
+            cx, cy, bw, bh = (float(v) for v in parts[1:5])
+            boxes.append([(cx - bw / 2) * w, (cy - bh / 2) * h, (cx + bw / 2) * w, (cy + bh / 2) * h])
+    return np.array(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def matched(gt: np.ndarray, pred: np.ndarray, thr: float = 0.5) -> int:
+    """Number of ground-truth boxes matched one-to-one by a prediction with IoU >= ``thr``."""
+    if not len(gt) or not len(pred):
+        return 0
+    ix = np.clip(np.minimum(gt[:, None, 2], pred[None, :, 2]) - np.maximum(gt[:, None, 0], pred[None, :, 0]), 0, None)
+    iy = np.clip(np.minimum(gt[:, None, 3], pred[None, :, 3]) - np.maximum(gt[:, None, 1], pred[None, :, 1]), 0, None)
+    inter = ix * iy
+    area = lambda b: (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])  # noqa: E731
+    iou = inter / (area(gt)[:, None] + area(pred)[None, :] - inter + 1e-9)
+    hits, used = 0, set()
+    for g in range(len(gt)):
+        for p in np.argsort(-iou[g]):
+            if iou[g, p] < thr:
+                break
+            if p not in used:
+                used.add(p)
+                hits += 1
+                break
+    return hits
+
+
+def run(name, model, images, labels_dir, args):
+    stats = {"mode": name, "images": 0, "persons": 0, "gt": 0, "matched": 0, "seconds": 0.0}
+    post = PostProcess(conf=args.conf)
+    for p in images:
+        img = Image.open(p).convert("RGB")
+        t0 = time.perf_counter()
+        r = predict_batch(model, [img], args.conf, args.device, args.imgsz, post.classes)[0]
+        stats["seconds"] += time.perf_counter() - t0
+        boxes = post(r)
+        stats["images"] += 1
+        stats["persons"] += len(boxes)
+        gt = load_labels(labels_dir / f"{p.stem}.txt", img.size) if labels_dir else None
+        if gt is not None:
+            pred = boxes.xyxy.astype(np.float32)
+            stats["gt"] += len(gt)
+            stats["matched"] += matched(gt, pred)
+    stats["img_per_s"] = stats["images"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["recall"] = stats["matched"] / stats["gt"] if stats["gt"] else None
+    if isinstance(model, TiledModel):
+        stats["tiles"] = model.tiles
+    return stats
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--images", type=Path, required=True)
+    p.add_argument("--labels", type=Path, default=None, help="Folder of YOLO-format label files")
+    p.add_argument("-m", "--model", type=Path, default=Path("backend/app/models/yolo12n.pt"))
+    p.add_argument("--device", default="cpu")
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--conf", type=float, default=0.25)
+    p.add_argument("--tile", type=int, default=640)
+    p.add_argument("--overlap", type=int, default=128)
+    p.add_argument("--tile-batch", type=int, default=8)
+    p.add_argument("--no-full-image", action="store_true", help="Tiles only, without the extra whole-image pass")
+    p.add_argument("--json", type=Path, default=None, help="Also write the results to this file")
+    args = p.parse_args()
+
+    images = sorted(q for q in args.images.iterdir() if is_image(q))
+    model = load_model(args.model)
+    tiled = TiledModel(
+        model, tile=args.tile, overlap=args.overlap, batch_size=args.tile_batch, full_image=not args.no_full_image
+    )
+    results = [run("single", model, images, args.labels, args), run("tiled", tiled, images, args.labels, args)]
+
+    print(f"{'mode':<8} {'images':>6} {'persons':>8} {'recall':>7} {'img/s':>7}")
+    for r in results:
+        recall = f"{r['recall']:.3f}" if r["recall"] is not None else "-"
+        print(f"{r['mode']:<8} {r['images']:>6} {r['persons']:>8} {recall:>7} {r['img_per_s']:>7.2f}")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
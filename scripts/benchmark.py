@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Per-stage throughput benchmark for process_folder, draw_boxes and the web API.
+
+Generates synthetic image sets at several resolutions and box counts, then
+times decode, predict, draw and encode separately (p50/p95 latency and
+images/sec per stage), the whole ``process_folder`` run and ``POST
+/api/detect?annotate=1``. Each scenario runs in a fresh process so its peak
+RSS is its own. Results go to a JSON file for comparison across commits.
+
+    python scripts/benchmark.py                       # stub model, deterministic
+    python scripts/benchmark.py --model-kind real     # backend/app/models/yolo12n.pt
+    python scripts/benchmark.py --output after.json --compare before.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing as mp
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from backend.app.detection.backends import ArrayBoxes, ArrayResult  # noqa: E402
+from backend.app.detection.detection import (  # noqa: E402
+    draw_boxes,
+    load_for_inference,
+    predict_batch,
+    process_folder,
+)
+from backend.app.detection.postprocess import PostProcess  # noqa: E402
+from backend.app.detection.render import RenderStyle  # noqa: E402
+
+DEFAULT_MODEL = ROOT / "backend" / "app" / "models" / "yolo12n.pt"
+RESOLUTIONS = ["640x480", "1920x1080", "4000x3000"]
+BOX_COUNTS = [0, 5, 50]
+
+
+class StubModel:
+    """Deterministic stand-in for YOLO: ``boxes`` person boxes spread over each image, no compute."""
+
+    def __init__(self, boxes: int):
+        self.boxes = boxes
+
+    def predict(self, source, device="cpu", imgsz=640, conf=0.25, verbose=False, **_):
+        images = source if isinstance(source, list) else [source]
+        return [self._result(img.width, img.height) for img in images]
+
+    def _result(self, w, h):
+        i = np.arange(self.boxes, dtype=np.float32)
+        x0 = (i * 37) % max(1, w - 60)
+        y0 = (i * 53) % max(1, h - 120)
+        xyxy = np.stack([x0, y0, x0 + 50, y0 + 110], axis=1).reshape(-1, 4)
+        conf = 0.5 + (i % 50) / 100
+        return ArrayResult(ArrayBoxes(xyxy, conf.astype(np.float32), np.zeros(self.boxes, np.float32)), (h, w))
+
+
+def make_images(folder: Path, resolution: str, count: int, fmt: str, seed: int = 0):
+    """Write ``count`` smooth synthetic images (noise compresses unrealistically badly)."""
+    w, h = (int(v) for v in resolution.split("x"))
+    rng = np.random.default_rng(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    for k in range(count):
+        small = rng.integers(0, 255, (max(1, h // 32), max(1, w // 32), 3), dtype=np.uint8)
+        img = Image.fromarray(small).resize((w, h), Image.BILINEAR)
+        options = {"quality": 90} if fmt == "jpg" else {}
+        img.save(folder / f"img{k:03d}.{fmt}", **options)
+
+
+def percentiles(samples):
+    arr = np.asarray(samples, dtype=np.float64) * 1000.0
+    if not len(arr):
+        return {"p50_ms": None, "p95_ms": None, "img_per_s": None}
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "img_per_s": round(1000.0 * len(arr) / float(arr.sum()), 2) if arr.sum() > 0 else None,
+    }
+
+
+def load_bench_model(kind: str, boxes: int, model_path: Path, device: str = "cpu", imgsz: int = 640):
+    """The stub, or the real model warmed up at the scenario's ``device`` and ``imgsz``."""
+    if kind == "stub":
+        return StubModel(boxes)
+    from backend.app.detection.loading import load_model, warm_up
+
+    model = load_model(model_path)
+    warm_up(model, device, imgsz)
+    return model
+
+
+def run_scenario(spec: dict) -> dict:
+    """Run one scenario described by ``spec`` and return its measurements."""
+    cfg = {"drawing": {}}
+    style = RenderStyle.from_config(cfg)
+    imgsz, conf, device = spec["imgsz"], 0.25, spec.get("device", "cpu")
+    model = load_bench_model(spec["model_kind"], spec["boxes"], Path(spec["model_path"]), device, imgsz)
+    post = PostProcess(conf=conf)
+    result = {k: spec[k] for k in ("name", "resolution", "boxes", "format", "images", "model_kind")}
+    with tempfile.TemporaryDirectory() as tmp:
+        inp = Path(tmp) / "input"
+        make_images(inp, spec["resolution"], spec["images"], spec["format"])
+        files = sorted(inp.iterdir())
+        times = {"decode": [], "predict": [], "draw": [], "encode": [], "total": []}
+        persons = 0
+        # one untimed pass warms the font lookup and codec set-up
+        warm, _ = load_for_inference(files[0])
+        draw_boxes(warm, post(predict_batch(model, [warm], conf, device, imgsz, post.classes)[0]), style)
+        for p in files:
+            t0 = time.perf_counter()
+            img, _ = load_for_inference(p)
+            t1 = time.perf_counter()
+            boxes = post(predict_batch(model, [img], conf, device, imgsz, post.classes)[0])
+            t2 = time.perf_counter()
+            out = draw_boxes(img, boxes, style)
+            t3 = time.perf_counter()
+            out.save(io.BytesIO(), format="JPEG" if spec["format"] == "jpg" else "PNG")
+            t4 = time.perf_counter()
+            for name, dt in zip(times, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t4 - t0)):
+                times[name].append(dt)
+            persons += len(boxes)
+        result["persons"] = persons
+        result["stages"] = {name: percentiles(v) for name, v in times.items()}
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = process_folder(model, inp, Path(tmp) / "out", conf, device, imgsz, cfg)
+        result["process_folder"] = {
+            "wall_s": round(summary["wall"], 4),
+            "img_per_s": round(summary["images"] / summary["wall"], 2) if summary["wall"] else None,
+        }
+        result["web"] = bench_web(model, files, Path(tmp), spec.get("web_requests", 5))
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+    return result
+
+
+def bench_web(model, files, tmp: Path, requests: int) -> dict:
+    """Latency of ``POST /api/detect?annotate=1`` through the Flask test client."""
+    try:
+        from backend.app import process_images
+    except ImportError as e:
+        return {"skipped": str(e)}
+    args = argparse.Namespace(input=tmp / "input", output=tmp / "web_out", model=tmp / "model.pt")
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = process_images.create_app(model, args, process_images.load_config())
+    client = app.test_client()
+    samples = []
+    for p in (files * requests)[:requests]:
+        data = p.read_bytes()
+        t0 = time.perf_counter()
+        resp = client.post("/api/detect?annotate=1", data=data)
+        samples.append(time.perf_counter() - t0)
+        if resp.status_code != 200:
+            return {"error": resp.status_code}
+    app.config["batcher"].close()
+    return percentiles(samples)
+
+
+def scenarios(args):
+    for kind in args.model_kind:
+        for resolution in args.resolutions:
+            for boxes in args.boxes if kind == "stub" else [None]:
+                name = f"{kind}-{resolution}" + (f"-{boxes}boxes" if boxes is not None else "")
+                yield {
+                    "name": name,
+                    "model_kind": kind,
+                    "model_path": str(args.model),
+                    "resolution": resolution,
+                    "boxes": boxes,
+                    "format": args.format,
+                    "images": args.images,
+                    "imgsz": args.imgsz,
+                    "device": args.device,
+                    "web_requests": args.web_requests,
+                }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path: Path):
+    baseline = {s["name"]: s for s in json.loads(baseline_path.read_text())["scenarios"]}
+    print(f"\nvs {baseline_path} (img/s ratio, >1 is faster):")
+    for s in results:
+        old = baseline.get(s["name"])
+        if old is None:
+            continue
+        ratios = []
+        for stage in ("decode", "predict", "draw", "encode", "total"):
+            a, b = s["stages"][stage]["img_per_s"], old["stages"][stage]["img_per_s"]
+            ratios.append(f"{stage} {a / b:.2f}x" if a and b else f"{stage} -")
+        print(f"  {s['name']:<28} " + "  ".join(ratios))
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--model-kind", nargs="+", choices=("stub", "real"), default=["stub"])
+    p.add_argument("-m", "--model", type=Path, default=DEFAULT_MODEL, help="Weights for --model-kind real")
+    p.add_argument("--resolutions", nargs="+", default=RESOLUTIONS)
+    p.add_argument("--boxes", nargs="+", type=int, default=BOX_COUNTS, help="Boxes per image for the stub model")
+    p.add_argument("--images", type=int, default=10, help="Images per scenario")
+    p.add_argument("--format", choices=("jpg", "png"), default="jpg")
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--device", default="cpu")
+    p.add_argument("--web-requests", type=int, default=5)
+    p.add_argument("--no-isolate", action="store_true", help="Run scenarios in this process (peak RSS is shared)")
+    p.add_argument("-o", "--output", type=Path, default=Path("benchmark.json"))
+    p.add_argument("--compare", type=Path, default=None, help="Earlier results JSON to compare against")
+    args = p.parse_args()
+
+    if "real" in args.model_kind and not args.model.exists():
+        print(f"Skipping real model: {args.model} not found")
+        args.model_kind = [k for k in args.model_kind if k != "real"]
+
+    results = []
+    ctx = mp.get_context("spawn")
+    for spec in scenarios(args):
+        if args.no_isolate:
+            r = run_scenario(spec)
+        else:
+            with ctx.Pool(1) as pool:
+                r = pool.apply(run_scenario, (spec,))
+        results.append(r)
+        st = r["stages"]
+        print(
+            f"{r['name']:<28} decode {st['decode']['p50_ms']:8.2f}ms  predict {st['predict']['p50_ms']:8.2f}ms  "
+            f"draw {st['draw']['p50_ms']:7.2f}ms  encode {st['encode']['p50_ms']:8.2f}ms  "
+            f"total {st['total']['img_per_s']:7.2f} img/s  peak {r['peak_rss_mb']:7.1f} MB"
+        )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "scenarios": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Saved {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
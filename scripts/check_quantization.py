@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Check that the INT8 model agrees with the FP32 one, and measure the speedup, on local images.
+
+Runs the reference backend (``torch`` by default, what ``inference.backend``
+uses unless changed) and ``onnx-int8`` over the same images. Boxes are matched
+one-to-one at IoU >= ``--iou``. The report gives the share of reference boxes
+the INT8 model reproduces (recall), the share of its boxes the reference also
+found (precision), the mean IoU and confidence difference of matched boxes,
+and the per-image inference time of both models. The exit code is 1 if the
+agreement (F1) is below ``--min-agreement``, so the check can gate a roll-out.
+
+    python scripts/check_quantization.py --images backend/input -m backend/app/models/yolo12n.pt
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.app.detection.detection import is_image, predict_batch  # noqa: E402
+from backend.app.detection.loading import load_model, warm_up  # noqa: E402
+from backend.app.detection.postprocess import PostProcess  # noqa: E402
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    ix = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    iy = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = ix * iy
+    area = lambda x: (x[:, 2] - x[:, 0]) * (x[:, 3] - x[:, 1])  # noqa: E731
+    return inter / (area(a)[:, None] + area(b)[None, :] - inter + 1e-9)
+
+
+def match(ref, cand, thr: float = 0.5):
+    """Greedy one-to-one matches ``(i, j, iou)`` between two ``Detections``, best IoU first."""
+    if not len(ref) or not len(cand):
+        return []
+    iou = iou_matrix(ref.xyxy, cand.xyxy)
+    pairs, used_r, used_c = [], set(), set()
+    for flat in np.argsort(-iou, axis=None):
+        i, j = np.unravel_index(flat, iou.shape)
+        if iou[i, j] < thr:
+            break
+        if i not in used_r and j not in used_c:
+            used_r.add(i)
+            used_c.add(j)
+            pairs.append((int(i), int(j), float(iou[i, j])))
+    return pairs
+
+
+def timed_detections(model, images, post: PostProcess, args):
+    """Detections per image and the inference seconds each took (after one warm-up run)."""
+    warm_up(model, args.device, args.imgsz)
+    dets, seconds = [], []
+    for img in images:
+        t0 = time.perf_counter()
+        r = predict_batch(model, [img], args.conf, args.device, args.imgsz, post.classes)[0]
+        seconds.append(time.perf_counter() - t0)
+        dets.append(post(r))
+    return dets, seconds
+
+
+def compare(ref_dets, cand_dets, ref_seconds, cand_seconds, iou: float = 0.5) -> dict:
+    ref_boxes = sum(len(d) for d in ref_dets)
+    cand_boxes = sum(len(d) for d in cand_dets)
+    ious, dconf = [], []
+    for r, c in zip(ref_dets, cand_dets):
+        for i, j, v in match(r, c, iou):
+            ious.append(v)
+            dconf.append(abs(float(r.conf[i]) - float(c.conf[j])))
+    recall = len(ious) / ref_boxes if ref_boxes else 1.0
+    precision = len(ious) / cand_boxes if cand_boxes else 1.0
+    ref_ms, cand_ms = 1000 * float(np.mean(ref_seconds)), 1000 * float(np.mean(cand_seconds))
+    return {
+        "images": len(ref_dets),
+        "reference_boxes": ref_boxes,
+        "int8_boxes": cand_boxes,
+        "matched": len(ious),
+        "recall": recall,
+        "precision": precision,
+        "agreement": 2 * recall * precision / (recall + precision) if recall + precision else 0.0,
+        "mean_iou": float(np.mean(ious)) if ious else None,
+        "mean_conf_diff": float(np.mean(dconf)) if dconf else None,
+        "reference_ms": ref_ms,
+        "int8_ms": cand_ms,
+        "speedup": ref_ms / cand_ms if cand_ms else None,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--images", type=Path, required=True)
+    p.add_argument("-m", "--model", type=Path, default=Path("backend/app/models/yolo12n.pt"))
+    p.add_argument("--reference", choices=("torch", "onnx"), default="torch", help="FP32 backend to compare against")
+    p.add_argument("--device", default="cpu")
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--conf", type=float, default=0.25)
+    p.add_argument("--iou", type=float, default=0.5, help="IoU at which two boxes count as the same detection")
+    p.add_argument("--limit", type=int, default=None, help="Use at most this many images")
+    p.add_argument("--min-agreement", type=float, default=0.95, help="Exit with status 1 below this F1 agreement")
+    p.add_argument("--json", type=Path, default=None, help="Also write the results to this file")
+    args = p.parse_args()
+
+    paths = sorted(q for q in args.images.iterdir() if is_image(q))[: args.limit]
+    if not paths:
+        sys.exit(f"No images in {args.images}")
+    images = [Image.open(q).convert("RGB") for q in paths]
+    post = PostProcess(conf=args.conf)
+    ref_dets, ref_s = timed_detections(load_model(args.model, backend=args.reference), images, post, args)
+    int8_dets, int8_s = timed_detections(load_model(args.model, backend="onnx-int8"), images, post, args)
+    result = compare(ref_dets, int8_dets, ref_s, int8_s, args.iou)
+    result["reference"] = args.reference
+
+    print(
+        f"{result['images']} images: {result['reference_boxes']} {args.reference} boxes, "
+        f"{result['int8_boxes']} int8 boxes, {result['matched']} matched at IoU {args.iou}"
+    )
+    print(
+        f"recall {result['recall']:.3f}  precision {result['precision']:.3f}  agreement {result['agreement']:.3f}"
+        + (f"  mean IoU {result['mean_iou']:.3f}  mean |dconf| {result['mean_conf_diff']:.3f}" if result["matched"] else "")
+    )
+    print(
+        f"{args.reference}: {result['reference_ms']:.1f} ms/img  int8: {result['int8_ms']:.1f} ms/img  "
+        f"speedup {result['speedup']:.2f}x"
+    )
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+    if result["agreement"] < args.min_agreement:
+        print(f"FAIL: agreement {result['agreement']:.3f} is below {args.min_agreement}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
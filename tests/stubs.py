@@ -0,0 +1,40 @@
+"""Stand-ins for an ultralytics model and its results, shared by the tests."""
+
+
+class DummyBoxes:
+    """ultralytics-style ``Boxes`` as plain lists; by default one person at (0, 0, 10, 10)."""
+
+    def __init__(self, xyxy=((0, 0, 10, 10),), conf=(0.95,), cls=(0,)):
+        self.xyxy = [list(b) for b in xyxy]
+        self.conf = list(conf)
+        self.cls = list(cls)
+
+
+class DummyResult:
+    def __init__(self, boxes=None):
+        self.boxes = boxes if boxes is not None else DummyBoxes()
+
+
+class DummyModel:
+    """Returns ``result(img, imgsz)`` for every image and records each predict call.
+
+    ``calls`` holds the image sizes and ``imgsz`` of every call and ``seen``
+    counts the images. Results carry ``boxes`` if given, else one person box;
+    subclasses override ``result`` for anything that depends on the image.
+    """
+
+    def __init__(self, boxes=None):
+        self.boxes = boxes
+        self.calls = []
+
+    @property
+    def seen(self) -> int:
+        return sum(len(sizes) for sizes, _ in self.calls)
+
+    def predict(self, source, device="cpu", imgsz=640, conf=0.25, verbose=False):
+        batch = source if isinstance(source, list) else [source]
+        self.calls.append(([img.size for img in batch], imgsz))
+        return [self.result(img, imgsz) for img in batch]
+
+    def result(self, img, imgsz):
+        return DummyResult(self.boxes)
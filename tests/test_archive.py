@@ -0,0 +1,255 @@
+import unittest
+import tempfile
+import shutil
+import tarfile
+import zipfile
+import json
+from pathlib import Path
+from io import BytesIO, StringIO
+from unittest import mock
+
+from PIL import Image
+
+from backend.app import process_images
+from backend.app.detection import detection
+from backend.app.detection.archive import ArchiveWriter, is_archive, iter_members, member_name
+from backend.app.detection.detection import IMAGE_SUFFIXES, process_folder
+from backend.app.detection.writers import DetectionWriter
+from tests.stubs import DummyModel
+
+
+class HookedModel(DummyModel):
+    """Calls ``on_predict`` after every predict call."""
+
+    def __init__(self, on_predict):
+        super().__init__()
+        self.on_predict = on_predict
+
+    def predict(self, source, device="cpu", imgsz=640, conf=0.25, verbose=False):
+        results = super().predict(source, device, imgsz, conf, verbose)
+        self.on_predict()
+        return results
+
+
+def jpeg(size=(64, 48), color="blue") -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", size, color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def write_tar(path: Path, members):
+    with tarfile.open(path, "w:gz") as tf:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, BytesIO(data))
+
+
+def write_zip(path: Path, members):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+
+
+MEMBERS = [("set/b.jpg", jpeg()), ("set/notes.txt", b"hello"), ("set/sub/a.jpg", jpeg(color="red")), ("../c.jpg", jpeg())]
+
+
+class TestReadArchives(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_images_in_stored_order_with_safe_names(self):
+        for name, write in (("in.tar.gz", write_tar), ("in.zip", write_zip)):
+            path = self.tmp / name
+            write(path, MEMBERS)
+            self.assertTrue(is_archive(path))
+            members = list(iter_members(path, IMAGE_SUFFIXES))
+            self.assertEqual([m.name for m in members], ["set/b.jpg", "set/sub/a.jpg", "c.jpg"])
+            self.assertEqual(Image.open(members[1].open()).getpixel((0, 0))[0] > 200, True)
+
+    def test_colliding_names_are_made_unique(self):
+        path = self.tmp / "dup.zip"
+        with mock.patch("sys.stdout", new_callable=StringIO) as out:
+            write_zip(path, [("x.jpg", jpeg()), ("../x.jpg", jpeg()), ("/x.jpg", jpeg()), ("x-1.jpg", jpeg())])
+            names = [m.name for m in iter_members(path, IMAGE_SUFFIXES)]
+        self.assertEqual(names, ["x.jpg", "x-1.jpg", "x-2.jpg", "x-1-1.jpg"])
+        self.assertIn("more than one x.jpg", out.getvalue())
+
+    def test_member_name_cannot_escape(self):
+        self.assertEqual(member_name("/abs/../x/./y.jpg"), "abs/x/y.jpg")
+        self.assertEqual(member_name("..\\..\\z.png"), "z.png")
+        self.assertFalse(is_archive(self.tmp / "folder"))
+
+
+class TestArchiveWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_zip_and_tar_round_trip(self):
+        src = self.tmp / "d.jsonl"
+        src.write_text('{"file": "a.jpg"}\n')
+        for name in ("out.zip", "out.tar.gz", "out.tar"):
+            w = ArchiveWriter(self.tmp / name)
+            w.add("sub/a.jpg", b"jpegbytes")
+            w.add_file("detections.jsonl", src)
+            self.assertIn("sub/a.jpg", w)
+            with self.assertRaises(ValueError):
+                w.add("sub/a.jpg", b"again")
+            # nothing at the final name until close
+            self.assertFalse((self.tmp / name).exists())
+            w.close()
+            w.close()
+            if name.endswith(".zip"):
+                with zipfile.ZipFile(self.tmp / name) as zf:
+                    self.assertEqual(zf.read("sub/a.jpg"), b"jpegbytes")
+                    self.assertEqual(zf.getinfo("sub/a.jpg").compress_type, zipfile.ZIP_STORED)
+                    self.assertEqual(zf.getinfo("detections.jsonl").compress_type, zipfile.ZIP_DEFLATED)
+            else:
+                with tarfile.open(self.tmp / name) as tf:
+                    self.assertEqual(tf.getnames(), ["sub/a.jpg", "detections.jsonl"])
+                    self.assertEqual(tf.extractfile("detections.jsonl").read(), src.read_bytes())
+        self.assertEqual(sorted(p.name for p in self.tmp.iterdir()), ["d.jsonl", "out.tar", "out.tar.gz", "out.zip"])
+
+    def test_abort_leaves_nothing(self):
+        w = ArchiveWriter(self.tmp / "out.zip")
+        w.add("a.jpg", b"jpegbytes")
+        w.abort()
+        w.close()
+        self.assertEqual(list(self.tmp.iterdir()), [])
+
+
+class TestProcessArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.archive = self.tmp / "in.tar.gz"
+        write_tar(self.archive, MEMBERS)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def run_archive(self, archive=None, model=None, cfg=None, **kwargs):
+        with mock.patch("sys.stdout", new_callable=StringIO):
+            return process_folder(
+                model or DummyModel(),
+                archive or self.archive,
+                self.tmp / "out",
+                0.5,
+                "cpu",
+                640,
+                cfg or {},
+                **kwargs,
+            )
+
+    def test_annotated_images_keep_member_paths(self):
+        summary = self.run_archive()
+        self.assertEqual(summary["images"], 3)
+        out = self.tmp / "out"
+        self.assertEqual(
+            sorted(str(p.relative_to(out)) for p in out.rglob("*.jpg")), ["c.jpg", "set/b.jpg", "set/sub/a.jpg"]
+        )
+
+    def test_output_archive_and_draft_decode(self):
+        archive = self.tmp / "big.zip"
+        write_zip(archive, [("x.jpg", jpeg((1280, 960))), ("y.jpg", jpeg((1280, 960), "green"))])
+        model = DummyModel()
+        writer = DetectionWriter(self.tmp / "d.jsonl")
+        out = ArchiveWriter(self.tmp / "out.zip")
+        try:
+            summary = self.run_archive(
+                archive, model, {"inference": {"draft_decode": True}}, writer=writer, out_archive=out
+            )
+        finally:
+            writer.close()
+            out.close()
+        self.assertEqual(summary["images"], 2)
+        # the model saw draft decodes; the annotated copies are full size
+        self.assertEqual([s for sizes, _ in model.calls for s in sizes], [(640, 480), (640, 480)])
+        with zipfile.ZipFile(self.tmp / "out.zip") as zf:
+            self.assertEqual(sorted(zf.namelist()), ["x.jpg", "y.jpg"])
+            self.assertEqual(Image.open(BytesIO(zf.read("x.jpg"))).size, (1280, 960))
+        rows = [json.loads(line) for line in (self.tmp / "d.jsonl").read_text().splitlines()]
+        self.assertEqual(sorted((r["file"], r["width"]) for r in rows), [("x.jpg", 1280), ("y.jpg", 1280)])
+        self.assertFalse((self.tmp / "out").exists())
+
+    def test_members_are_read_as_decoding_needs_them(self):
+        archive = self.tmp / "many.tar"
+        write_tar(archive, [(f"{i:02d}.jpg", jpeg()) for i in range(30)])
+        read = []
+        real = iter_members
+
+        def counting(path, suffixes):
+            for m in real(path, suffixes):
+                read.append(m.name)
+                yield m
+
+        ahead = []
+        model = HookedModel(lambda: ahead.append(len(read) - model.seen))
+        cfg = {"pipeline": {"decode_workers": 1, "queue_depth": 2}}
+        with mock.patch.object(detection, "iter_members", counting):
+            summary = self.run_archive(archive, model, cfg, save_images=False)
+        self.assertEqual(summary["images"], 30)
+        # never more than the decode queue read ahead of inference
+        self.assertLessEqual(max(ahead), 2)
+
+    def test_empty_archive(self):
+        archive = self.tmp / "empty.zip"
+        write_zip(archive, [("readme.txt", b"x")])
+        self.assertIsNone(self.run_archive(archive))
+
+
+class TestMainArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.model_path = self.tmp / "yolo12n.pt"
+        self.model_path.touch()
+        write_zip(self.tmp / "in.zip", MEMBERS)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def main(self, *argv, model=None):
+        argv = ["process_images.py", "-m", str(self.model_path), "--no-metrics", *argv]
+        with (
+            mock.patch("sys.argv", argv),
+            mock.patch("sys.stdout", new_callable=StringIO),
+            mock.patch("backend.app.process_images.load_model", return_value=model or DummyModel()),
+        ):
+            process_images.main()
+
+    def test_zip_to_zip_with_detections(self):
+        out = self.tmp / "results.zip"
+        self.main("--mode", "cli", "-i", str(self.tmp / "in.zip"), "-o", str(out), "--jsonl", "--workers", "2")
+        with zipfile.ZipFile(out) as zf:
+            names = sorted(zf.namelist())
+            self.assertEqual(names, ["c.jpg", "detections.jsonl", "set/b.jpg", "set/sub/a.jpg"])
+            self.assertEqual(len(zf.read("detections.jsonl").decode().splitlines()), 3)
+
+    def test_failed_run_publishes_no_archive(self):
+        calls = []
+
+        def fail_after_warm_up():
+            calls.append(1)
+            if len(calls) > 1:
+                raise RuntimeError("model crashed")
+
+        out = self.tmp / "results.zip"
+        with self.assertRaises(RuntimeError):
+            self.main(
+                "--mode", "cli", "-i", str(self.tmp / "in.zip"), "-o", str(out), "--jsonl",
+                model=HookedModel(fail_after_warm_up),
+            )
+        self.assertEqual(sorted(p.name for p in self.tmp.iterdir()), ["in.zip", "yolo12n.pt"])
+
+    def test_archives_need_cli_mode(self):
+        with self.assertRaises(SystemExit), mock.patch("sys.stderr", new_callable=StringIO):
+            self.main("--mode", "watch", "-i", str(self.tmp / "in.zip"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import unittest
+import tempfile
+import shutil
+import importlib.util
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+from backend.app.detection.backends import OnnxBackend, export_onnx, int8_path_for, letterbox, nms, onnx_path_for
+from backend.app.detection.loading import load_model
+
+HAS_ULTRALYTICS = importlib.util.find_spec("ultralytics") is not None
+HAS_ONNX = all(importlib.util.find_spec(m) is not None for m in ("onnx", "onnxruntime"))
+
+
+class TestNms(unittest.TestCase):
+    def test_suppresses_overlaps_in_score_order(self):
+        boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+        scores = np.array([0.5, 0.9, 0.7], dtype=np.float32)
+        self.assertEqual(nms(boxes, scores, 0.7).tolist(), [1, 2])
+
+
+@unittest.skipUnless(HAS_ULTRALYTICS, "ultralytics not installed")
+class TestLetterbox(unittest.TestCase):
+    def test_matches_ultralytics(self):
+        from ultralytics.data.augment import LetterBox
+
+        rng = np.random.default_rng(0)
+        for shape in [(480, 640), (300, 200), (333, 517)]:
+            img = rng.integers(0, 255, shape + (3,), dtype=np.uint8)
+            ours, gain, pad = letterbox(img, 640)
+            theirs = LetterBox((640, 640), auto=True, stride=32)(image=img)
+            np.testing.assert_array_equal(ours, theirs)
+
+
+@unittest.skipUnless(HAS_ULTRALYTICS, "ultralytics not installed")
+class TestExportOnnx(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.weights = self.tmpdir / "tiny.pt"
+        self.weights.write_bytes(b"weights")
+        self.exported = self.tmpdir / "tiny.onnx"
+        self.exported.write_bytes(b"onnx")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def export(self, move=shutil.move):
+        with (
+            mock.patch("ultralytics.YOLO") as yolo,
+            mock.patch("shutil.move", side_effect=move),
+            mock.patch("sys.stdout", new_callable=StringIO),
+        ):
+            yolo.return_value.export.return_value = str(self.exported)
+            return export_onnx(self.weights)
+
+    def test_export_is_moved_into_place(self):
+        dest = self.export()
+        self.assertEqual(dest, onnx_path_for(self.weights))
+        self.assertEqual(dest.read_bytes(), b"onnx")
+        self.assertEqual(sorted(p.name for p in self.tmpdir.iterdir()), sorted(["tiny.pt", dest.name]))
+
+    def test_interrupted_move_leaves_no_cached_file(self):
+        def truncated(src, dst):
+            Path(dst).write_bytes(b"on")
+            raise OSError("No space left on device")
+
+        with self.assertRaises(OSError):
+            self.export(truncated)
+        self.assertFalse(onnx_path_for(self.weights).exists())
+        self.assertEqual(sorted(p.name for p in self.tmpdir.iterdir()), ["tiny.onnx", "tiny.pt"])
+
+
+@unittest.skipUnless(HAS_ULTRALYTICS and HAS_ONNX, "ultralytics/onnxruntime not installed")
+class TestOnnxParity(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import torch
+        from ultralytics import YOLO
+
+        # exporting takes a few seconds, so share one model across the tests
+        cls.tmpdir = Path(tempfile.mkdtemp())
+        cls.weights = cls.tmpdir / "tiny.pt"
+        torch.manual_seed(0)
+        with mock.patch("sys.stdout", new_callable=StringIO):
+            YOLO("yolo12n.yaml").save(cls.weights)
+            cls.backend = load_model(cls.weights, backend="onnx")
+        cls.torch_model = YOLO(str(cls.weights)).model.float().eval()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_export_is_cached(self):
+        self.assertIsInstance(self.backend, OnnxBackend)
+        self.assertTrue(onnx_path_for(self.weights).exists())
+        with mock.patch("ultralytics.YOLO.export") as export:
+            OnnxBackend.from_weights(self.weights)
+        export.assert_not_called()
+
+    def test_network_output_matches_torch(self):
+        import torch
+
+        rng = np.random.default_rng(0)
+        img, _, _ = letterbox(rng.integers(0, 255, (300, 200, 3), dtype=np.uint8), 320)
+        x = np.ascontiguousarray(img.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+        with torch.no_grad():
+            expected = self.torch_model(torch.from_numpy(x))
+        expected = (expected[0] if isinstance(expected, (list, tuple)) else expected).numpy()
+        got = self.backend.session.run(None, {self.backend.input_name: x})[0]
+        np.testing.assert_allclose(got, expected, atol=1e-3)
+
+    def test_postprocess_matches_ultralytics(self):
+        import torch
+        from ultralytics.utils import ops
+        from ultralytics.utils.nms import non_max_suppression
+
+        rng = np.random.default_rng(0)
+        n = 3000
+        pred = np.concatenate(
+            [rng.uniform(0, 640, (2, n)), rng.uniform(10, 200, (2, n)), rng.uniform(0, 1, (80, n)) ** 4]
+        ).astype(np.float32)
+        orig, padded = (300, 400), (480, 640)
+        gain = min(padded[0] / orig[0], padded[1] / orig[1])
+        pad = (round((padded[1] - orig[1] * gain) / 2 - 0.1), round((padded[0] - orig[0] * gain) / 2 - 0.1))
+        got = self.backend._postprocess(pred.copy(), 0.25, gain, pad, orig).boxes
+
+        expected = non_max_suppression(torch.from_numpy(pred[None]), 0.25, 0.7, classes=[0], max_det=300)[0]
+        expected[:, :4] = ops.scale_boxes(padded, expected[:, :4], orig)
+        self.assertGreater(len(got), 0)
+        np.testing.assert_allclose(got.xyxy, expected[:, :4].numpy(), atol=1e-3)
+        np.testing.assert_allclose(got.conf, expected[:, 4].numpy(), atol=1e-6)
+        self.assertTrue((got.cls == 0).all())
+
+    def test_int8_backend_is_quantized_once(self):
+        with mock.patch("sys.stdout", new_callable=StringIO):
+            int8 = load_model(self.weights, backend="onnx-int8")
+        path = int8_path_for(self.weights)
+        self.assertIsInstance(int8, OnnxBackend)
+        self.assertLess(path.stat().st_size, onnx_path_for(self.weights).stat().st_size / 2)
+        with mock.patch("onnxruntime.quantization.quantize_dynamic") as quantize:
+            OnnxBackend.from_weights(self.weights, int8=True)
+        quantize.assert_not_called()
+        # same network, 8-bit weights: outputs stay close to FP32
+        rng = np.random.default_rng(0)
+        img, _, _ = letterbox(rng.integers(0, 255, (300, 200, 3), dtype=np.uint8), 320)
+        x = np.ascontiguousarray(img.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+        fp32 = self.backend.session.run(None, {self.backend.input_name: x})[0]
+        got = int8.session.run(None, {int8.input_name: x})[0]
+        self.assertEqual(got.shape, fp32.shape)
+        self.assertLess(np.abs(got[:, :4] - fp32[:, :4]).mean(), 0.05 * np.abs(fp32[:, :4]).mean())
+
+    def test_predict_returns_one_result_per_image(self):
+        imgs = [Image.new("RGB", (64, 48)), Image.new("RGB", (32, 32)), Image.new("L", (64, 48))]
+        results = self.backend.predict(source=imgs, device="cpu", imgsz=128, conf=0.25, verbose=False)
+        self.assertEqual(len(results), 3)
+        for r in results:
+            self.assertEqual(len(r.boxes.xyxy.tolist()), len(r.boxes))
+
+
+if __name__ == "__main__":
+    unittest.main()
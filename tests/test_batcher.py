@@ -0,0 +1,127 @@
+import unittest
+import threading
+import time
+
+from concurrent.futures import TimeoutError
+
+from backend.app.detection.batcher import DynamicBatcher, Overloaded
+
+
+class TestDynamicBatcher(unittest.TestCase):
+    def test_concurrent_requests_are_coalesced(self):
+        calls = []
+
+        def predict(imgs):
+            calls.append(len(imgs))
+            time.sleep(0.01)
+            return [i * 2 for i in imgs]
+
+        batcher = DynamicBatcher(predict, max_batch_size=4, max_wait_ms=50)
+        self.addCleanup(batcher.close)
+        results = {}
+        barrier = threading.Barrier(8)
+
+        def client(i):
+            barrier.wait()
+            results[i] = batcher(i, timeout=5)
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, {i: i * 2 for i in range(8)})
+        self.assertEqual(sum(calls), 8)
+        self.assertLessEqual(max(calls), 4)
+        self.assertLess(len(calls), 8)
+
+    def test_errors_reach_every_caller_in_batch(self):
+        def predict(imgs):
+            raise ValueError("bad batch")
+
+        batcher = DynamicBatcher(predict, max_batch_size=2, max_wait_ms=20)
+        self.addCleanup(batcher.close)
+        futs = [batcher.submit(i) for i in range(2)]
+        for fut in futs:
+            with self.assertRaises(ValueError):
+                fut.result(timeout=5)
+
+    def test_single_request_waits_at_most_max_wait(self):
+        batcher = DynamicBatcher(lambda imgs: imgs, max_batch_size=8, max_wait_ms=20)
+        self.addCleanup(batcher.close)
+        t0 = time.monotonic()
+        self.assertEqual(batcher("x", timeout=5), "x")
+        self.assertLess(time.monotonic() - t0, 1.0)
+
+
+    def test_full_queue_is_rejected_and_timed_out_requests_dropped(self):
+        release = threading.Event()
+        seen = []
+
+        def predict(imgs):
+            release.wait(5)
+            seen.extend(imgs)
+            return imgs
+
+        batcher = DynamicBatcher(predict, max_batch_size=1, max_wait_ms=0, max_queue=2)
+        self.addCleanup(batcher.close)
+        running = batcher.submit("running")
+        while not running.running():
+            time.sleep(0.001)
+        with self.assertRaises(TimeoutError):
+            batcher("abandoned", timeout=0.01)
+        # the abandoned request keeps its slot until a worker skips it
+        queued = batcher.submit("queued")
+        with self.assertRaises(Overloaded):
+            batcher.submit("rejected")
+        self.assertEqual(batcher.rejected, 1)
+        release.set()
+        self.assertEqual((running.result(5), queued.result(5)), ("running", "queued"))
+        self.assertEqual(seen, ["running", "queued"])
+
+    def test_close_with_a_full_queue_does_not_block(self):
+        release = threading.Event()
+
+        def predict(imgs):
+            release.wait(5)
+            return imgs
+
+        batcher = DynamicBatcher(predict, max_batch_size=1, max_wait_ms=0, max_queue=1)
+        running = batcher.submit("running")
+        while not running.running():
+            time.sleep(0.001)
+        queued = batcher.submit("queued")
+        closer = threading.Thread(target=batcher.close)
+        closer.start()
+        closer.join(0.5)
+        # close waits for the running batch, but not for room in the queue
+        self.assertTrue(closer.is_alive())
+        release.set()
+        closer.join(5)
+        self.assertFalse(closer.is_alive())
+        self.assertEqual((running.result(), queued.result()), ("running", "queued"))
+        with self.assertRaises(RuntimeError):
+            batcher.submit("late")
+
+    def test_several_workers_share_the_queue(self):
+        barrier = threading.Barrier(2, timeout=5)
+        used = set()
+
+        def make(i):
+            def predict(imgs):
+                used.add(i)
+                barrier.wait()
+                return imgs
+
+            return predict
+
+        batcher = DynamicBatcher([make(0), make(1)], max_batch_size=1, max_wait_ms=0)
+        self.addCleanup(batcher.close)
+        # both batches must run at the same time for the barrier to open
+        futs = [batcher.submit(i) for i in range(2)]
+        self.assertEqual([f.result(5) for f in futs], [0, 1])
+        self.assertEqual(used, {0, 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
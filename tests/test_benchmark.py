@@ -0,0 +1,60 @@
+import unittest
+import importlib.util
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "benchmark.py"
+spec = importlib.util.spec_from_file_location("benchmark", SCRIPT)
+benchmark = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(benchmark)
+
+
+class TestStubModel(unittest.TestCase):
+    def test_returns_requested_boxes_inside_image(self):
+        from PIL import Image
+
+        r = benchmark.StubModel(7).predict(source=[Image.new("RGB", (200, 150))])[0]
+        self.assertEqual(len(r.boxes), 7)
+        xyxy = r.boxes.xyxy
+        self.assertTrue((xyxy[:, 2] <= 200).all() and (xyxy[:, 3] <= 150).all())
+
+
+class TestLoadBenchModel(unittest.TestCase):
+    def test_real_model_is_warmed_up_at_the_scenario_size(self):
+        with (
+            mock.patch("backend.app.detection.loading.load_model", return_value="model"),
+            mock.patch("backend.app.detection.loading.warm_up") as warm_up,
+        ):
+            model = benchmark.load_bench_model("real", None, Path("m.pt"), device="cpu", imgsz=320)
+        self.assertEqual(model, "model")
+        warm_up.assert_called_once_with("model", "cpu", 320)
+
+
+class TestRunScenario(unittest.TestCase):
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_stub_scenario_reports_every_stage(self, _):
+        result = benchmark.run_scenario(
+            {
+                "name": "stub-64x48-3boxes",
+                "model_kind": "stub",
+                "model_path": "unused.pt",
+                "resolution": "64x48",
+                "boxes": 3,
+                "format": "png",
+                "images": 2,
+                "imgsz": 640,
+                "web_requests": 2,
+            }
+        )
+        self.assertEqual(result["persons"], 6)
+        for stage in ("decode", "predict", "draw", "encode", "total"):
+            self.assertGreater(result["stages"][stage]["img_per_s"], 0)
+            self.assertLessEqual(result["stages"][stage]["p50_ms"], result["stages"][stage]["p95_ms"])
+        self.assertGreater(result["process_folder"]["img_per_s"], 0)
+        self.assertIn("p95_ms", result["web"])
+        self.assertGreater(result["peak_rss_mb"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+from ultralytics.data.augment import LetterBox
+
+from backend.app.detection.backends import letterbox
+from backend.app.detection.buckets import BucketStats, buckets_enabled, rect_shape
+from backend.app.detection.detection import process_folder
+from backend.app.detection.writers import DetectionWriter
+from tests.stubs import DummyBoxes, DummyModel, DummyResult
+
+SIZES = [(1920, 1080), (1080, 1920), (1280, 720), (640, 480), (4032, 3024), (1000, 562), (333, 777), (50, 40)]
+RECT = {"inference": {"rect_buckets": True}}
+
+
+class ShapeModel(DummyModel):
+    """One box over the right half of each image, in its own coordinates."""
+
+    def result(self, img, imgsz):
+        w, h = img.size
+        return DummyResult(DummyBoxes([[w / 2, 0, w, h]], [0.9], [0]))
+
+
+class Collect(DetectionWriter):
+    def __init__(self):
+        self.rows = {}
+
+    def write(self, name, size, boxes, **extra):
+        self.rows[name] = (size, boxes)
+
+    def close(self):
+        pass
+
+
+class TestRectShape(unittest.TestCase):
+    def test_matches_ultralytics_rect_letterbox(self):
+        for w, h in SIZES:
+            for imgsz in (320, 640):
+                expected = LetterBox((imgsz, imgsz), auto=True, stride=32)(image=np.zeros((h, w, 3), np.uint8)).shape[:2]
+                self.assertEqual(rect_shape((w, h), imgsz), expected, (w, h, imgsz))
+
+    def test_onnx_letterbox_fills_an_exact_bucket_shape(self):
+        img = np.zeros((720, 1280, 3), np.uint8)
+        padded, gain, (left, top) = letterbox(img, (384, 640))
+        self.assertEqual(padded.shape[:2], (384, 640))
+        self.assertEqual((gain, left, top), (0.5, 0, 12))
+        # same resize and offsets as the image's own rect letterbox
+        alone, gain_alone, pad_alone = letterbox(img, 640)
+        self.assertEqual((alone.shape[:2], gain_alone, pad_alone), ((384, 640), gain, (left, top)))
+
+    def test_off_by_default_and_with_tiling(self):
+        self.assertFalse(buckets_enabled({}))
+        self.assertTrue(buckets_enabled(RECT))
+        self.assertFalse(buckets_enabled({**RECT, "tiling": {"enabled": True}}))
+
+
+class TestBucketStats(unittest.TestCase):
+    def test_padding_against_square_letterbox(self):
+        stats = BucketStats(640)
+        stats.add([(1920, 1080), (1280, 720)])
+        stats.add([(1080, 1920)])
+        self.assertEqual((stats.images, stats.calls), (3, 2))
+        self.assertEqual(stats.shapes, {(384, 640): 2, (640, 384): 1})
+        self.assertAlmostEqual(stats.padding, 1 - 360 / 384)
+        self.assertAlmostEqual(stats.square_padding, 1 - 360 / 640)
+        self.assertAlmostEqual(stats.pixels_saved, 1 - 384 / 640)
+        self.assertIn("2 input shapes", stats.report())
+
+
+class TestProcessFolderBuckets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.inp = self.tmp / "in"
+        self.inp.mkdir()
+        # landscape and portrait interleaved, in two resolutions each
+        self.sizes = {}
+        for i, size in enumerate([(320, 180), (180, 320), (640, 360), (360, 640), (320, 180), (180, 320)]):
+            Image.new("RGB", size, (i * 40, 0, 0)).save(self.inp / f"img{i}.png")
+            self.sizes[f"img{i}.png"] = size
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def run_folder(self, cfg, batch_size=3):
+        model, writer = ShapeModel(), Collect()
+        with mock.patch("sys.stdout", new_callable=StringIO) as out:
+            summary = process_folder(
+                model,
+                self.inp,
+                self.tmp / "out",
+                0.5,
+                "cpu",
+                320,
+                cfg,
+                batch_size=batch_size,
+                save_images=False,
+                writer=writer,
+            )
+        return model, writer, summary, out.getvalue()
+
+    def test_batches_group_by_bucket_at_rect_shape(self):
+        model, writer, summary, out = self.run_folder(RECT)
+        self.assertEqual(summary["images"], 6)
+        self.assertEqual(
+            sorted(model.calls),
+            [([(180, 320), (360, 640), (180, 320)], (320, 192)), ([(320, 180), (640, 360), (320, 180)], (192, 320))],
+        )
+        # boxes come back in each image's own coordinates
+        for name, (size, boxes) in writer.rows.items():
+            w, h = self.sizes[name]
+            self.assertEqual(size, (w, h))
+            self.assertEqual(boxes[0]["xyxy"], [w / 2, 0, w, h])
+        self.assertEqual(summary["buckets"].calls, 2)
+        self.assertIn("Buckets: 2 input shapes", out)
+
+    def test_results_are_written_in_name_order(self):
+        for batch_size in (2, 3, 4):
+            model, writer, _, _ = self.run_folder(RECT, batch_size=batch_size)
+            # buckets run out of order, the writer still sees the sorted file names
+            self.assertNotEqual([s for sizes, _ in model.calls for s in sizes], list(self.sizes.values()))
+            self.assertEqual(list(writer.rows), sorted(self.sizes))
+
+    def test_undecodable_files_do_not_take_a_bucket_slot(self):
+        (self.inp / "bad.png").write_bytes(b"not an image")
+        model, writer, summary, _ = self.run_folder(RECT)
+        self.assertEqual((summary["images"], summary["skipped"]), (6, 1))
+        self.assertEqual([len(sizes) for sizes, _ in model.calls], [3, 3])
+        self.assertEqual(list(writer.rows), sorted(self.sizes))
+
+    def test_off_by_default_keeps_name_order_batches(self):
+        model, writer, summary, _ = self.run_folder({})
+        self.assertIsNone(summary["buckets"])
+        self.assertEqual(summary["images"], 6)
+        # one call per distinct size within each name-order batch, at the square imgsz
+        self.assertEqual(len(model.calls), 6)
+        self.assertTrue(all(imgsz == 320 for _, imgsz in model.calls))
+
+    def test_full_batches_run_as_soon_as_a_bucket_fills(self):
+        model, _, summary, _ = self.run_folder(RECT, batch_size=2)
+        self.assertEqual(summary["images"], 6)
+        self.assertEqual([len(sizes) for sizes, _ in model.calls], [2, 2, 1, 1])
+        for sizes, imgsz in model.calls:
+            self.assertEqual({rect_shape(s, 320) for s in sizes}, {imgsz})
+
+    def test_many_partial_buckets_are_run_early(self):
+        for p in self.inp.iterdir():
+            p.unlink()
+        # six different aspect ratios: no bucket ever fills a batch of 2
+        for i, size in enumerate([(320, 180), (180, 320), (320, 240), (240, 320), (320, 320), (100, 320)]):
+            Image.new("RGB", size).save(self.inp / f"img{i}.png")
+        model, _, summary, _ = self.run_folder(RECT, batch_size=2)
+        self.assertEqual(summary["images"], 6)
+        # the oldest of the held buckets runs once 2 x batch_size images are held
+        self.assertEqual([sizes for sizes, _ in model.calls][:2], [[(320, 180)], [(180, 320)]])
+
+
+if __name__ == "__main__":
+    unittest.main()
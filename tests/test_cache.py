@@ -0,0 +1,57 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from PIL import Image
+
+from backend.app.detection.cache import LRUCache, ResultCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_bytes=10)
+        cache.put("a", b"aaaa", 4)
+        cache.put("b", b"bbbb", 4)
+        cache.get("a")
+        cache.put("c", b"cccc", 4)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertLessEqual(cache.nbytes, 10)
+
+    def test_oversized_value_is_not_stored(self):
+        cache = LRUCache(max_bytes=3)
+        cache.put("a", b"aaaa", 4)
+        self.assertEqual(len(cache), 0)
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.img = self.tmpdir / "a.png"
+        Image.new("RGB", (10, 10)).save(self.img)
+
+    def test_render_key_depends_on_drawing_only_config(self):
+        det = ResultCache.detection_key(self.img, "m", 0.25, 640)
+        self.assertEqual(det, ResultCache.detection_key(self.img, "m", 0.25, 640))
+        self.assertNotEqual(det, ResultCache.detection_key(self.img, "m", 0.5, 640))
+        self.assertNotEqual(
+            ResultCache.render_key(det, {"drawing": {"box_thickness": 2}}),
+            ResultCache.render_key(det, {"drawing": {"box_thickness": 3}}),
+        )
+
+    def test_detection_key_changes_with_file(self):
+        before = ResultCache.detection_key(self.img, "m", 0.25, 640)
+        Image.new("RGB", (12, 10)).save(self.img)
+        self.assertNotEqual(before, ResultCache.detection_key(self.img, "m", 0.25, 640))
+
+    def test_disk_tier_survives_restart(self):
+        boxes = [{"xyxy": [0.0, 0.0, 5.0, 5.0], "conf": 0.9, "class": 0}]
+        ResultCache(disk_dir=self.tmpdir / "cache").put_detections("k", boxes)
+        fresh = ResultCache(disk_dir=self.tmpdir / "cache")
+        self.assertEqual(fresh.get_detections("k"), boxes)
+        self.assertIsNone(ResultCache().get_detections("k"))
+
+
+if __name__ == "__main__":
+    unittest.main()
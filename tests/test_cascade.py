@@ -0,0 +1,102 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+
+from PIL import Image
+
+from backend.app.detection.cascade import CascadeModel, cascade_enabled, maybe_cascaded
+from backend.app.detection.detection import process_folder
+from tests.stubs import DummyBoxes, DummyModel, DummyResult
+
+
+class RecordingModel(DummyModel):
+    """Records ``(batch size, imgsz, conf)`` of each call; a red image holds one person, scored higher at full size."""
+
+    def predict(self, source, device, imgsz, conf, verbose, classes=None):
+        batch = source if isinstance(source, list) else [source]
+        self.calls.append((len(batch), imgsz, conf))
+        return [self.result(img, imgsz) for img in batch]
+
+    def result(self, img, imgsz):
+        if img.getpixel((0, 0))[0] > 0:
+            score = 0.9 if imgsz != (192, 320) else 0.1
+            return DummyResult(DummyBoxes([[0, 0, 10, 10]], [score], [img.getpixel((0, 0))[1]]))
+        return DummyResult(DummyBoxes([], [], []))
+
+
+def image(red=False, cls=0):
+    return Image.new("RGB", (640, 360), (255 if red else 0, cls, 0))
+
+
+class TestCascadeModel(unittest.TestCase):
+    def test_only_images_with_candidates_get_the_full_pass(self):
+        model = RecordingModel()
+        cascade = CascadeModel(model, imgsz=320, conf=0.05)
+        results = cascade.predict([image(), image(red=True), image()], imgsz=640, conf=0.25, classes=[0])
+        # one coarse call at the bucket shape with the low threshold, one full call for the red image
+        self.assertEqual(model.calls, [(3, (192, 320), 0.05), (1, 640, 0.25)])
+        self.assertEqual([len(r.boxes.conf) for r in results], [0, 1, 0])
+        self.assertEqual(list(results[1].boxes.conf), [0.9])
+        self.assertEqual(results[0].orig_shape, (360, 640))
+
+    def test_candidates_of_other_classes_do_not_count(self):
+        model = RecordingModel()
+        cascade = CascadeModel(model, imgsz=320, conf=0.05)
+        results = cascade.predict([image(red=True, cls=2)], imgsz=640, conf=0.25, classes=[0])
+        self.assertEqual(len(model.calls), 1)
+        self.assertEqual(len(results[0].boxes.conf), 0)
+
+    def test_stats_compare_input_pixels_with_single_pass(self):
+        cascade = CascadeModel(RecordingModel(), imgsz=320, conf=0.05)
+        cascade.predict([image(), image(red=True), image(), image()], imgsz=640, conf=0.25, classes=[0])
+        s = cascade.stats
+        self.assertEqual((s.images, s.refined, s.finished_early), (4, 1, 3))
+        # 4 coarse inputs of 320x192 plus one of 640x384, against 4 of 640x384
+        self.assertAlmostEqual(s.compute, (4 * 320 * 192 + 640 * 384) / (4 * 640 * 384))
+        self.assertIn("3 of 4 images had no candidates at 320 px", s.report())
+
+    def test_config(self):
+        self.assertFalse(cascade_enabled({}))
+        self.assertTrue(cascade_enabled({"cascade": {"enabled": True}}))
+        self.assertFalse(cascade_enabled({"cascade": {"enabled": True}, "tiling": {"enabled": True}}))
+        model = RecordingModel()
+        self.assertIs(maybe_cascaded(model, {}), model)
+        wrapped = maybe_cascaded(model, {"cascade": {"enabled": True, "imgsz": 256, "conf": 0.1}})
+        self.assertEqual((wrapped.imgsz, wrapped.conf), (256, 0.1))
+        self.assertIs(maybe_cascaded(wrapped, {"cascade": {"enabled": True}}), wrapped)
+
+
+class TestProcessFolderCascade(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.inp = self.tmp / "in"
+        self.inp.mkdir()
+        for i in range(4):
+            image(red=i == 2).save(self.inp / f"img{i}.png")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_report_and_summary(self):
+        model = RecordingModel()
+        cfg = {"cascade": {"enabled": True, "imgsz": 320, "conf": 0.05}}
+        with mock.patch("sys.stdout", new_callable=StringIO) as out:
+            summary = process_folder(
+                model, self.inp, self.tmp / "out", 0.25, "cpu", 640, cfg, batch_size=4, save_images=False
+            )
+        self.assertEqual((summary["images"], summary["persons"]), (4, 1))
+        self.assertEqual(summary["cascade"].finished_early, 3)
+        self.assertEqual(model.calls, [(4, (192, 320), 0.05), (1, 640, 0.25)])
+        self.assertIn("Cascade: 3 of 4 images", out.getvalue())
+
+    def test_disabled_by_default(self):
+        with mock.patch("sys.stdout", new_callable=StringIO):
+            summary = process_folder(RecordingModel(), self.inp, self.tmp / "out", 0.25, "cpu", 640, {}, save_images=False)
+        self.assertIsNone(summary["cascade"])
+
+
+if __name__ == "__main__":
+    unittest.main()
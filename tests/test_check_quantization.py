@@ -0,0 +1,37 @@
+import unittest
+import importlib.util
+from pathlib import Path
+
+from backend.app.detection.postprocess import Detections
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "check_quantization.py"
+spec = importlib.util.spec_from_file_location("check_quantization", SCRIPT)
+check_quantization = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(check_quantization)
+
+
+class TestAgreement(unittest.TestCase):
+    def test_match_is_one_to_one_best_iou_first(self):
+        ref = Detections([[0, 0, 10, 10], [100, 100, 110, 110]], [0.9, 0.8])
+        cand = Detections([[1, 0, 10, 10], [0, 0, 10, 10], [50, 50, 60, 60]], [0.7, 0.85, 0.6])
+        pairs = check_quantization.match(ref, cand, 0.5)
+        self.assertEqual([(i, j) for i, j, _ in pairs], [(0, 1)])
+        self.assertAlmostEqual(pairs[0][2], 1.0)
+
+    def test_compare_reports_agreement_and_speedup(self):
+        ref = [Detections([[0, 0, 10, 10], [20, 20, 30, 30]], [0.9, 0.8]), Detections()]
+        cand = [Detections([[0, 0, 10, 10]], [0.8]), Detections([[5, 5, 9, 9]], [0.4])]
+        result = check_quantization.compare(ref, cand, [0.2, 0.2], [0.1, 0.1])
+        self.assertEqual((result["reference_boxes"], result["int8_boxes"], result["matched"]), (2, 2, 1))
+        self.assertAlmostEqual(result["recall"], 0.5)
+        self.assertAlmostEqual(result["agreement"], 0.5)
+        self.assertAlmostEqual(result["mean_conf_diff"], 0.1, places=6)
+        self.assertAlmostEqual(result["speedup"], 2.0)
+
+    def test_no_boxes_on_either_side_is_full_agreement(self):
+        result = check_quantization.compare([Detections()], [Detections()], [0.1], [0.1])
+        self.assertEqual(result["agreement"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
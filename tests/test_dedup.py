@@ -0,0 +1,102 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+from backend.app.detection.dedup import DedupIndex, dhash
+from backend.app.detection.detection import process_folder
+from tests.stubs import DummyModel
+
+
+def scene(seed, size=(320, 240)):
+    """A smooth random scene: coarse random blocks scaled up."""
+    blocks = np.random.default_rng(seed).integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    return Image.fromarray(blocks).resize(size, Image.BILINEAR)
+
+
+def jitter(img, seed, amount=6):
+    noise = np.random.default_rng(seed).integers(-amount, amount + 1, (img.height, img.width, 3))
+    return Image.fromarray(np.clip(np.asarray(img, dtype=np.int16) + noise, 0, 255).astype(np.uint8))
+
+
+class TestDhash(unittest.TestCase):
+    def test_robust_to_noise_and_resolution(self):
+        a = scene(0)
+        self.assertLessEqual((dhash(a) ^ dhash(jitter(a, 1))).bit_count(), 4)
+        self.assertLessEqual((dhash(a) ^ dhash(a.resize((640, 480)))).bit_count(), 4)
+        self.assertGreater((dhash(a) ^ dhash(scene(1))).bit_count(), 16)
+
+
+class TestDedupIndex(unittest.TestCase):
+    def test_match_requires_distance_and_aspect(self):
+        index = DedupIndex(max_distance=2, window=8)
+        entry = index.add(0b1011, (640, 480), "a.jpg")
+        self.assertIs(index.match(0b1001, (320, 240)), entry)
+        self.assertIsNone(index.match(0b0101, (640, 480)))
+        self.assertIsNone(index.match(0b1011, (640, 360)))
+        self.assertEqual(index.hits, 1)
+
+    def test_window_keeps_recent_hashes(self):
+        index = DedupIndex(max_distance=0, window=2)
+        for h in (1, 2, 3):
+            index.add(h, (10, 10))
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.match(1, (10, 10)))
+        self.assertIsNotNone(index.match(3, (10, 10)))
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(DedupIndex.from_config({}))
+        index = DedupIndex.from_config({"dedup": {"enabled": True, "max_distance": 6, "window": 4}})
+        self.assertEqual(index.max_distance, 6)
+
+
+class TestProcessFolderDedup(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.inp = self.tmpdir / "input"
+        self.out = self.tmpdir / "output"
+        self.inp.mkdir()
+        a, b = scene(0), scene(1)
+        # two bursts of three near-identical shots; one shot saved at double resolution
+        a.save(self.inp / "a0.png")
+        jitter(a, 1).save(self.inp / "a1.png")
+        jitter(a, 2).resize((640, 480)).save(self.inp / "a2.png")
+        b.save(self.inp / "b0.png")
+        jitter(b, 3).save(self.inp / "b1.png")
+        jitter(b, 4).save(self.inp / "b2.png")
+
+    def run_folder(self, cfg, batch_size):
+        model, writer = DummyModel(), mock.Mock()
+        with mock.patch("sys.stdout", new_callable=StringIO) as out:
+            summary = process_folder(
+                model, self.inp, self.out, 0.5, "cpu", 640, cfg, batch_size=batch_size, writer=writer
+            )
+        written = {c.args[0]: c.args[2] for c in writer.write.call_args_list}
+        return model, summary, written, out.getvalue()
+
+    def test_near_duplicates_reuse_detections(self):
+        for batch_size in (1, 4):
+            with self.subTest(batch_size=batch_size):
+                model, summary, written, output = self.run_folder({"drawing": {}, "dedup": {"enabled": True}}, batch_size)
+                self.assertEqual(model.seen, 2)
+                self.assertEqual((summary["images"], summary["deduplicated"]), (6, 4))
+                self.assertEqual(len(written), 6)
+                # boxes are rescaled to the duplicate's own resolution
+                self.assertEqual(written["a1.png"][0]["xyxy"], [0, 0, 10, 10])
+                self.assertEqual(written["a2.png"][0]["xyxy"], [0.0, 0.0, 20.0, 20.0])
+                self.assertIn("4 inferences avoided", output)
+                self.assertTrue((self.out / "b2.png").exists())
+
+    def test_disabled_runs_every_image(self):
+        model, summary, _, _ = self.run_folder({"drawing": {}}, 4)
+        self.assertEqual((model.seen, summary["deduplicated"]), (6, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,25 +6,10 @@ from unittest import mock
 from PIL import Image
 import shutil
 
-from backend.app.detection.detection import is_image, draw_boxes, process_folder
+from backend.app.detection.detection import is_image, draw_boxes, process_folder, load_for_inference, rescale_boxes
+from tests.stubs import DummyModel
 
 
-class DummyBoxes:
-    def __init__(self):
-        self.xyxy = [[0, 0, 10, 10]]
-        self.conf = [0.95]
-        self.cls = [0]
-
-
-class DummyResult:
-    def __init__(self):
-        self.boxes = DummyBoxes()
-
-
-class DummyModel:
-    def predict(self, source, device, imgsz, conf, verbose):
-        return [DummyResult()]
-
 class TestIsImage(unittest.TestCase):
     def setUp(self):
         self.tmpdir = Path(tempfile.mkdtemp())
@@ -103,6 +88,87 @@ class TestProcessFolder(unittest.TestCase):
         self.assertIn("No images", fake_out.getvalue())
 
 
+class TestProcessFolderBatched(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.inp = self.tmpdir / "input"
+        self.inp.mkdir()
+        for i in range(5):
+            Image.new("RGB", (20, 20), color=(i * 40, 0, 0)).save(self.inp / f"img{i}.png")
+        self.cfg = {"drawing": {}}
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_short_final_batch(self, _):
+        model = DummyModel()
+        out = self.tmpdir / "out"
+        process_folder(model, self.inp, out, 0.5, "cpu", 640, self.cfg, batch_size=2)
+        self.assertEqual([len(sizes) for sizes, _ in model.calls], [2, 2, 1])
+        self.assertEqual(len(list(out.glob("*.png"))), 5)
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_matches_per_image_output(self, _):
+        single, batched = self.tmpdir / "single", self.tmpdir / "batched"
+        process_folder(DummyModel(), self.inp, single, 0.5, "cpu", 640, self.cfg)
+        process_folder(DummyModel(), self.inp, batched, 0.5, "cpu", 640, self.cfg, batch_size=4)
+        for p in sorted(single.glob("*.png")):
+            self.assertEqual(p.read_bytes(), (batched / p.name).read_bytes())
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_undecodable_file_is_skipped(self, fake_out):
+        (self.inp / "img2.png").write_bytes(b"not a png")
+        model = DummyModel()
+        out = self.tmpdir / "out"
+        process_folder(model, self.inp, out, 0.5, "cpu", 640, self.cfg, batch_size=3)
+        self.assertIn("Skipping img2.png", fake_out.getvalue())
+        self.assertEqual([len(sizes) for sizes, _ in model.calls], [2, 2])
+        self.assertEqual(sorted(p.name for p in out.glob("*.png")), ["img0.png", "img1.png", "img3.png", "img4.png"])
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_mixed_sizes_split_into_same_shape_calls(self, _):
+        Image.new("RGB", (30, 10), color="white").save(self.inp / "img1.png")
+        model = DummyModel()
+        process_folder(model, self.inp, self.tmpdir / "out", 0.5, "cpu", 640, self.cfg, batch_size=5)
+        self.assertEqual(sorted(len(sizes) for sizes, _ in model.calls), [1, 4])
+
+
+class TestDraftDecode(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.inp = self.tmpdir / "input"
+        self.inp.mkdir()
+        Image.new("RGB", (3200, 2400), color="white").save(self.inp / "big.jpg")
+        self.cfg = {"drawing": {}, "inference": {"draft_decode": True}}
+
+    def test_jpeg_decodes_at_reduced_scale(self):
+        img, full_size = load_for_inference(self.inp / "big.jpg", 640)
+        self.assertEqual(full_size, (3200, 2400))
+        self.assertEqual(img.size, (800, 600))
+        self.assertEqual(img.mode, "RGB")
+
+    def test_png_and_small_images_decode_fully(self):
+        Image.new("RGB", (2400, 1600)).save(self.tmpdir / "big.png")
+        self.assertEqual(load_for_inference(self.tmpdir / "big.png", 640)[0].size, (2400, 1600))
+        self.assertEqual(load_for_inference(self.inp / "big.jpg")[0].size, (3200, 2400))
+
+    def test_rescale_boxes(self):
+        boxes = [{"xyxy": [10, 20, 30, 40], "conf": 0.9, "class": 0}]
+        self.assertEqual(rescale_boxes(boxes, (600, 400), (2400, 1600))[0]["xyxy"], [40, 80, 120, 160])
+        self.assertIs(rescale_boxes(boxes, (600, 400), (600, 400)), boxes)
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_process_folder_annotates_full_resolution(self, _):
+        model = DummyModel()
+        out = self.tmpdir / "out"
+        process_folder(model, self.inp, out, 0.5, "cpu", 640, self.cfg)
+        self.assertEqual([s for sizes, _ in model.calls for s in sizes], [(800, 600)])
+        with Image.open(out / "big.jpg") as saved:
+            self.assertEqual(saved.size, (3200, 2400))
+            # the 10px box from the model is drawn 4x larger on the full image
+            self.assertNotEqual(saved.convert("RGB").getpixel((38, 38)), (255, 255, 255))
+
+
 class TestProcessFolderMock(unittest.TestCase):
     @mock.patch("sys.stdout", new_callable=StringIO)
     def test_mock_stdout(self, fake_out):
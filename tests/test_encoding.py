@@ -0,0 +1,58 @@
+import unittest
+from io import BytesIO
+
+from PIL import Image
+
+from backend.app.detection.encoding import EncodeOptions, output_name, source_format
+
+
+class TestEncodeOptions(unittest.TestCase):
+    def setUp(self):
+        self.img = Image.new("RGB", (64, 48), color="red")
+
+    def test_source_format_is_kept(self):
+        opts = EncodeOptions()
+        self.assertEqual(opts.resolve("JPEG"), "JPEG")
+        self.assertEqual(opts.resolve("WEBP"), "WEBP")
+        # formats the web UI cannot encode fall back to PNG
+        self.assertEqual(opts.resolve("BMP"), "PNG")
+        self.assertEqual(opts.resolve(None), "PNG")
+
+    def test_forced_format_and_options(self):
+        opts = EncodeOptions.from_config({"encoding": {"format": "jpg", "jpeg_quality": 50}})
+        self.assertEqual(opts.resolve("PNG"), "JPEG")
+        data = opts.encode(self.img, "JPEG")
+        self.assertEqual(Image.open(BytesIO(data)).format, "JPEG")
+        self.assertLessEqual(len(data), len(EncodeOptions(jpeg_quality=95).encode(self.img, "JPEG")))
+        self.assertNotEqual(opts.identity("JPEG"), EncodeOptions().identity("JPEG"))
+
+    def test_unknown_format_rejected(self):
+        with self.assertRaises(ValueError):
+            EncodeOptions(format="gif")
+
+    def test_webp_lossless(self):
+        data = EncodeOptions(webp_lossless=True).encode(self.img, "WEBP")
+        out = Image.open(BytesIO(data))
+        self.assertEqual(out.format, "WEBP")
+        self.assertEqual(out.convert("RGB").getpixel((5, 5)), (255, 0, 0))
+
+
+class TestNames(unittest.TestCase):
+    def test_output_name(self):
+        self.assertEqual(output_name("processed_a.png", "PNG"), "processed_a.png")
+        self.assertEqual(output_name("processed_a.JPG", "JPEG"), "processed_a.JPG")
+        self.assertEqual(output_name("processed_a.bmp", "PNG"), "processed_a.png")
+        self.assertEqual(output_name("processed_a.png", "WEBP"), "processed_a.webp")
+
+    def test_source_format(self):
+        self.assertEqual(source_format("x/photo.jpeg"), "JPEG")
+        buf = BytesIO()
+        Image.new("RGB", (4, 4)).save(buf, format="PNG")
+        buf.seek(0)
+        self.assertEqual(source_format(buf), "PNG")
+        self.assertEqual(buf.tell(), 0)
+        self.assertIsNone(source_format(BytesIO(b"nope")))
+
+
+if __name__ == "__main__":
+    unittest.main()
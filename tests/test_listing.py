@@ -0,0 +1,58 @@
+import os
+import unittest
+import tempfile
+import shutil
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+from backend.app.detection.listing import DirectoryIndex, make_thumbnail
+
+
+class TestDirectoryIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        for name in ("cam1_001.jpg", "cam1_002.png", "cam2_001.jpg", "notes.txt"):
+            (self.tmpdir / name).write_bytes(b"x")
+        (self.tmpdir / "sub.jpg").mkdir()
+
+    def test_only_image_files_sorted(self):
+        self.assertEqual(DirectoryIndex(self.tmpdir).names(), ["cam1_001.jpg", "cam1_002.png", "cam2_001.jpg"])
+
+    def test_prefix_and_pages(self):
+        index = DirectoryIndex(self.tmpdir)
+        self.assertEqual(index.page("cam1", 1, 10), (["cam1_001.jpg", "cam1_002.png"], 2))
+        self.assertEqual(index.page("", 2, 2), (["cam2_001.jpg"], 3))
+        self.assertEqual(index.page("cam1", 2, 1), (["cam1_002.png"], 2))
+        self.assertEqual(index.page("cam1", 3, 1), ([], 2))
+        self.assertEqual(index.page("zzz"), ([], 0))
+
+    def test_rebuilt_only_when_folder_changes(self):
+        index = DirectoryIndex(self.tmpdir)
+        index.names()
+        index.names()
+        self.assertEqual(index.rebuilds, 1)
+        (self.tmpdir / "cam3_001.jpg").write_bytes(b"x")
+        # make sure the directory mtime moves even on coarse-grained filesystems
+        st = os.stat(self.tmpdir)
+        os.utime(self.tmpdir, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        self.assertIn("cam3_001.jpg", index.names())
+        self.assertEqual(index.rebuilds, 2)
+
+    def test_missing_folder(self):
+        self.assertEqual(DirectoryIndex(self.tmpdir / "missing").page(), ([], 0))
+
+
+class TestThumbnail(unittest.TestCase):
+    def test_fits_box_and_keeps_aspect(self):
+        buf = BytesIO()
+        Image.new("RGB", (2000, 1000), color="red").save(buf, format="PNG")
+        buf.seek(0)
+        thumb = Image.open(BytesIO(make_thumbnail(buf, px=200)))
+        self.assertEqual((thumb.format, thumb.size), ("JPEG", (200, 100)))
+
+
+if __name__ == "__main__":
+    unittest.main()
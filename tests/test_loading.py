@@ -0,0 +1,68 @@
+import unittest
+import tempfile
+import shutil
+import importlib.util
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+from backend.app.detection.loading import StartupProfile, load_model, snapshot_path
+
+HAS_ULTRALYTICS = importlib.util.find_spec("ultralytics") is not None
+
+
+class TestStartupProfile(unittest.TestCase):
+    def test_report_lists_phases(self):
+        profile = StartupProfile(enabled=True)
+        with profile.phase("model load"):
+            pass
+        profile.add("warm-up", 0.5)
+        report = profile.report()
+        self.assertIn("model load", report)
+        self.assertIn("warm-up", report)
+
+
+class TestSnapshotPath(unittest.TestCase):
+    def test_name_tracks_weights(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            weights = Path(tmp) / "yolo12n.pt"
+            weights.write_bytes(b"a")
+            first = snapshot_path(weights)
+            self.assertEqual(first.parent, weights.parent)
+            self.assertTrue(first.name.startswith("yolo12n.fused-"))
+            weights.write_bytes(b"b")
+            self.assertNotEqual(first, snapshot_path(weights))
+
+
+@unittest.skipUnless(HAS_ULTRALYTICS, "ultralytics not installed")
+class TestFusedSnapshot(unittest.TestCase):
+    def setUp(self):
+        from ultralytics import YOLO
+
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.weights = self.tmpdir / "tiny.pt"
+        with mock.patch("sys.stdout", new_callable=StringIO):
+            YOLO("yolo12n.yaml").save(self.weights)
+        rng = np.random.default_rng(0)
+        self.img = Image.fromarray(rng.integers(0, 255, (96, 128, 3), dtype=np.uint8))
+
+    def predict(self, model):
+        r = model.predict(source=self.img, imgsz=128, conf=0.0001, device="cpu", verbose=False)[0]
+        return r.boxes.xyxy.numpy()
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_snapshot_is_created_and_matches(self, _):
+        plain = self.predict(load_model(self.weights, fused_snapshot=False))
+        first = load_model(self.weights)
+        self.assertTrue(snapshot_path(self.weights).exists())
+        second = load_model(self.weights)
+        np.testing.assert_allclose(self.predict(first), plain, atol=1e-4)
+        np.testing.assert_allclose(self.predict(second), plain, atol=1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
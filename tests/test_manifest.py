@@ -0,0 +1,70 @@
+import unittest
+import tempfile
+import shutil
+import os
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+from PIL import Image
+
+from backend.app.detection.detection import process_folder
+from backend.app.detection.manifest import MANIFEST_NAME, Manifest, manifest_key
+from tests.stubs import DummyModel
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.inp = self.tmpdir / "input"
+        self.out = self.tmpdir / "output"
+        self.inp.mkdir()
+        for i in range(3):
+            Image.new("RGB", (20, 20), color=(i * 60, 0, 0)).save(self.inp / f"img{i}.png")
+        self.cfg = {"drawing": {}}
+        self.key = manifest_key("yolo12n.pt:abc", 0.5, 640, self.cfg)
+
+    def run_folder(self, key=None):
+        model = DummyModel()
+        manifest = Manifest.open(self.out, key or self.key)
+        try:
+            with mock.patch("sys.stdout", new_callable=StringIO):
+                summary = process_folder(model, self.inp, self.out, 0.5, "cpu", 640, self.cfg, manifest=manifest)
+        finally:
+            manifest.close()
+        return model.seen, summary
+
+    def test_second_run_skips_unchanged(self):
+        self.assertEqual(self.run_folder()[0], 3)
+        seen, summary = self.run_folder()
+        self.assertEqual(seen, 0)
+        self.assertEqual(summary["unchanged"], 3)
+
+    def test_modified_and_touched_files(self):
+        self.run_folder()
+        Image.new("RGB", (20, 20), color="white").save(self.inp / "img0.png")
+        st = (self.inp / "img1.png").stat()
+        os.utime(self.inp / "img1.png", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertEqual(self.run_folder()[0], 1)
+
+    def test_config_change_invalidates(self):
+        self.run_folder()
+        other = manifest_key("yolo12n.pt:abc", 0.5, 640, {"drawing": {"box_thickness": 9}})
+        self.assertEqual(self.run_folder(key=other)[0], 3)
+
+    def test_missing_output_is_redone(self):
+        self.run_folder()
+        (self.out / "img2.png").unlink()
+        self.assertEqual(self.run_folder()[0], 1)
+
+    def test_resume_ignores_torn_line(self):
+        self.run_folder()
+        lines = (self.out / MANIFEST_NAME).read_text().splitlines(keepends=True)
+        # simulate a run interrupted while writing the last entry
+        (self.out / MANIFEST_NAME).write_text("".join(lines[:2]) + lines[2][:10])
+        self.assertEqual(self.run_folder()[0], 1)
+        self.assertEqual(len((self.out / MANIFEST_NAME).read_text().splitlines()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+
+from PIL import Image
+
+from backend.app.detection.detection import process_folder
+from backend.app.detection.metrics import Histogram, Metrics
+from tests.stubs import DummyBoxes, DummyModel
+
+TWO_PERSONS = DummyBoxes([[0, 0, 10, 10], [5, 5, 15, 15]], [0.95, 0.9], [0, 0])
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles_interpolate_within_buckets(self):
+        h = Histogram((0.1, 0.2, 0.4))
+        for v in (0.05, 0.15, 0.15, 0.3):
+            h.observe(v)
+        self.assertEqual(h.counts, [1, 2, 1, 0])
+        self.assertAlmostEqual(h.quantile(0.5), 0.15)
+        self.assertLessEqual(h.quantile(0.95), 0.4)
+        self.assertIsNone(Histogram().quantile(0.5))
+
+
+class TestMetrics(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        m = Metrics(enabled=False)
+        with m.time("infer"):
+            pass
+        m.inc("images")
+        self.assertIs(m.time("infer"), m.time("decode"))
+        self.assertEqual(m.histograms, {})
+        self.assertEqual(m.counters["images"], 0)
+        self.assertIsNone(m.observer("infer"))
+
+    def test_prometheus_text(self):
+        m = Metrics()
+        with m.time("decode"):
+            pass
+        m.observe("infer", 0.3)
+        m.inc("persons", 4)
+        text = m.prometheus()
+        self.assertIn("# TYPE detector_stage_seconds histogram", text)
+        self.assertIn('detector_stage_seconds_bucket{stage="infer",le="0.25"} 0', text)
+        self.assertIn('detector_stage_seconds_bucket{stage="infer",le="0.5"} 1', text)
+        self.assertIn('detector_stage_seconds_bucket{stage="infer",le="+Inf"} 1', text)
+        self.assertIn('detector_stage_seconds_count{stage="decode"} 1', text)
+        self.assertIn("detector_persons_total 4", text)
+        self.assertIn("detector_errors_total 0", text)
+
+    def test_snapshot_merge(self):
+        a, b = Metrics(), Metrics()
+        a.observe("infer", 0.01)
+        a.inc("images", 2)
+        b.observe("infer", 0.02)
+        b.merge(a.snapshot())
+        self.assertEqual(b.histograms["infer"].count, 2)
+        self.assertEqual(b.counters["images"], 2)
+
+
+class TestProcessFolderMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.inp = self.tmpdir / "input"
+        self.inp.mkdir()
+        for i in range(3):
+            Image.new("RGB", (20, 20)).save(self.inp / f"img{i}.png")
+        (self.inp / "broken.png").write_bytes(b"not a png")
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_stages_and_counters(self, _):
+        m = Metrics()
+        process_folder(DummyModel(TWO_PERSONS), self.inp, self.tmpdir / "out", 0.5, "cpu", 640, {"drawing": {}}, metrics=m)
+        self.assertEqual(m.counters, {"images": 3, "persons": 6, "errors": 1})
+        self.assertEqual(m.histograms["decode"].count, 4)
+        self.assertEqual(m.histograms["infer"].count, 3)
+        self.assertEqual(m.histograms["encode"].count, 3)
+        self.assertIn("infer", m.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+import shutil
+import threading
+import time
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+from PIL import Image
+
+from backend.app.detection.detection import process_folder
+from backend.app.detection.pipeline import Pipeline
+from tests.stubs import DummyModel
+
+
+class TestPipeline(unittest.TestCase):
+    def test_decode_preserves_order_and_bounds_lookahead(self):
+        pipeline = Pipeline(decode_workers=3, queue_depth=2)
+        started = []
+        lock = threading.Lock()
+
+        def fn(i):
+            with lock:
+                started.append(i)
+            return i * 10
+
+        consumed = []
+        for item, value in pipeline.decode(fn, range(20)):
+            consumed.append((item, value))
+            # at most queue_depth items may have been handed to the pool ahead of us
+            self.assertLessEqual(len(started), item + 1 + 2)
+        pipeline.close()
+        self.assertEqual(consumed, [(i, i * 10) for i in range(20)])
+        self.assertEqual(pipeline.stats["decode"].items, 20)
+
+    def test_encode_errors_surface_on_close(self):
+        pipeline = Pipeline(encode_workers=2)
+
+        def boom():
+            raise RuntimeError("disk full")
+
+        pipeline.submit_encode(boom)
+        with self.assertRaises(RuntimeError):
+            pipeline.close()
+
+    def test_inline_when_no_workers(self):
+        pipeline = Pipeline()
+        self.assertFalse(pipeline.staged)
+        calls = []
+        pipeline.submit_encode(calls.append, 1)
+        self.assertEqual(calls, [1])
+        pipeline.close()
+
+    def test_wall_covers_each_run_not_the_idle_time_between(self):
+        pipeline = Pipeline(decode_workers=2, encode_workers=2)
+        self.addCleanup(pipeline.close)
+        for _ in range(2):
+            time.sleep(0.2)
+            self.assertEqual(len(list(pipeline.decode(str, range(4)))), 4)
+            pipeline.submit_encode(time.sleep, 0.01)
+            pipeline.drain()
+            self.assertGreater(pipeline.wall, 0)
+            self.assertLess(pipeline.wall, 0.15)
+
+
+class TestProcessFolderPipelined(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.inp = self.tmpdir / "input"
+        self.inp.mkdir()
+        for i in range(7):
+            Image.new("RGB", (24, 16), color=(0, i * 30, 0)).save(self.inp / f"img{i}.png")
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_matches_sequential_output(self, fake_out):
+        seq, staged = self.tmpdir / "seq", self.tmpdir / "staged"
+        process_folder(DummyModel(), self.inp, seq, 0.5, "cpu", 640, {"drawing": {}}, batch_size=3)
+        cfg = {"drawing": {}, "pipeline": {"decode_workers": 2, "encode_workers": 2, "queue_depth": 2}}
+        summary = process_folder(DummyModel(), self.inp, staged, 0.5, "cpu", 640, cfg, batch_size=3)
+        for p in sorted(seq.glob("*.png")):
+            self.assertEqual(p.read_bytes(), (staged / p.name).read_bytes())
+        self.assertEqual(len(list(staged.glob("*.png"))), 7)
+        for name in ("decode", "infer", "render", "encode"):
+            self.assertEqual(summary["stages"][name].items, 7)
+        self.assertEqual(summary["images"], 7)
+        self.assertEqual(summary["persons"], 7)
+        self.assertIn("Stage throughput", fake_out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import pickle
+import unittest
+
+import numpy as np
+import torch
+from PIL import Image
+
+from backend.app.detection.detection import predict_batch
+from backend.app.detection.postprocess import Detections, PostProcess, accepts_kwarg
+from backend.app.detection.tiling import TiledModel
+
+
+class TensorBoxes:
+    """Like ultralytics ``Boxes``: one (N, 6) tensor plus column views."""
+
+    def __init__(self, data):
+        self.data = torch.tensor(data, dtype=torch.float32).reshape(-1, 6)
+        self.xyxy, self.conf, self.cls = self.data[:, :4], self.data[:, 4], self.data[:, 5]
+
+    def __len__(self):
+        return len(self.data)
+
+
+class Result:
+    def __init__(self, data):
+        self.boxes = TensorBoxes(data)
+
+
+class StrictModel:
+    def predict(self, source, device, imgsz, conf, verbose):
+        return [Result([]) for _ in (source if isinstance(source, list) else [source])]
+
+
+class ClassesModel:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, source, **kwargs):
+        self.calls.append(kwargs)
+        return [Result([[0, 0, 10, 10, 0.9, 0]]) for _ in (source if isinstance(source, list) else [source])]
+
+
+class TestDetections(unittest.TestCase):
+    def test_behaves_like_a_list_of_box_dicts(self):
+        boxes = [{"xyxy": [1, 2, 3, 4], "conf": 0.95, "class": 0}, {"xyxy": [5, 6, 7, 8], "conf": 0.5, "class": 0}]
+        dets = Detections.from_boxes(boxes)
+        self.assertEqual(len(dets), 2)
+        self.assertEqual(dets, boxes)
+        self.assertEqual(dets[1], boxes[1])
+        self.assertEqual(list(dets), boxes)
+        self.assertEqual(dets[dets.conf > 0.9], boxes[:1])
+        self.assertIs(Detections.from_boxes(dets), dets)
+        self.assertEqual(Detections.from_boxes([]), [])
+        self.assertEqual(pickle.loads(pickle.dumps(dets)), boxes)
+
+    def test_scaled(self):
+        dets = Detections([[10, 20, 30, 40]], [0.5]).scaled(2, 0.5)
+        self.assertEqual(dets[0]["xyxy"], [20, 10, 60, 20])
+
+
+class TestPostProcess(unittest.TestCase):
+    def setUp(self):
+        self.r = Result(
+            [
+                [0, 0, 100, 100, 0.9, 0],
+                [0, 0, 100, 100, 0.95, 2],  # car
+                [0, 0, 4, 4, 0.8, 0],  # tiny
+                [0, 0, 50, 50, 0.2, 0],  # below conf
+                [10, 10, 60, 60, 0.7, 0],
+            ]
+        )
+
+    def test_class_and_conf_masks_on_tensors(self):
+        dets = PostProcess(conf=0.25)(self.r)
+        self.assertEqual(dets.conf.tolist(), np.float32([0.9, 0.8, 0.7]).tolist())
+        self.assertEqual(set(dets.cls.tolist()), {0})
+
+    def test_box_at_the_threshold_is_kept(self):
+        self.assertEqual(len(PostProcess(conf=0.5)(Result([[0, 0, 10, 10, 0.5, 0]]))), 1)
+
+    def test_min_area_and_max_det_apply_in_full_resolution(self):
+        post = PostProcess(conf=0.25, min_area=50, max_det=1)
+        # 4x4 on the draft image is 16x16 = 256 px² at full size: kept by min_area, then cut by max_det
+        dets = post(self.r, (200, 100), (800, 400))
+        self.assertEqual(dets.conf.tolist(), np.float32([0.9]).tolist())
+        self.assertEqual(dets[0]["xyxy"], [0, 0, 400, 400])
+        self.assertEqual(len(PostProcess(conf=0.25, min_area=50)(self.r)), 2)
+
+    def test_from_config(self):
+        post = PostProcess.from_config({"inference": {"min_box_area": 10, "max_det": 5}}, conf=0.3)
+        self.assertEqual((post.classes, post.conf, post.min_area, post.max_det), ([0], 0.3, 10.0, 5))
+
+
+class TestClassesForwarding(unittest.TestCase):
+    def test_only_models_taking_classes_get_it(self):
+        img = Image.new("RGB", (32, 32))
+        self.assertFalse(accepts_kwarg(StrictModel(), "classes"))
+        predict_batch(StrictModel(), [img], 0.25, "cpu", 32, classes=[0])
+        model = ClassesModel()
+        self.assertTrue(accepts_kwarg(model, "classes"))
+        predict_batch(model, [img], 0.25, "cpu", 32, classes=[0])
+        self.assertEqual(model.calls[-1]["classes"], [0])
+
+    def test_tiled_model_forwards_classes(self):
+        model = ClassesModel()
+        TiledModel(model, tile=32, overlap=0).predict(Image.new("RGB", (64, 32)), imgsz=32, classes=[0])
+        self.assertTrue(model.calls and all(c["classes"] == [0] for c in model.calls))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,23 +3,16 @@ from unittest import mock
 import tempfile
 import shutil
 from pathlib import Path
-from io import StringIO
+from io import StringIO, BytesIO
+import base64
 from PIL import Image
-import sys
+import argparse
+import threading
+import numpy as np
 
 from backend.app import process_images
-
-class DummyBoxes:
-    def __init__(self):
-        self.xyxy = [[0, 0, 10, 10]]
-        self.conf = [0.95]
-        self.cls = [0]
-
-
-class DummyResult:
-    def __init__(self):
-        self.boxes = DummyBoxes()
-
+from backend.app.detection.backends import ArrayBoxes, ArrayResult
+from tests.stubs import DummyResult
 
 class DummyYOLO:
     def __init__(self, *args, **kwargs):
@@ -43,6 +36,17 @@ class TestLoadConfig(unittest.TestCase):
                 self.assertIn("imgsz", cfg["inference"])
 
 
+class TestDetectionIdentity(unittest.TestCase):
+    def test_dedup_settings_change_identity(self):
+        ident = lambda cfg: process_images._detection_identity(Path("missing.pt"), cfg)  # noqa: E731
+        off = ident({"dedup": {"enabled": False, "max_distance": 4}})
+        self.assertEqual(off, ident({}))
+        on = ident({"dedup": {"enabled": True, "max_distance": 4, "window": 64}})
+        self.assertNotEqual(on, off)
+        self.assertNotEqual(on, ident({"dedup": {"enabled": True, "max_distance": 6, "window": 64}}))
+        self.assertNotEqual(on, ident({"dedup": {"enabled": True, "max_distance": 4, "window": 8}}))
+
+
 class TestMainCLI(unittest.TestCase):
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
@@ -60,7 +64,7 @@ class TestMainCLI(unittest.TestCase):
         patchers = [
             mock.patch("sys.argv", ["process_images.py", "-i", str(self.inp), "-o", str(self.out), "--mode", "cli"]),
             mock.patch("sys.stdout", mock_stdout),
-            mock.patch("backend.app.process_images.YOLO", autospec=True, return_value=self.dummy_model),
+            mock.patch("backend.app.process_images.load_model", autospec=True, return_value=self.dummy_model),
             mock.patch("backend.app.process_images.MODEL_PATH", Path(self.tmpdir) / "yolo12n.pt"),
             mock.patch("backend.app.process_images.Path.exists", return_value=True)
         ]
@@ -77,6 +81,216 @@ class TestMainCLI(unittest.TestCase):
         output = mock_stdout.getvalue()
         self.assertIn("Loading model:", output)
         self.assertTrue(self.dummy_model.predict.called)
+        self.assertIn("img1.png", [p.name for p in self.out.iterdir()])
+
+
+class ArrayYOLO:
+    # the web path expects tensor-like attributes (len() and .tolist())
+    def __init__(self, *args, **kwargs):
+        boxes = ArrayBoxes(np.array([[0.0, 0.0, 10.0, 10.0]]), np.array([0.95]), np.array([0.0]))
+        self.predict = mock.Mock(return_value=[ArrayResult(boxes, (10, 10))])
+
+
+class TestWebCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(self.tmpdir, ignore_errors=True))
+        self.inp = Path(self.tmpdir) / "input"
+        self.out = Path(self.tmpdir) / "output"
+        self.inp.mkdir()
+        Image.new("RGB", (20, 20), color="blue").save(self.inp / "img1.png")
+        self.args = argparse.Namespace(input=self.inp, output=self.out, model=Path(self.tmpdir) / "yolo12n.pt")
+
+    def post(self, app, choose="img1.png"):
+        return app.test_client().post("/process", data={"choose": choose})
+
+    def test_repeat_request_skips_inference(self):
+        model = ArrayYOLO()
+        app = process_images.create_app(model, self.args, process_images.load_config())
+        self.post(app)
+        app.config["file_writer"].wait(self.out / "processed_img1.png")
+        first = (self.out / "processed_img1.png").read_bytes()
+        self.post(app)
+        app.config["file_writer"].close()
+        self.assertEqual(model.predict.call_count, 1)
+        self.assertEqual((self.out / "processed_img1.png").read_bytes(), first)
+
+    def test_jpeg_input_served_from_memory_as_jpeg(self):
+        Image.new("RGB", (40, 30), color="green").save(self.inp / "photo.jpg", quality=90)
+        app = process_images.create_app(ArrayYOLO(), self.args, process_images.load_config())
+        client = app.test_client()
+        resp = self.post(app, "photo.jpg")
+        self.assertIn("processed=processed_photo.jpg", resp.headers["Location"])
+        with mock.patch.object(app.config["file_writer"], "wait") as wait:
+            resp = client.get("/output/processed_photo.jpg")
+        wait.assert_not_called()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.mimetype, "image/jpeg")
+        self.assertTrue(resp.headers["Cache-Control"].startswith("no-cache"))
+        self.assertEqual(Image.open(BytesIO(resp.data)).format, "JPEG")
+        again = client.get("/output/processed_photo.jpg", headers={"If-None-Match": resp.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+        app.config["file_writer"].close()
+        self.assertEqual((self.out / "processed_photo.jpg").read_bytes(), resp.data)
+
+    def test_forced_webp_output(self):
+        cfg = process_images.load_config()
+        cfg["encoding"]["format"] = "webp"
+        app = process_images.create_app(ArrayYOLO(), self.args, cfg)
+        resp = self.post(app)
+        self.assertIn("processed=processed_img1.webp", resp.headers["Location"])
+        resp = app.test_client().get("/output/processed_img1.webp")
+        self.assertEqual(resp.mimetype, "image/webp")
+
+    def test_drawing_change_reuses_detections(self):
+        model = ArrayYOLO()
+        cfg = process_images.load_config()
+        cfg["cache"]["dir"] = str(Path(self.tmpdir) / "cache")
+        self.post(process_images.create_app(model, self.args, cfg))
+        cfg = process_images.load_config()
+        cfg["cache"]["dir"] = str(Path(self.tmpdir) / "cache")
+        cfg["drawing"]["box_thickness"] = 1
+        self.post(process_images.create_app(model, self.args, cfg))
+        self.assertEqual(model.predict.call_count, 1)
+
+
+class TestInputBrowser(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(self.tmpdir, ignore_errors=True))
+        self.inp = Path(self.tmpdir) / "input"
+        self.inp.mkdir()
+        for i in range(5):
+            Image.new("RGB", (800, 600), color="blue").save(self.inp / f"cam{i % 2}_{i}.png")
+        args = argparse.Namespace(input=self.inp, output=Path(self.tmpdir) / "output", model=Path(self.tmpdir) / "m.pt")
+        cfg = process_images.load_config()
+        cfg["web"]["page_size"] = 2
+        self.app = process_images.create_app(ArrayYOLO(), args, cfg)
+        self.client = self.app.test_client()
+
+    def test_pagination_and_prefix_search(self):
+        html = self.client.get("/").get_data(as_text=True)
+        self.assertIn("5 images, page 1 of 3", html)
+        self.assertIn("cam0_0.png", html)
+        self.assertNotIn("cam1_3.png", html)
+        html = self.client.get("/?q=cam0&page=2").get_data(as_text=True)
+        self.assertIn("3 images, page 2 of 2", html)
+        self.assertNotIn("cam0_2.png", html)
+        self.assertIn("cam0_4.png", html)
+        self.assertEqual(self.app.config["listing"].rebuilds, 1)
+
+    def test_process_keeps_search_and_page(self):
+        resp = self.client.post("/process", data={"choose": "cam1_3.png", "q": "cam1", "page": "2"})
+        self.assertIn("q=cam1", resp.headers["Location"])
+        self.assertIn("page=2", resp.headers["Location"])
+        resp = self.client.get("/thumb/output/processed_cam1_3.png")
+        self.assertEqual(resp.mimetype, "image/jpeg")
+        self.app.config["file_writer"].close()
+
+    def test_thumbnail_is_small_and_revalidated(self):
+        resp = self.client.get("/thumb/input/cam0_0.png")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(Image.open(BytesIO(resp.data)).size, (480, 360))
+        again = self.client.get("/thumb/input/cam0_0.png", headers={"If-None-Match": resp.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.client.get("/thumb/input/../secret.png").status_code, 302)
+
+
+class TestDetectAPI(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(self.tmpdir, ignore_errors=True))
+        args = argparse.Namespace(
+            input=Path(self.tmpdir) / "input", output=Path(self.tmpdir) / "output", model=Path(self.tmpdir) / "m.pt"
+        )
+        self.model = ArrayYOLO()
+        self.client = process_images.create_app(self.model, args, process_images.load_config()).test_client()
+        buf = BytesIO()
+        Image.new("RGB", (32, 24), color="red").save(buf, format="PNG")
+        self.png = buf.getvalue()
+
+    def test_raw_body_returns_detections(self):
+        resp = self.client.post("/api/detect", data=self.png, content_type="image/png")
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual((body["width"], body["height"]), (32, 24))
+        self.assertEqual(body["boxes"][0]["xyxy"], [0.0, 0.0, 10.0, 10.0])
+        self.assertNotIn("image", body)
+
+    def test_multipart_upload_with_annotation(self):
+        resp = self.client.post(
+            "/api/detect?annotate=1", data={"image": (BytesIO(self.png), "a.png")}, content_type="multipart/form-data"
+        )
+        body = resp.get_json()
+        self.assertEqual(body["image_format"], "png")
+        self.assertEqual(Image.open(BytesIO(base64.b64decode(body["image"]))).size, (32, 24))
+
+    def test_undecodable_upload_is_rejected(self):
+        resp = self.client.post("/api/detect", data=b"not an image")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_metrics_endpoint(self):
+        self.client.post("/api/detect?annotate=1", data=self.png, content_type="image/png")
+        self.client.post("/api/detect", data=b"not an image")
+        resp = self.client.get("/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.content_type.startswith("text/plain"))
+        text = resp.get_data(as_text=True)
+        self.assertIn("detector_images_total 1", text)
+        self.assertIn("detector_persons_total 1", text)
+        self.assertIn("detector_errors_total 1", text)
+        for stage in ("infer", "render", "encode"):
+            self.assertIn(f'detector_stage_seconds_count{{stage="{stage}"}} 1', text)
+        # the failed decode is timed too
+        self.assertIn('detector_stage_seconds_count{stage="decode"} 2', text)
+
+    def test_draft_decode_reports_full_resolution_boxes(self):
+        cfg = process_images.load_config()
+        cfg["inference"]["draft_decode"] = True
+        args = argparse.Namespace(input=Path(self.tmpdir), output=Path(self.tmpdir), model=Path(self.tmpdir) / "m.pt")
+        client = process_images.create_app(self.model, args, cfg).test_client()
+        buf = BytesIO()
+        Image.new("RGB", (2560, 1920), color="red").save(buf, format="JPEG")
+        body = client.post("/api/detect", data=buf.getvalue()).get_json()
+        self.assertEqual(self.model.predict.call_args.kwargs["source"].size, (640, 480))
+        self.assertEqual((body["width"], body["height"]), (2560, 1920))
+        self.assertEqual(body["boxes"][0]["xyxy"], [0.0, 0.0, 40.0, 40.0])
+
+    def test_busy_server_sheds_requests_with_503(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        model = ArrayYOLO()
+        model.predict.side_effect = lambda **kw: release.wait(5) and mock.DEFAULT
+        cfg = process_images.load_config()
+        cfg["web"].update(max_queue=1, timeout_s=0.05)
+        args = argparse.Namespace(input=Path(self.tmpdir), output=Path(self.tmpdir), model=Path(self.tmpdir) / "m.pt")
+        client = process_images.create_app(model, args, cfg).test_client()
+        # the first request times out while running, the second while queued, the third finds the queue full
+        for _ in range(3):
+            resp = client.post("/api/detect", data=self.png)
+            self.assertEqual(resp.status_code, 503)
+            self.assertEqual(resp.headers["Retry-After"], "1")
+            self.assertIn("busy", resp.get_json()["error"])
+        release.set()
+        self.assertIn("detector_rejected_total 3", client.get("/metrics").get_data(as_text=True))
+
+    def test_timeout_outside_inference_is_not_reported_as_busy(self):
+        args = argparse.Namespace(input=Path(self.tmpdir), output=Path(self.tmpdir), model=Path(self.tmpdir) / "m.pt")
+        client = process_images.create_app(ArrayYOLO(), args, process_images.load_config()).test_client()
+        with mock.patch("backend.app.process_images.draw_boxes", side_effect=TimeoutError("disk")):
+            resp = client.post("/api/detect?annotate=1", data=self.png)
+        self.assertEqual(resp.status_code, 500)
+
+    def test_failed_model_worker_is_503(self):
+        model = ArrayYOLO()
+        model.predict.side_effect = process_images.WorkerError("worker-0 exited (code 3)")
+        args = argparse.Namespace(input=Path(self.tmpdir), output=Path(self.tmpdir), model=Path(self.tmpdir) / "m.pt")
+        client = process_images.create_app(model, args, process_images.load_config()).test_client()
+        with mock.patch("sys.stdout", new_callable=StringIO):
+            resp = client.post("/api/detect", data=self.png)
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp.headers["Retry-After"], "5")
+        self.assertIn("worker unavailable", resp.get_json()["error"])
 
 
 class TestProcessPILIntegration(unittest.TestCase):
@@ -84,7 +298,7 @@ class TestProcessPILIntegration(unittest.TestCase):
         self.img = Image.new("RGB", (10, 10), color="green")
         self.cfg = process_images.load_config()
 
-    @mock.patch("backend.app.process_images.YOLO", new=DummyYOLO)
+    @mock.patch("backend.app.process_images.load_model", new=DummyYOLO)
     def test_draw_boxes_called(self):
         boxes = [{"xyxy": [0, 0, 5, 5], "conf": 0.9, "class": 0}]
         out_img = process_images.draw_boxes(self.img.copy(), boxes, self.cfg)
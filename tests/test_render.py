@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+from PIL import Image
+
+from backend.app.detection.detection import draw_boxes
+from backend.app.detection.render import RenderStyle, load_font
+
+
+class TestRenderStyle(unittest.TestCase):
+    def test_font_size_forms(self):
+        self.assertEqual(RenderStyle(font_size="1/50").font_px(1000), 20)
+        self.assertEqual(RenderStyle(font_size=0.1).font_px(100), 10)
+        self.assertEqual(RenderStyle(font_size="1/500").font_px(100), 6)
+        self.assertEqual(RenderStyle(font_size=30).font_px(100), 30)
+        self.assertEqual(RenderStyle(font_size="invalid").font_px(100), 18)
+
+    def test_padding_defaults(self):
+        style = RenderStyle(label_padding=[7])
+        self.assertEqual((style.pad_x, style.pad_y), (7, 2))
+
+    def test_fonts_are_shared_across_images(self):
+        style = RenderStyle(font_size="1/10")
+        self.assertIs(style.font(200), style.font(200))
+        self.assertIs(style.font(200), load_font(20, None))
+
+    def test_style_and_dict_draw_identically(self):
+        cfg = {"drawing": {"box_thickness": 3, "font_size": 12, "label_padding": [2, 1]}}
+        boxes = [{"xyxy": [10, 20, 60, 90], "conf": 0.87, "class": 0}]
+        a = draw_boxes(Image.new("RGB", (100, 100), "white"), boxes, cfg)
+        b = draw_boxes(Image.new("RGB", (100, 100), "white"), boxes, RenderStyle.from_config(cfg))
+        self.assertEqual(a.tobytes(), b.tobytes())
+
+    def test_font_path_skips_matplotlib_lookup(self):
+        with mock.patch("backend.app.detection.render._default_font_path") as lookup:
+            load_font.cache_clear()
+            RenderStyle(font_size=14, font_path="/nonexistent/font.ttf").font(100)
+            lookup.assert_not_called()
+        load_font.cache_clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import unittest
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+
+from backend.app.detection.batcher import DynamicBatcher
+from backend.app.detection.serving import ModelWorker, WorkerError, start_workers
+from tests.stubs import DummyModel, DummyResult
+
+
+class FailingModel(DummyModel):
+    def result(self, img, imgsz):
+        if img.size == (13, 13):
+            raise RuntimeError("inference failed")
+        if img.size == (7, 7):
+            os._exit(3)
+        return super().result(img, imgsz)
+
+
+def dummy_loader(model_path):
+    # module-level so spawned workers can unpickle it
+    return FailingModel()
+
+
+def threads_loader(model_path):
+    import torch
+
+    class Model(DummyModel):
+        def predict(self, source, **kwargs):
+            r = DummyResult()
+            r.boxes.conf = [float(torch.get_num_threads())]
+            return [r]
+
+    return Model()
+
+
+PREDICT = {"conf": 0.5, "device": "cpu", "imgsz": 32}
+
+
+class TestModelWorker(unittest.TestCase):
+    def worker(self, loader=dummy_loader, threads=1):
+        w = ModelWorker(Path("unused.pt"), threads, PREDICT, {}, loader).start()
+        self.addCleanup(w.close)
+        w.wait_ready()
+        return w
+
+    def test_batch_returns_person_boxes(self):
+        boxes = self.worker()([Image.new("RGB", (20, 20)), Image.new("RGB", (30, 10))])
+        self.assertEqual(boxes, [[{"xyxy": [0, 0, 10, 10], "conf": 0.95, "class": 0}]] * 2)
+
+    def test_threads_are_pinned(self):
+        boxes = self.worker(threads_loader, threads=2)([Image.new("RGB", (20, 20))])
+        self.assertEqual(boxes[0][0]["conf"], 2.0)
+
+    def test_errors_and_crashes(self):
+        w = self.worker()
+        with self.assertRaisesRegex(WorkerError, "inference failed"):
+            w([Image.new("RGB", (13, 13))])
+        with self.assertRaisesRegex(WorkerError, "exited"):
+            w([Image.new("RGB", (7, 7))])
+        # the dead worker is replaced on the next call
+        self.assertEqual(len(w([Image.new("RGB", (20, 20))])), 1)
+        self.assertEqual(w.restarts, 1)
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_pool_behind_batcher(self, _):
+        pool = start_workers(Path("unused.pt"), 2, PREDICT, {}, threads=1, loader=dummy_loader)
+        batcher = DynamicBatcher(pool, max_batch_size=4, max_wait_ms=5, max_queue=16)
+        try:
+            futs = [batcher.submit(Image.new("RGB", (20, 20))) for _ in range(8)]
+            self.assertTrue(all(len(f.result(timeout=30)) == 1 for f in futs))
+        finally:
+            batcher.close()
+            for w in pool:
+                w.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
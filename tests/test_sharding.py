@@ -0,0 +1,60 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+from PIL import Image
+
+from backend.app.detection.sharding import process_sharded
+from tests.stubs import DummyModel
+
+
+class FailingModel(DummyModel):
+    def result(self, img, imgsz):
+        if img.size == (13, 13):
+            raise RuntimeError("inference failed")
+        return super().result(img, imgsz)
+
+
+def dummy_loader(model_path):
+    # module-level so spawned workers can unpickle it
+    return FailingModel()
+
+
+class TestProcessSharded(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.inp = self.tmpdir / "input"
+        self.out = self.tmpdir / "output"
+        self.inp.mkdir()
+        for i in range(6):
+            Image.new("RGB", (20, 20), color=(i * 40, 0, 0)).save(self.inp / f"img{i}.png")
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_shards_merge_into_output(self, fake_out):
+        summary = process_sharded(
+            Path("unused.pt"), self.inp, self.out, 0.5, "cpu", 640, {"drawing": {}}, workers=2, loader=dummy_loader
+        )
+        self.assertEqual(summary["images"], 6)
+        self.assertEqual(summary["persons"], 6)
+        self.assertEqual(summary["failed_shards"], [])
+        self.assertEqual(len(list(self.out.glob("*.png"))), 6)
+        self.assertIn("img/s", fake_out.getvalue())
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_failing_shard_keeps_other_output(self, fake_out):
+        # img0 lands in shard 0 (round robin) and makes its model raise
+        Image.new("RGB", (13, 13)).save(self.inp / "img0.png")
+        summary = process_sharded(
+            Path("unused.pt"), self.inp, self.out, 0.5, "cpu", 640, {"drawing": {}}, workers=2, loader=dummy_loader
+        )
+        self.assertEqual(summary["failed_shards"], [0])
+        self.assertEqual(summary["images"], 3)
+        self.assertEqual(sorted(p.name for p in self.out.glob("*.png")), ["img1.png", "img3.png", "img5.png"])
+        self.assertIn("inference failed", fake_out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+from backend.app.detection.detection import process_folder
+from backend.app.detection.tiling import TiledModel, maybe_tiled, tile_grid
+
+
+class Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = np.array(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.array(conf, dtype=np.float32)
+        self.cls = np.array(cls, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class SceneModel:
+    """Finds the people of a fixed scene (image coordinates) inside whatever crop it is given.
+
+    Crops are recognised by their top-left pixel, which the tests encode in the
+    image itself; a box is reported when it lies entirely within the crop.
+    """
+
+    def __init__(self, people):
+        self.people = np.array(people, dtype=np.float32)
+        self.calls = []
+
+    def predict(self, source, device, imgsz, conf, verbose):
+        batch = source if isinstance(source, list) else [source]
+        self.calls.append((len(batch), imgsz))
+        results = []
+        for crop in batch:
+            r, g, _ = crop.getpixel((0, 0))
+            x0, y0 = r * 10, g * 10
+            x1, y1 = x0 + crop.width, y0 + crop.height
+            inside = (self.people[:, 0] >= x0) & (self.people[:, 1] >= y0)
+            inside &= (self.people[:, 2] <= x1) & (self.people[:, 3] <= y1)
+            local = self.people[inside] - np.array([x0, y0, x0, y0], dtype=np.float32)
+            results.append(Result(Boxes(local, [0.9] * len(local), [0] * len(local))))
+        return results
+
+
+def scene_image(width, height):
+    """Image whose pixel at (x, y) encodes (x // 10, y // 10), so crops know their offset."""
+    xs = np.arange(width) // 10
+    ys = np.arange(height) // 10
+    arr = np.zeros((height, width, 3), dtype=np.uint8)
+    arr[..., 0] = xs[None, :]
+    arr[..., 1] = ys[:, None]
+    return Image.fromarray(arr)
+
+
+class TestTileGrid(unittest.TestCase):
+    def test_covers_image_with_equal_tiles(self):
+        grid = tile_grid(1000, 700, 400, 100)
+        self.assertEqual({(x1 - x0, y1 - y0) for x0, y0, x1, y1 in grid}, {(400, 400)})
+        self.assertEqual(max(b[2] for b in grid), 1000)
+        self.assertEqual(max(b[3] for b in grid), 700)
+        self.assertEqual(sorted({b[0] for b in grid}), [0, 300, 600])
+        self.assertEqual(sorted({b[1] for b in grid}), [0, 300])
+
+    def test_small_image_is_one_tile(self):
+        self.assertEqual(tile_grid(200, 100, 640, 128), [(0, 0, 200, 100)])
+
+
+class TestTiledModel(unittest.TestCase):
+    def test_boxes_mapped_to_image_and_seams_merged(self):
+        # the second person sits in the overlap of the first two tiles
+        people = [[10, 10, 50, 50], [320, 20, 380, 80], [900, 600, 950, 690]]
+        model = SceneModel(people)
+        tiled = TiledModel(model, tile=400, overlap=100, batch_size=4, full_image=False)
+        r = tiled.predict(source=scene_image(1000, 700), device="cpu", imgsz=640, conf=0.25, verbose=False)[0]
+        got = sorted(r.boxes.xyxy.tolist())
+        self.assertEqual(got, sorted(people))
+        self.assertEqual(tiled.tiles, 6)
+        self.assertEqual(model.calls, [(4, 400), (2, 400)])
+
+    def test_full_image_pass_uses_normal_imgsz(self):
+        model = SceneModel([[10, 10, 50, 50]])
+        tiled = TiledModel(model, tile=400, overlap=100, batch_size=8, full_image=True)
+        r = tiled.predict(source=scene_image(1000, 700), imgsz=640, conf=0.25)[0]
+        self.assertEqual(r.boxes.xyxy.tolist(), [[10, 10, 50, 50]])
+        self.assertEqual(model.calls[0], (1, 640))
+
+    def test_maybe_tiled(self):
+        model = SceneModel([])
+        self.assertIs(maybe_tiled(model, {}), model)
+        wrapped = maybe_tiled(model, {"tiling": {"enabled": True, "tile": 320}})
+        self.assertIsInstance(wrapped, TiledModel)
+        self.assertEqual(wrapped.tile, 320)
+
+
+class TestProcessFolderTiled(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.inp = self.tmpdir / "input"
+        self.inp.mkdir()
+        scene_image(1000, 700).save(self.inp / "scene.png")
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_tiling_config_finds_small_people(self, _):
+        model = SceneModel([[10, 10, 50, 50], [900, 600, 950, 690]])
+        cfg = {"drawing": {}, "tiling": {"enabled": True, "tile": 400, "overlap": 100}}
+        summary = process_folder(model, self.inp, self.tmpdir / "out", 0.5, "cpu", 640, cfg, save_images=False)
+        self.assertEqual(summary["persons"], 2)
+        self.assertTrue(all(imgsz == 400 for _, imgsz in model.calls[1:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
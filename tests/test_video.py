@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+import shutil
+import json
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+
+from backend.app.detection.video import FrameGate, is_video, process_video
+from backend.app.detection.writers import DetectionWriter
+from tests.stubs import DummyModel
+
+
+def static_clip(path: Path, frames: int = 30, moving=range(10, 15)):
+    """Write a grey clip that is static apart from a white square moving during ``moving``."""
+    import cv2
+
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 10.0, (64, 48))
+    for i in range(frames):
+        frame = np.full((48, 64, 3), 80, dtype=np.uint8)
+        if i in moving:
+            x = 4 * (i - moving.start)
+            frame[10:30, x : x + 20] = 255
+        writer.write(frame)
+    writer.release()
+
+
+class TestFrameGate(unittest.TestCase):
+    def test_every_nth_frame(self):
+        gate = FrameGate(every=3)
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        self.assertEqual([i for i in range(7) if gate.should_infer(i, frame)], [0, 3, 6])
+
+    def test_motion_compares_with_last_inferred_frame(self):
+        gate = FrameGate(motion_threshold=5)
+        dark = np.zeros((48, 64, 3), dtype=np.uint8)
+        self.assertTrue(gate.should_infer(0, dark))
+        self.assertFalse(gate.should_infer(1, dark + 3))
+        # small steps add up against the last inferred frame
+        self.assertTrue(gate.should_infer(2, dark + 6))
+
+
+class TestProcessVideo(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.src = self.tmpdir / "cctv.mp4"
+        static_clip(self.src)
+
+    def test_is_video(self):
+        self.assertTrue(is_video(self.src))
+        self.assertFalse(is_video(self.tmpdir / "missing.mp4"))
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_annotated_video_has_every_frame(self, _):
+        import cv2
+
+        model = DummyModel()
+        summary = process_video(model, self.src, self.tmpdir / "out", 0.5, "cpu", 640, {"drawing": {}})
+        self.assertEqual((summary["frames"], summary["inferred"], len(model.calls)), (30, 30, 30))
+        cap = cv2.VideoCapture(str(self.tmpdir / "out" / "cctv.mp4"))
+        self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 30)
+        cap.release()
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_motion_gating_carries_boxes_forward(self, _):
+        model = DummyModel()
+        cfg = {"drawing": {}, "video": {"motion_threshold": 2}}
+        jsonl = self.tmpdir / "out" / "detections.jsonl"
+        writer = DetectionWriter(jsonl)
+        summary = process_video(model, self.src, self.tmpdir / "out", 0.5, "cpu", 640, cfg, save_video=False, writer=writer)
+        writer.close()
+        self.assertLess(len(model.calls), 10)
+        self.assertEqual(summary["inferred"], len(model.calls))
+        self.assertFalse((self.tmpdir / "out" / "cctv.mp4").exists())
+        records = [json.loads(line) for line in jsonl.read_text().splitlines()]
+        self.assertEqual([r["frame"] for r in records], list(range(30)))
+        self.assertEqual(sum(r["inferred"] for r in records), len(model.calls))
+        self.assertTrue(all(len(r["boxes"]) == 1 for r in records))
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_unreadable_file_is_skipped(self, fake_out):
+        bad = self.tmpdir / "bad.mp4"
+        bad.write_bytes(b"not a video")
+        self.assertIsNone(process_video(DummyModel(), bad, self.tmpdir / "out", 0.5, "cpu", 640, {}))
+        self.assertIn("Skipping bad.mp4", fake_out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+import unittest
+import tempfile
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+
+from PIL import Image
+
+from backend.app.detection.pipeline import Pipeline
+from backend.app.detection.watch import FolderWatcher, PollingSource, StabilityTracker, watch_folder
+from tests.stubs import DummyModel
+
+
+def drain(watcher, n, timeout=5.0):
+    got, deadline = [], time.monotonic() + timeout
+    while len(got) < n and time.monotonic() < deadline:
+        got += watcher.take(n - len(got), timeout=0.1)
+    return got
+
+
+class TestStabilityTracker(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.p = self.tmpdir / "a.png"
+
+    def test_released_once_file_stops_changing(self):
+        tracker = StabilityTracker(settle=1.0)
+        self.p.write_bytes(b"12")
+        tracker.touch(self.p, now=0.0)
+        self.assertEqual(tracker.ready(0.5), [])
+        # still being written: the settle timer restarts
+        self.p.write_bytes(b"1234")
+        self.assertEqual(tracker.ready(1.0), [])
+        self.assertEqual(tracker.ready(2.0), [self.p])
+        # same version is not released again, a modified one is
+        tracker.touch(self.p, now=3.0)
+        self.assertEqual(tracker.ready(5.0), [])
+        self.p.write_bytes(b"123456")
+        tracker.touch(self.p, now=6.0)
+        self.assertEqual(tracker.ready(7.0), [self.p])
+
+    def test_complete_file_skips_settle_time(self):
+        tracker = StabilityTracker(settle=10.0)
+        self.p.write_bytes(b"12")
+        tracker.touch(self.p, now=0.0, complete=True)
+        self.assertEqual(tracker.ready(0.0), [self.p])
+
+    def test_empty_and_deleted_files_are_held_back(self):
+        tracker = StabilityTracker(settle=0.0)
+        self.p.write_bytes(b"")
+        tracker.touch(self.p, now=0.0)
+        self.assertEqual(tracker.ready(1.0), [])
+        self.p.unlink()
+        tracker.touch(self.p, now=1.0)
+        self.assertEqual(len(tracker), 0)
+
+
+class WatcherTests:
+    method = None
+
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.inp = self.tmpdir / "input"
+        self.inp.mkdir()
+
+    def watcher(self, **kwargs):
+        kwargs.setdefault("settle", 0.1)
+        w = FolderWatcher(self.inp, method=self.method, poll_interval=0.05, **kwargs).start()
+        self.addCleanup(w.stop)
+        return w
+
+    def test_existing_and_new_images(self):
+        Image.new("RGB", (8, 8)).save(self.inp / "old.png")
+        w = self.watcher()
+        self.assertEqual(drain(w, 1), [self.inp / "old.png"])
+        Image.new("RGB", (8, 8)).save(self.inp / "new.jpg")
+        (self.inp / "notes.txt").write_text("ignored")
+        self.assertEqual(drain(w, 1), [self.inp / "new.jpg"])
+        w.done(2)
+        self.assertEqual(drain(w, 1, timeout=0.3), [])
+
+    def test_initial_scan_off_only_reports_new_files(self):
+        Image.new("RGB", (8, 8)).save(self.inp / "old.png")
+        w = self.watcher(initial_scan=False)
+        time.sleep(0.3)
+        Image.new("RGB", (8, 8)).save(self.inp / "new.png")
+        self.assertEqual(drain(w, 2, timeout=0.8), [self.inp / "new.png"])
+
+    def test_in_flight_limit(self):
+        for i in range(5):
+            Image.new("RGB", (8, 8)).save(self.inp / f"{i}.png")
+        w = self.watcher(max_in_flight=2)
+        self.assertEqual(len(drain(w, 5, timeout=0.5)), 2)
+        w.done(2)
+        self.assertEqual(len(drain(w, 3, timeout=0.8)), 2)
+
+
+class TestPollingWatcher(WatcherTests, unittest.TestCase):
+    method = "poll"
+
+    def test_source_asks_for_rescan_every_interval(self):
+        src = PollingSource(self.inp, interval=0.2)
+        self.assertIsNone(src.wait(0.01))
+        self.assertEqual(src.wait(0.01), [])
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_folder_briefly_gone_is_retried(self, out):
+        w = self.watcher(retry_s=0.1)
+        moved = self.tmpdir / "away"
+        self.inp.rename(moved)
+        time.sleep(0.3)
+        moved.rename(self.inp)
+        Image.new("RGB", (8, 8)).save(self.inp / "back.png")
+        self.assertEqual(drain(w, 1), [self.inp / "back.png"])
+        self.assertIn("failed", out.getvalue())
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux-only")
+class TestInotifyWatcher(WatcherTests, unittest.TestCase):
+    method = "inotify"
+
+
+class TestWatchFolder(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.inp = self.tmpdir / "input"
+        self.out = self.tmpdir / "output"
+        self.inp.mkdir()
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_processes_images_as_they_arrive(self, _):
+        model = DummyModel()
+        stop = threading.Event()
+        cfg = {"drawing": {}, "watch": {"settle_s": 0.05, "poll_interval_s": 0.05}}
+        result = {}
+        t = threading.Thread(
+            target=lambda: result.update(
+                watch_folder(model, self.inp, self.out, 0.5, "cpu", 640, cfg, batch_size=4, stop=stop)
+            )
+        )
+        t.start()
+        try:
+            for i in range(3):
+                Image.new("RGB", (16, 16)).save(self.inp / f"cam{i}.png")
+            deadline = time.monotonic() + 5
+            while len(list(self.out.glob("cam*.png"))) < 3 and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            stop.set()
+            t.join()
+        self.assertEqual(sorted(p.name for p in self.out.glob("*.png")), ["cam0.png", "cam1.png", "cam2.png"])
+        self.assertEqual((result["images"], result["persons"]), (3, 3))
+        self.assertEqual(model.seen, 3)
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_failed_batch_is_reported_and_watching_goes_on(self, out):
+        model = DummyModel()
+        real = model.predict
+
+        def predict(source, device, imgsz, conf, verbose):
+            batch = source if isinstance(source, list) else [source]
+            if any(img.getpixel((0, 0))[0] for img in batch):
+                raise RuntimeError("bad image")
+            return real(source, device, imgsz, conf, verbose)
+
+        model.predict = predict
+        stop = threading.Event()
+        cfg = {"watch": {"settle_s": 0.05, "poll_interval_s": 0.05}, "cascade": {"enabled": True}}
+        result = {}
+        with mock.patch.object(Pipeline, "from_config", wraps=Pipeline.from_config) as pipelines:
+            t = threading.Thread(
+                target=lambda: result.update(
+                    watch_folder(model, self.inp, self.out, 0.5, "cpu", 640, cfg, batch_size=1, stop=stop)
+                )
+            )
+            t.start()
+            try:
+                Image.new("RGB", (16, 16), "red").save(self.inp / "bad.png")
+                deadline = time.monotonic() + 5
+                while "bad.png" not in out.getvalue() and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                for i in range(2):
+                    Image.new("RGB", (16, 16)).save(self.inp / f"cam{i}.png")
+                while len(list(self.out.glob("cam*.png"))) < 2 and time.monotonic() < deadline:
+                    time.sleep(0.05)
+            finally:
+                stop.set()
+                t.join()
+        self.assertEqual((result["images"], result["failed"]), (2, 1))
+        self.assertIn("Error processing bad.png", out.getvalue())
+        # one pipeline and one cascade for the whole run
+        self.assertEqual(pipelines.call_count, 1)
+        self.assertIn("of 2 images had no candidates", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
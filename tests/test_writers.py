@@ -0,0 +1,113 @@
+import unittest
+import tempfile
+import shutil
+import json
+from pathlib import Path
+from io import StringIO
+from unittest import mock
+import numpy as np
+from PIL import Image
+
+from backend.app.detection.detection import process_folder
+from backend.app.detection.writers import BackgroundFileWriter, DetectionWriter, merge_jsonl, merge_npz
+from tests.stubs import DummyBoxes, DummyModel
+
+# a person and a low-confidence box of another class
+TWO_BOXES = DummyBoxes([[0, 0, 10, 10], [2, 2, 5, 5]], [0.95, 0.5], [0, 2])
+
+
+class TestDetectionWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_jsonl_and_npz(self):
+        w = DetectionWriter(self.tmpdir / "d.jsonl", self.tmpdir / "d.npz")
+        w.write("a.png", (20, 10), [{"xyxy": [1, 2, 3, 4], "conf": 0.9, "class": 0}])
+        w.write("b.png", (30, 15), [])
+        w.close()
+        lines = [json.loads(l) for l in (self.tmpdir / "d.jsonl").read_text().splitlines()]
+        self.assertEqual(lines[0], {"file": "a.png", "width": 20, "height": 10,
+                                    "boxes": [{"xyxy": [1.0, 2.0, 3.0, 4.0], "conf": 0.9, "class": 0}]})
+        self.assertEqual(lines[1]["boxes"], [])
+        with np.load(self.tmpdir / "d.npz") as data:
+            self.assertEqual(list(data["files"]), ["a.png", "b.png"])
+            self.assertEqual(data["xyxy"].shape, (1, 4))
+            self.assertEqual(list(data["image"]), [0])
+            self.assertEqual(data["image_size"].tolist(), [[20, 10], [30, 15]])
+
+    def test_merge_rebases_image_index(self):
+        parts = []
+        for i in range(2):
+            w = DetectionWriter(self.tmpdir / f"d.shard{i}.jsonl", self.tmpdir / f"d.shard{i}.npz")
+            w.write(f"{i}.png", (10, 10), [{"xyxy": [0, 0, 1, 1], "conf": 0.5, "class": 0}])
+            w.close()
+            parts.append(i)
+        merge_jsonl([self.tmpdir / f"d.shard{i}.jsonl" for i in parts], self.tmpdir / "d.jsonl")
+        merge_npz([self.tmpdir / f"d.shard{i}.npz" for i in parts], self.tmpdir / "d.npz")
+        self.assertEqual(len((self.tmpdir / "d.jsonl").read_text().splitlines()), 2)
+        with np.load(self.tmpdir / "d.npz") as data:
+            self.assertEqual(list(data["image"]), [0, 1])
+        self.assertFalse((self.tmpdir / "d.shard0.npz").exists())
+
+    def test_npz_is_written_to_the_exact_configured_name(self):
+        w = DetectionWriter(npz_path=self.tmpdir / "detections.bin")
+        w.write("a.png", (20, 10), [{"xyxy": [1, 2, 3, 4], "conf": 0.9, "class": 0}])
+        w.close()
+        self.assertEqual([p.name for p in self.tmpdir.iterdir()], ["detections.bin"])
+        with np.load(self.tmpdir / "detections.bin") as data:
+            self.assertEqual(list(data["files"]), ["a.png"])
+
+
+class TestBackgroundFileWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_latest_write_wins_and_is_observed(self):
+        durations = []
+        writer = BackgroundFileWriter(durations.append)
+        path = self.tmpdir / "sub" / "out.png"
+        writer.submit(path, b"first")
+        writer.submit(path, b"second")
+        writer.wait(path)
+        self.assertEqual(path.read_bytes(), b"second")
+        writer.close()
+        self.assertEqual(len(durations), 2)
+        self.assertEqual([p.name for p in path.parent.iterdir()], ["out.png"])
+
+    def test_wait_on_unknown_path_returns(self):
+        writer = BackgroundFileWriter()
+        writer.wait(self.tmpdir / "never.png", timeout=1)
+        writer.close()
+
+
+class TestDetectionsOnly(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.inp = self.tmpdir / "input"
+        self.out = self.tmpdir / "output"
+        self.inp.mkdir()
+        for i in range(3):
+            Image.new("RGB", (20, 20)).save(self.inp / f"img{i}.png")
+
+    @mock.patch("sys.stdout", new_callable=StringIO)
+    def test_skips_rendering(self, _):
+        writer = DetectionWriter(self.out / "d.jsonl")
+        with mock.patch("backend.app.detection.detection.draw_boxes") as draw:
+            summary = process_folder(
+                DummyModel(TWO_BOXES), self.inp, self.out, 0.5, "cpu", 640, {"drawing": {}}, save_images=False, writer=writer
+            )
+            draw.assert_not_called()
+        writer.close()
+        self.assertEqual(list(self.out.glob("*.png")), [])
+        lines = (self.out / "d.jsonl").read_text().splitlines()
+        self.assertEqual(len(lines), 3)
+        # only the person box is kept
+        self.assertEqual(len(json.loads(lines[0])["boxes"]), 1)
+        self.assertEqual(summary["stages"]["encode"].items, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()